@@ -0,0 +1,106 @@
+"""
+Presupuesto de arranque de la interfaz.
+
+Mide, en procesos nuevos, cuánto tarda en aparecer la ventana principal
+(importar main_window + construir MainWindow + show) y verifica que en ese
+momento no se hayan importado los módulos pesados que sólo usan algunas
+páginas (QtWebEngine, pypdf/PyPDF2, py7zr, rarfile, bs4, requests). Sale con
+código 1 si se excede el presupuesto o si alguno de esos módulos se cargó.
+
+Ejemplos:
+    python benchmarks/arranque.py
+    python benchmarks/arranque.py --presupuesto-ms 800 --repeticiones 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+MODULOS_PESADOS = [
+    "PyQt6.QtWebEngineWidgets",
+    "pypdf",
+    "PyPDF2",
+    "py7zr",
+    "rarfile",
+    "bs4",
+    "requests",
+]
+
+# Se ejecuta en un proceso limpio para medir el arranque en frío de Python.
+_SONDA = """
+import json, sys, time
+sys.path.insert(0, {repo!r})
+t0 = time.perf_counter()
+from PyQt6.QtWidgets import QApplication
+app = QApplication([])
+t1 = time.perf_counter()
+from src.views.pages.main_window import MainWindow
+t2 = time.perf_counter()
+window = MainWindow()
+window.show()
+t3 = time.perf_counter()
+cargados = [m for m in {pesados!r} if m in sys.modules]
+print(json.dumps({{
+    "qt_ms": (t1 - t0) * 1000,
+    "importar_ms": (t2 - t1) * 1000,
+    "construir_ms": (t3 - t2) * 1000,
+    "ventana_ms": (t3 - t1) * 1000,
+    "pesados": cargados,
+}}))
+"""
+
+
+def medir_arranque() -> dict:
+    entorno = dict(os.environ)
+    entorno.setdefault("QT_QPA_PLATFORM", "offscreen")
+    codigo = _SONDA.format(repo=str(REPO_DIR), pesados=MODULOS_PESADOS)
+    with tempfile.TemporaryDirectory(prefix="edj_arranque_") as trabajo:
+        salida = subprocess.run(
+            [sys.executable, "-c", codigo], cwd=trabajo, env=entorno, capture_output=True, text=True, timeout=120
+        )
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr.strip().splitlines()[-1] if salida.stderr.strip() else "la sonda falló")
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Presupuesto de arranque de la interfaz EDJ.")
+    parser.add_argument("--presupuesto-ms", type=float, default=1500.0,
+                        help="Máximo para importar y mostrar la ventana principal (sin contar QApplication)")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Se toma la mejor de N mediciones")
+    args = parser.parse_args(argv)
+
+    try:
+        mediciones = [medir_arranque() for _ in range(max(1, args.repeticiones))]
+    except Exception as exc:
+        print(f"❌ No se pudo medir el arranque: {exc}", file=sys.stderr)
+        return 2
+    mejor = min(mediciones, key=lambda m: m["ventana_ms"])
+
+    print(f"Importar main_window: {mejor['importar_ms']:8.1f} ms")
+    print(f"Construir y mostrar:  {mejor['construir_ms']:8.1f} ms")
+    print(f"Ventana visible en:   {mejor['ventana_ms']:8.1f} ms (presupuesto {args.presupuesto_ms:.0f} ms)")
+
+    ok = True
+    if mejor["ventana_ms"] > args.presupuesto_ms:
+        print("⚠️ Arranque fuera de presupuesto.")
+        ok = False
+    pesados = sorted({m for medicion in mediciones for m in medicion["pesados"]})
+    if pesados:
+        print(f"⚠️ Módulos pesados importados al arrancar: {', '.join(pesados)}")
+        ok = False
+    if ok:
+        print("✅ Arranque dentro de presupuesto.")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
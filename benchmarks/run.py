@@ -0,0 +1,281 @@
+"""
+Benchmarks del pipeline EDJ contra un SEIA simulado (servidor_seia.py).
+
+Crea proyectos sintéticos de distintos tamaños en una carpeta temporal, apunta
+los módulos de descarga al servidor local y mide cada etapa de punta a punta:
+
+    exeva             _extract_exeva (consulta y parseo de la tabla) + guardado
+    exeva_descarga    _download_documents
+    anexos            detect_attachments
+    descargar_anexos  download_attachments_files
+    descomprimir      unpack_exeva_archives
+    indexar           indexar_exeva
+    foliar, compilar, indice   construcción de reportes
+
+Ejemplos:
+    python benchmarks/run.py
+    python benchmarks/run.py --tamanos 100,1000,10000 --etiqueta antes-del-cambio
+    python benchmarks/run.py --tamanos 1000 --comparar benchmarks/resultados/20240101_120000_antes.json
+
+Cada ejecución se guarda en benchmarks/resultados/<fecha>_<etiqueta>.json.
+Con --comparar se imprime la variación por etapa y se sale con código 1 si
+alguna etapa empeoró más que --umbral (útil en CI).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from servidor_seia import ProyectoSintetico, ServidorSEIA  # noqa: E402
+from src.controllers import down_anexos, fetch_anexos, fetch_exeva  # noqa: E402
+from src.controllers.compilar import compilar_tomos  # noqa: E402
+from src.controllers.foliar import foliar_expediente  # noqa: E402
+from src.controllers.indexar import indexar_exeva  # noqa: E402
+from src.controllers.indice import generar_indice  # noqa: E402
+from src.controllers.unpack import unpack_exeva_archives  # noqa: E402
+
+RESULTADOS_DIR = Path(__file__).resolve().parent / "resultados"
+ID_PROYECTO = "9999000001"
+MIN_DIFERENCIA = 0.05  # segundos: por debajo, la variación se considera ruido
+
+Log = Callable[[str], None] | None
+
+
+def _documentos(idp: str) -> list:
+    return (fetch_anexos._load_payload(idp).get("EXEVA") or {}).get("documentos") or []
+
+
+# --- Etapas: cada una retorna los ítems procesados (para la tasa) ---
+
+def _exeva(idp: str, log: Log) -> int:
+    exeva_data = fetch_exeva._extract_exeva(idp, log=log)
+    fetch_exeva._save_exeva_data(idp, exeva_data, "edicion", log=log or (lambda _msg: None))
+    return len(exeva_data["EXEVA"]["documentos"])
+
+
+def _exeva_descarga(idp: str, log: Log) -> int:
+    exeva_data = fetch_anexos._load_payload(idp)
+    fetch_exeva._download_documents(idp, exeva_data, log=log)
+    fetch_exeva._save_exeva_data(idp, exeva_data, "edicion", log=log or (lambda _msg: None))
+    return sum(1 for d in exeva_data["EXEVA"]["documentos"] if d.get("ruta"))
+
+
+def _anexos(idp: str, log: Log) -> int:
+    fetch_anexos.detect_attachments(idp, log=log)
+    return len(_documentos(idp))
+
+
+def _descargar_anexos(idp: str, log: Log) -> int:
+    exeva = down_anexos.download_attachments_files(idp, log=log)
+    return sum(1 for d in exeva.get("documentos", []) for a in d.get("anexos_detectados") or [] if a.get("ruta"))
+
+
+def _descomprimir(idp: str, log: Log) -> int:
+    exeva = unpack_exeva_archives(idp, log=log)
+    return sum(1 for d in exeva.get("documentos", []) for a in d.get("anexos_detectados") or [] if a.get("descomprimidos"))
+
+
+def _indexar(idp: str, log: Log) -> int:
+    indexar_exeva(idp, log=log)
+    return len(_documentos(idp))
+
+
+def _foliar(idp: str, log: Log) -> int:
+    return len(foliar_expediente(idp, log=log).get("mapa", {}))
+
+
+def _compilar(idp: str, log: Log) -> int:
+    return len(compilar_tomos(idp, log=log).get("tomos", []))
+
+
+def _indice(idp: str, log: Log) -> int:
+    return generar_indice(idp, log=log).get("total", 0)
+
+
+ETAPAS: Dict[str, Callable[[str, Log], int]] = {
+    "exeva": _exeva,
+    "exeva_descarga": _exeva_descarga,
+    "anexos": _anexos,
+    "descargar_anexos": _descargar_anexos,
+    "descomprimir": _descomprimir,
+    "indexar": _indexar,
+    "foliar": _foliar,
+    "compilar": _compilar,
+    "indice": _indice,
+}
+
+
+def _apuntar_a(url: str) -> None:
+    """Redirige las consultas a SEIA hacia el servidor local."""
+    fetch_exeva.BASE_URL = url
+    fetch_exeva.EXEVA_URL_TEMPLATES = [url + "/expediente/xhr_expediente2.php?id_expediente={IDP}"]
+    fetch_anexos.BASE_URL = url
+
+
+def _preparar_proyecto(idp: str) -> None:
+    carpeta = Path(os.getcwd()) / "Ebook" / idp
+    carpeta.mkdir(parents=True, exist_ok=True)
+    fetch = {
+        "id": idp,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "summary": {"found": 2},
+        "expedientes": {
+            "ANTGEN": {"ANTGEN_DATA": {
+                "nombre_proyecto": "Proyecto sintético de benchmark",
+                "titular": {"nombre": "Titular Sintético S.A."},
+                "region": "Región de Prueba",
+            }},
+            "EXEVA": {"estado": "pendiente"},
+        },
+    }
+    (carpeta / f"{idp}_fetch.json").write_text(json.dumps(fetch, indent=4, ensure_ascii=False), encoding="utf-8")
+
+
+def medir_tamano(tamano: int, etapas: list[str], args) -> Dict[str, dict]:
+    log = (lambda msg: print(msg, file=sys.stderr)) if args.verbose else None
+    proyecto = ProyectoSintetico(tamano, anexos_por_doc=args.anexos, zip_cada=args.zip_cada)
+    trabajo = Path(tempfile.mkdtemp(prefix=f"edj_bench_{tamano}_"))
+    origen = os.getcwd()
+    resultados: Dict[str, dict] = {}
+    try:
+        os.chdir(trabajo)
+        _preparar_proyecto(ID_PROYECTO)
+        with ServidorSEIA(proyecto, latencia=args.latencia_ms / 1000) as servidor:
+            _apuntar_a(servidor.url)
+            for etapa in etapas:
+                solicitudes0, bytes0 = servidor.contadores()
+                inicio = time.perf_counter()
+                try:
+                    items, error = ETAPAS[etapa](ID_PROYECTO, log), None
+                except Exception as exc:
+                    items, error = 0, str(exc)
+                segundos = time.perf_counter() - inicio
+                solicitudes1, bytes1 = servidor.contadores()
+                resultados[etapa] = {
+                    "segundos": round(segundos, 3),
+                    "items": items,
+                    "items_por_segundo": round(items / segundos, 2) if segundos > 0 else 0.0,
+                    "solicitudes": solicitudes1 - solicitudes0,
+                    "bytes": bytes1 - bytes0,
+                }
+                if error:
+                    resultados[etapa]["error"] = error
+                estado = f"❌ {error}" if error else f"{items} ítems"
+                print(f"  {etapa:<17} {segundos:9.3f} s  {estado}", flush=True)
+    finally:
+        os.chdir(origen)
+        if args.conservar:
+            print(f"  (proyecto conservado en {trabajo})")
+        else:
+            shutil.rmtree(trabajo, ignore_errors=True)
+    return resultados
+
+
+def _commit_actual() -> str:
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, timeout=10
+        )
+        return salida.stdout.strip() or "desconocido"
+    except Exception:
+        return "desconocido"
+
+
+def comparar(actual: dict, previo: dict, umbral: float) -> bool:
+    """Imprime la variación por tamaño y etapa. Retorna True si hay regresiones."""
+    regresion = False
+    print(f"\nComparación con '{previo.get('etiqueta')}' ({previo.get('commit')}, {previo.get('fecha')}):")
+    for tamano, etapas in actual["resultados"].items():
+        anteriores = previo.get("resultados", {}).get(tamano)
+        if not anteriores:
+            print(f"  {tamano} documentos: sin datos previos.")
+            continue
+        print(f"  {tamano} documentos:")
+        for etapa, datos in etapas.items():
+            antes = anteriores.get(etapa, {}).get("segundos")
+            if antes is None:
+                continue
+            ahora = datos["segundos"]
+            variacion = (ahora - antes) / antes if antes > 0 else 0.0
+            peor = variacion > umbral and ahora - antes > MIN_DIFERENCIA
+            regresion = regresion or peor
+            marca = "⚠️ regresión" if peor else ("✅" if variacion < -umbral else "")
+            print(f"    {etapa:<17} {antes:9.3f} s → {ahora:9.3f} s  ({variacion:+.0%}) {marca}")
+    return regresion
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline EDJ con SEIA simulado.")
+    parser.add_argument("--tamanos", default="100", help="Documentos por proyecto, separados por coma (p. ej. 100,1000,10000)")
+    parser.add_argument("--etapas", default=",".join(ETAPAS), help=f"Etapas a medir. Disponibles: {', '.join(ETAPAS)}")
+    parser.add_argument("--anexos", type=int, default=2, help="Anexos PDF por documento (por defecto 2)")
+    parser.add_argument("--zip-cada", type=int, default=4, help="Un anexo ZIP cada N documentos (0: ninguno)")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latencia simulada por respuesta HTTP")
+    parser.add_argument("--etiqueta", help="Nombre de la ejecución (por defecto, el commit actual)")
+    parser.add_argument("--salida", default=str(RESULTADOS_DIR), help="Carpeta donde guardar el resultado")
+    parser.add_argument("--comparar", help="Resultado previo (JSON) contra el cual comparar")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Empeoramiento tolerado al comparar (0.2 = 20%%)")
+    parser.add_argument("--conservar", action="store_true", help="No borrar los proyectos generados")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los mensajes de log de las etapas")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    etapas = [e.strip() for e in args.etapas.split(",") if e.strip()]
+    desconocidas = [e for e in etapas if e not in ETAPAS]
+    if desconocidas:
+        print(f"❌ Etapas desconocidas: {', '.join(desconocidas)}", file=sys.stderr)
+        return 2
+    tamanos = [int(t) for t in args.tamanos.split(",") if t.strip()]
+
+    commit = _commit_actual()
+    resultado = {
+        "etiqueta": args.etiqueta or commit,
+        "commit": commit,
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "anexos_por_doc": args.anexos,
+            "zip_cada": args.zip_cada,
+            "latencia_ms": args.latencia_ms,
+            "etapas": etapas,
+        },
+        "resultados": {},
+    }
+    for tamano in tamanos:
+        print(f"⏳ Proyecto sintético de {tamano} documentos:", flush=True)
+        resultado["resultados"][str(tamano)] = medir_tamano(tamano, etapas, args)
+
+    salida = Path(args.salida)
+    salida.mkdir(parents=True, exist_ok=True)
+    etiqueta = "".join(c if c.isalnum() or c in "-_." else "_" for c in resultado["etiqueta"])
+    ruta = salida / f"{time.strftime('%Y%m%d_%H%M%S')}_{etiqueta}.json"
+    ruta.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"💾 Resultado guardado en {ruta}")
+
+    if args.comparar:
+        previo = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        if comparar(resultado, previo, args.umbral):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
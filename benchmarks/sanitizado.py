@@ -0,0 +1,74 @@
+"""
+Paridad de sanitize_text con BeautifulSoup.
+
+sanitize_text (src/templates/base_report.py) limpia el HTML "simple" con una
+regex y deja el resto a BeautifulSoup. Este script genera textos al azar con
+etiquetas, espacios y entidades (completas, sin ';', desconocidas, numéricas
+fuera de rango...) y verifica que el resultado sea idéntico al de
+BeautifulSoup.get_text(separator="\\n"). Sale con código 1 ante la primera
+diferencia; conviene correrlo al tocar _ETIQUETAS_SIMPLES, _HTML_SIMPLE,
+_ENTIDAD o _texto_simple.
+
+Ejemplos:
+    python benchmarks/sanitizado.py
+    python benchmarks/sanitizado.py --casos 200000 --semilla 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from html import escape
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from src.templates import base_report  # noqa: E402
+
+PIEZAS = [
+    "a", "b ", " ", "\n", "\t", "\r", "\xa0", "ñ", "á", ";", "&", "x=1&y=2",
+    "<p>", "</p>", "<br>", "<br/>", "<b>", "</b>", "<a href='x'>", "</a>", '<p class="a&amp;b">',
+    "<!-- c -->", "<script>x</script>", "<template>a</template>", "<pre>", "</pre>", "<textarea>",
+    "<title>t</title>", "<xmp>", "<P>", "<BR />", "<li>", "<h2>", "<br x='1'/>", "</br>", "<hr>", "</HR>",
+    "&amp;", "&amp", "&AMP;", "&AMP", "&ampx", "&amp;amp;", "&lt", "&lt;", "&gt", "&nbsp", "&nbsp;",
+    "&copy", "&eacute", "&Aacute;", "&notin", "&notit;", "&foo;",
+    "&#65;", "&#65", "&#0065;", "&#x41;", "&#X41;", "&#x41", "&#;", "&#0;", "&#x0;", "&#13;",
+    "&#128;", "&#150;", "&#xD800;", "&#x110000;", "&#99999999999;",
+]
+
+
+def referencia(texto: str) -> str:
+    return escape(BeautifulSoup(texto, "html.parser").get_text(separator="\n").strip())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Paridad de sanitize_text con BeautifulSoup.")
+    parser.add_argument("--casos", type=int, default=50000, help="Textos aleatorios a comparar")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(args.semilla)
+    sanitizar = base_report.sanitize_text.__wrapped__  # sin la memoización
+    comparados = rapidos = 0
+    for _ in range(args.casos):
+        texto = "".join(rnd.choice(PIEZAS) for _ in range(rnd.randint(1, 12)))
+        if "<" not in texto or ">" not in texto:
+            continue
+        comparados += 1
+        if base_report._HTML_SIMPLE.fullmatch(texto):
+            rapidos += 1
+        obtenido, esperado = sanitizar(texto), referencia(texto)
+        if obtenido != esperado:
+            print(f"❌ Diferencia para {texto!r}:\n   sanitize_text: {obtenido!r}\n   BeautifulSoup: {esperado!r}")
+            return 1
+
+    print(f"✅ {comparados} textos idénticos a BeautifulSoup ({rapidos} con HTML simple).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
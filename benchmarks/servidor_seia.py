@@ -0,0 +1,206 @@
+"""
+Servidor HTTP local que reemplaza a SEIA en los benchmarks.
+
+Sirve las páginas grabadas de fixtures/ (tabla de documentos EXEVA y páginas
+de anexos) rellenadas para un proyecto sintético de N documentos, más los
+binarios (PDF y ZIP) generados una sola vez en memoria:
+
+    /expediente/xhr_expediente2.php?id_expediente=<id>   tabla de N documentos
+    /elementosFisicos/enviados.php?id_documento=<n>      anexos del documento n
+    /archivos/doc_<n>.pdf                                documento principal
+    /archivos/anexo_<n>_<j>.pdf                          anexo j del documento n
+    /archivos/comprimido_<n>.zip                         ZIP con PDF en subcarpetas
+
+Cuenta solicitudes y bytes servidos para que el runner los reporte por etapa.
+Con 'latencia' (segundos) cada respuesta espera antes de enviarse, para
+aproximar la red real.
+"""
+
+from __future__ import annotations
+
+import io
+import re
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from string import Template
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def _plantilla(nombre: str) -> Template:
+    return Template((FIXTURES_DIR / nombre).read_text(encoding="utf-8"))
+
+
+def _pdf(paginas: int, etiqueta: str) -> bytes:
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    for i in range(paginas):
+        c.drawString(72, 760, f"{etiqueta} - página {i + 1}")
+        c.drawString(72, 740, "Documento sintético para benchmarks del pipeline EDJ.")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _zip(contenido: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for nombre, datos in contenido.items():
+            zf.writestr(nombre, datos)
+    return buffer.getvalue()
+
+
+class ProyectoSintetico:
+    """Contenido de un proyecto SEIA sintético de 'documentos' documentos."""
+
+    def __init__(self, documentos: int, anexos_por_doc: int = 2, zip_cada: int = 4, paginas: int = 3):
+        self.documentos = documentos
+        self.anexos_por_doc = anexos_por_doc
+        self.zip_cada = zip_cada  # un ZIP cada 'zip_cada' documentos (0: ninguno)
+
+        self._fila_doc = _plantilla("fila_documento.html")
+        self._fila_anexo = _plantilla("fila_anexo.html")
+        self._tabla = _plantilla("xhr_expediente2.html")
+        self._enviados = _plantilla("enviados.html")
+
+        # Los binarios son iguales para todos los documentos: se generan una vez.
+        self.pdf_documento = _pdf(paginas, "Documento")
+        self.pdf_anexo = _pdf(1, "Anexo")
+        self.zip_anexo = _zip({
+            "planos/plano_general.pdf": self.pdf_anexo,
+            "planos/detalle/plano_detalle.pdf": self.pdf_anexo,
+            "informes/informe.pdf": self.pdf_documento,
+        })
+
+    def tiene_zip(self, n: int) -> bool:
+        return bool(self.zip_cada) and n % self.zip_cada == 0
+
+    def tabla_documentos(self) -> str:
+        filas = "\n".join(
+            self._fila_doc.substitute(
+                n=n,
+                num_doc=f"{n}/2024",
+                folio=str(n * 10),
+                titulo=f"Documento sintético {n}",
+                remitido_por="Titular del proyecto" if n % 2 else "SEA",
+                fecha=f"{1 + n % 28:02d}/{1 + n % 12:02d}/2024",
+                minuto=f"{n % 60:02d}",
+            )
+            for n in range(1, self.documentos + 1)
+        )
+        return self._tabla.substitute(filas=filas)
+
+    def pagina_anexos(self, n: int) -> str:
+        anexos = [(f"anexo_{n}_{j}.pdf", f"Anexo {j + 1}", len(self.pdf_anexo)) for j in range(self.anexos_por_doc)]
+        if self.tiene_zip(n):
+            anexos.append((f"comprimido_{n}.zip", "Anexos comprimidos", len(self.zip_anexo)))
+        filas = "\n".join(
+            self._fila_anexo.substitute(
+                archivo=archivo, titulo=titulo, descripcion=f"{titulo} del documento {n}", tamano=f"{tamano} B"
+            )
+            for archivo, titulo, tamano in anexos
+        )
+        return self._enviados.substitute(filas=filas)
+
+    def binario(self, nombre: str) -> bytes | None:
+        if re.fullmatch(r"doc_\d+\.pdf", nombre):
+            return self.pdf_documento
+        if re.fullmatch(r"anexo_\d+_\d+\.pdf", nombre):
+            return self.pdf_anexo
+        if re.fullmatch(r"comprimido_\d+\.zip", nombre):
+            return self.zip_anexo
+        return None
+
+
+class _Servidor(ThreadingHTTPServer):
+    # La cola por defecto (5) desborda con los pools de 8-10 hilos del pipeline
+    # y el reintento de conexión del cliente agrega ~1 s a la medición.
+    request_queue_size = 128
+
+
+class ServidorSEIA:
+    """Servidor en un hilo propio; usar como context manager."""
+
+    def __init__(self, proyecto: ProyectoSintetico, latencia: float = 0.0):
+        self.proyecto = proyecto
+        self.latencia = latencia
+        self.solicitudes = 0
+        self.bytes_servidos = 0
+        self._lock = threading.Lock()
+        self._httpd = _Servidor(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._hilo = threading.Thread(target=self._httpd.serve_forever, name="ServidorSEIA", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def contadores(self) -> tuple[int, int]:
+        with self._lock:
+            return self.solicitudes, self.bytes_servidos
+
+    def _registrar(self, n_bytes: int) -> None:
+        with self._lock:
+            self.solicitudes += 1
+            self.bytes_servidos += n_bytes
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # silencioso
+                pass
+
+            def _responder(self, cuerpo: bytes | None, tipo: str) -> None:
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                if cuerpo is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(cuerpo)
+                servidor._registrar(len(cuerpo))
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                qs = parse_qs(url.query)
+                proyecto = servidor.proyecto
+                if url.path == "/expediente/xhr_expediente2.php":
+                    self._responder(proyecto.tabla_documentos().encode("utf-8"), "text/html; charset=utf-8")
+                elif url.path == "/elementosFisicos/enviados.php":
+                    n = int((qs.get("id_documento") or ["0"])[0])
+                    cuerpo = proyecto.pagina_anexos(n).encode("utf-8") if 1 <= n <= proyecto.documentos else None
+                    self._responder(cuerpo, "text/html; charset=utf-8")
+                elif url.path.startswith("/archivos/"):
+                    nombre = url.path.rsplit("/", 1)[-1]
+                    tipo = "application/zip" if nombre.endswith(".zip") else "application/pdf"
+                    self._responder(proyecto.binario(nombre), tipo)
+                else:
+                    self._responder(None, "")
+
+            do_HEAD = do_GET
+
+        return Handler
+
+    def __enter__(self) -> "ServidorSEIA":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,183 @@
+"""
+Ejecución por lotes del pipeline EDJ sin interfaz gráfica.
+
+Ejemplos:
+    python cli.py 2160123456 2160654321
+    python cli.py --ids-file ids.txt --workers 4 --json > progreso.jsonl
+    python cli.py 2160123456 --etapas exeva,anexos,descargar_anexos,descomprimir,indexar
+    python cli.py 2160123456 --profile   # perfil por etapa en Ebook/<id>/perfil/
+    python cli.py --buscar "Minera Los Andes" --campo titular
+    python cli.py --buscar "artículo 140" --textos --json
+
+El progreso se emite como eventos (una línea JSON por evento con --json);
+los mensajes de log van a stderr. Ctrl+C detiene el lote guardando el avance
+de cada proyecto (la siguiente ejecución lo retoma).
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.controllers import catalogo, perfilado
+from src.controllers.pipeline import ETAPAS, ETAPAS_POR_DEFECTO, run_pipeline
+from src.controllers.utils import CancelToken
+
+_print_lock = threading.Lock()
+INTERVALO_PROGRESO = 2.0  # segundos entre líneas de progreso por proyecto y fase (modo texto)
+
+
+def _leer_ids(args) -> list[str]:
+    ids = list(args.ids)
+    if args.ids_file:
+        with open(args.ids_file, "r", encoding="utf-8") as f:
+            ids += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    # Sin duplicados, respetando el orden
+    return list(dict.fromkeys(i for i in ids if i.isdigit()))
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline EDJ por lotes (sin interfaz gráfica).")
+    parser.add_argument("ids", nargs="*", help="IDs de proyecto SEIA")
+    parser.add_argument("--ids-file", help="Archivo con un ID por línea")
+    parser.add_argument(
+        "--etapas", default=",".join(ETAPAS_POR_DEFECTO),
+        help=f"Etapas separadas por coma. Disponibles: {', '.join(ETAPAS)}",
+    )
+    parser.add_argument("--workers", type=int, default=2, help="Proyectos en paralelo (por defecto 2)")
+    parser.add_argument("--dir", help="Carpeta de trabajo (contiene Ebook/); por defecto la actual")
+    parser.add_argument("--json", action="store_true", help="Emitir el progreso como JSON por línea")
+    parser.add_argument("--quiet", action="store_true", help="No mostrar los mensajes de log")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Medir las rutas críticas y exportar trace/resumen por etapa (también EDJ_PROFILE=1)",
+    )
+    busqueda = parser.add_argument_group("búsqueda entre proyectos (en vez de ejecutar el pipeline)")
+    busqueda.add_argument("--buscar", metavar="TEXTO", help="Buscar en el catálogo de todos los proyectos de Ebook/")
+    busqueda.add_argument(
+        "--campo", default="todo", choices=list(catalogo.CAMPOS_BUSQUEDA),
+        help="Dónde buscar (por defecto: antecedentes y documentos)",
+    )
+    busqueda.add_argument("--textos", action="store_true", help="Incluir el texto indexado de los PDF (más lento)")
+    busqueda.add_argument("--limite", type=int, default=50, help="Máximo de proyectos a listar")
+    return parser.parse_args(argv)
+
+
+def _buscar(args) -> int:
+    """Resincroniza el catálogo (sólo lo que cambió) y lista los proyectos que coinciden."""
+    log = None if args.quiet else (lambda msg: print(msg, file=sys.stderr, flush=True))
+    catalogo.reescanear(log=log)
+    resultados = catalogo.buscar_global(args.buscar, args.campo, limite=args.limite, incluir_textos=args.textos)
+    for proyecto in resultados:
+        if args.json:
+            print(json.dumps(proyecto, ensure_ascii=False), flush=True)
+            continue
+        print(f"📁 {proyecto['id']}  {proyecto['nombre']}")
+        for hit in proyecto["coincidencias"]:
+            donde = hit["fuente"] + (f" {hit['n']}" if hit.get("n") else "")
+            if hit.get("pagina"):
+                donde += f" p.{hit['pagina']}"
+            print(f"    [{donde}] {hit['fragmento']}")
+    if not args.json:
+        print(f"{len(resultados)} proyectos.", file=sys.stderr)
+    return 0 if resultados else 1
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    if args.buscar:
+        if args.dir:
+            os.chdir(args.dir)
+        return _buscar(args)
+    ids = _leer_ids(args)
+    if not ids:
+        print("⚠️ No se indicaron IDs válidos.", file=sys.stderr)
+        return 2
+    etapas = [e.strip() for e in args.etapas.split(",") if e.strip()]
+    desconocidas = [e for e in etapas if e not in ETAPAS]
+    if desconocidas:
+        print(f"❌ Etapas desconocidas: {', '.join(desconocidas)}", file=sys.stderr)
+        return 2
+    if args.dir:
+        os.chdir(args.dir)
+    if args.profile:
+        perfilado.activar(True)
+
+    ultimo_progreso: dict[tuple, float] = {}
+
+    def emitir(evento: dict) -> None:
+        with _print_lock:
+            if args.json:
+                print(json.dumps(evento, ensure_ascii=False), flush=True)
+            elif evento["evento"] == "progreso":
+                clave = (evento["id"], evento["fase"])
+                ahora = time.monotonic()
+                reciente = ahora - ultimo_progreso.get(clave, 0) < INTERVALO_PROGRESO
+                if args.quiet or (reciente and not evento["terminado"]):
+                    return
+                ultimo_progreso[clave] = ahora
+                print(f"⏳ [{evento['id']}] {evento['texto']}", file=sys.stderr, flush=True)
+            elif evento["evento"] == "lote_fin":
+                print(f"Lote finalizado: {evento['total']} proyectos, {evento['fallidos']} con errores.", flush=True)
+            elif evento["evento"] in ("etapa_fin", "etapa_omitida", "proyecto_fin"):
+                estado = "✅" if evento.get("ok", True) else "❌"
+                if evento.get("estado") == "detenida":
+                    estado = "⏹️"
+                detalle = evento.get("etapa") or "proyecto"
+                if evento["evento"] == "etapa_omitida":
+                    estado, detalle = "⏭️", f"{detalle} omitida ({evento['motivo']})"
+                print(f"{estado} [{evento['id']}] {detalle}", flush=True)
+
+    def make_log(idp: str):
+        if args.quiet:
+            return None
+
+        def log(message: str) -> None:
+            with _print_lock:
+                print(f"[{idp}] {message}", file=sys.stderr, flush=True)
+        return log
+
+    fallidos = 0
+    cancel = CancelToken()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.workers))
+    futures = {
+        executor.submit(run_pipeline, idp, etapas, make_log(idp), emitir, cancel): idp for idp in ids
+    }
+    pendientes = set(futures)
+    while pendientes:
+        try:
+            listos, pendientes = concurrent.futures.wait(pendientes, timeout=0.5)
+        except KeyboardInterrupt:
+            if cancel.cancelled:
+                raise
+            cancel.cancel()
+            print("⏹️ Deteniendo: se guarda el avance de cada proyecto (Ctrl+C de nuevo para abortar)...",
+                  file=sys.stderr, flush=True)
+            continue
+        for future in listos:
+            idp = futures[future]
+            try:
+                if not future.result()["ok"]:
+                    fallidos += 1
+            except Exception as exc:
+                fallidos += 1
+                emitir({"evento": "proyecto_fin", "id": idp, "ok": False, "error": str(exc)})
+    executor.shutdown()
+
+    emitir({
+        "evento": "lote_fin", "id": None, "total": len(ids), "fallidos": fallidos,
+        "ok": fallidos == 0, "detenido": cancel.cancelled,
+    })
+    return 130 if cancel.cancelled else (1 if fallidos else 0)
+
+
+if __name__ == '__main__':
+    # Necesario para los pools de procesos (foliado, reportes) en ejecutables congelados.
+    multiprocessing.freeze_support()
+    sys.exit(main())
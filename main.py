@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 
 # Ajuste de path (según tu archivo original)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -23,4 +24,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    # Necesario para los pools de procesos (p. ej. foliado) en ejecutables congelados.
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -4,29 +4,41 @@ import os
 import json
 from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
 
-# Importamos la nueva clase plantilla
-from src.templates.antgen_report import AntGenReport
+# El diseño visual vive en src.templates.antgen_report.AntGenReport;
+# el renderizado corre en el pool de procesos de render_service.
+from src.controllers.render_service import RenderController
 
 class AntgenCompiler(QObject):
     """
     Controlador encargado de la compilación del PDF de Antecedentes Generales.
-    Delega el diseño visual a src.templates.antgen_report.AntGenReport.
+    Delega el diseño visual a src.templates.antgen_report.AntGenReport y la
+    generación al servicio de renderizado (en segundo plano, sin congelar la UI).
     """
 
     log_requested = pyqtSignal(str)
     compilation_started = pyqtSignal()
+    compilation_progress = pyqtSignal(int, int)
     compilation_finished = pyqtSignal(bool, str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._output_path = ""
+        self.render = RenderController(self)
+        self.render.log_requested.connect(self.log_requested.emit)
+        self.render.render_progress.connect(self.compilation_progress.emit)
+        self.render.render_finished.connect(self._on_render_finished)
 
     @pyqtSlot(str, dict)
     def compile_pdf(self, project_id: str, antgen_payload: dict | None = None):
         """
-        Inicia el proceso de compilación.
+        Inicia el proceso de compilación (asíncrono; el resultado llega por compilation_finished).
         :param project_id: ID del expediente.
         :param antgen_payload: Diccionario con los datos. Si es None, intenta cargar del JSON.
         """
+        if self.render.is_running():
+            self.log_requested.emit("⚠️ La compilación ya está en curso.")
+            return
+
         self.compilation_started.emit()
         self.log_requested.emit(f"⚙️ Preparando compilación para ID {project_id}...")
 
@@ -39,20 +51,26 @@ class AntgenCompiler(QObject):
             # 2. Definir ruta de salida
             base_folder = os.path.join(os.getcwd(), "Ebook", project_id)
             os.makedirs(base_folder, exist_ok=True)
-            output_path = os.path.join(base_folder, f"ANTGEN_{project_id}.pdf")
-
-            # 3. Instanciar la Plantilla y Generar
-            # Aquí ocurre la magia visual
-            report = AntGenReport(output_path)
-            report.build(payload)
+            self._output_path = os.path.join(base_folder, f"ANTGEN_{project_id}.pdf")
 
-            self.log_requested.emit(f"✅ PDF generado exitosamente: {output_path}")
-            self.compilation_finished.emit(True, output_path)
+            # 3. Encolar el reporte en el servicio de renderizado
+            self.render.start_render([
+                {"reporte": "antgen", "salida": self._output_path, "data": payload}
+            ])
 
         except Exception as exc:
             self.log_requested.emit(f"❌ Error crítico al compilar PDF: {exc}")
-            import traceback
-            traceback.print_exc()
+            self.compilation_finished.emit(False, "")
+
+    def cancel(self) -> None:
+        self.render.cancel()
+
+    def _on_render_finished(self, success: bool, _data: dict) -> None:
+        if success:
+            self.log_requested.emit(f"✅ PDF generado exitosamente: {self._output_path}")
+            self.compilation_finished.emit(True, self._output_path)
+        else:
+            self.log_requested.emit("❌ Error crítico al compilar PDF.")
             self.compilation_finished.emit(False, "")
 
     def _load_antgen_payload(self, project_id: str) -> dict:
@@ -0,0 +1,317 @@
+"""
+Búsqueda de texto completo en los PDF de un proyecto.
+
+Indexa la capa de texto de cada PDF del expediente (documentos, anexos,
+vinculados y descomprimidos, en el orden de recorrido.py) en una base SQLite
+FTS5 por proyecto: Ebook/<id>/EXEVA/<id>_busqueda.sqlite, una fila por página.
+La extracción corre en un pool de procesos y sólo se procesan los archivos
+nuevos o cuyo tamaño/mtime cambió; buscar() responde en milisegundos con el
+archivo, la página y un fragmento de cada coincidencia.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from . import perfilado
+from .progreso import ProgressEvent, ProgressTracker
+from .recorrido import get_project_root, is_pdf_entry, iter_entradas, load_exeva_payload
+from .utils import CancelToken, log as _log
+
+LIMITE_RESULTADOS = 200
+INTERVALO_COMMIT = 2.0  # segundos entre confirmaciones mientras se indexa
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    clave    TEXT PRIMARY KEY,   -- 'ruta' del JSON (igual que en foliar/indice)
+    ruta     TEXT,
+    n        TEXT,
+    titulo   TEXT,
+    tipo     TEXT,
+    tamano   INTEGER,
+    mtime_ns INTEGER,
+    paginas  INTEGER,
+    error    TEXT
+);
+CREATE TABLE IF NOT EXISTS paginas (
+    id     INTEGER PRIMARY KEY,  -- rowid en textos
+    clave  TEXT,
+    pagina INTEGER
+);
+CREATE INDEX IF NOT EXISTS paginas_clave ON paginas (clave);
+CREATE VIRTUAL TABLE IF NOT EXISTS textos USING fts5(
+    texto, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def get_search_db_path(idp: str) -> Path:
+    return get_project_root(idp) / "EXEVA" / f"{idp}_busqueda.sqlite"
+
+
+def _conectar(idp: str) -> sqlite3.Connection:
+    path = get_search_db_path(idp)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_ESQUEMA)
+    return conn
+
+
+def _extraer_paginas(path: str) -> List[str]:
+    """Texto de cada página. Se ejecuta en un proceso del pool."""
+    from pypdf import PdfReader
+
+    paginas = []
+    for page in PdfReader(path).pages:
+        try:
+            paginas.append(page.extract_text() or "")
+        except Exception:
+            paginas.append("")
+    return paginas
+
+
+def _borrar_textos(conn: sqlite3.Connection, clave: str) -> None:
+    conn.execute("DELETE FROM textos WHERE rowid IN (SELECT id FROM paginas WHERE clave = ?)", (clave,))
+    conn.execute("DELETE FROM paginas WHERE clave = ?", (clave,))
+
+
+def _guardar_textos(conn: sqlite3.Connection, clave: str, textos: List[str]) -> int:
+    _borrar_textos(conn, clave)
+    guardadas = 0
+    for numero, texto in enumerate(textos, 1):
+        texto = " ".join(texto.split())
+        if not texto:  # página escaneada sin capa de texto
+            continue
+        cur = conn.execute("INSERT INTO paginas (clave, pagina) VALUES (?, ?)", (clave, numero))
+        conn.execute("INSERT INTO textos (rowid, texto) VALUES (?, ?)", (cur.lastrowid, texto))
+        guardadas += 1
+    return guardadas
+
+
+_UPSERT_ARCHIVO = """
+INSERT INTO archivos (clave, ruta, n, titulo, tipo, tamano, mtime_ns, paginas, error)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(clave) DO UPDATE SET ruta=excluded.ruta, n=excluded.n, titulo=excluded.titulo, tipo=excluded.tipo,
+    tamano=excluded.tamano, mtime_ns=excluded.mtime_ns, paginas=excluded.paginas, error=excluded.error
+"""
+
+
+def indexar_textos(idp: str, log: Callable[[str], None] | None = None,
+                   cancel: CancelToken | None = None,
+                   progress: Callable[[ProgressEvent], None] | None = None,
+                   workers: int | None = None) -> dict:
+    """
+    Actualiza el índice de búsqueda del proyecto. Retorna un resumen
+    ({} si no hay datos EXEVA).
+    """
+    exeva = load_exeva_payload(idp).get("EXEVA")
+    if not isinstance(exeva, dict):
+        _log(log, "[BÚSQUEDA] No hay datos EXEVA para indexar.")
+        return {}
+
+    project_root = get_project_root(idp)
+    entradas: Dict[str, Dict[str, Any]] = {}
+    for entry in iter_entradas(exeva, project_root):
+        if is_pdf_entry(entry) and entry["clave"] not in entradas:
+            entradas[entry["clave"]] = entry
+
+    resumen = {"archivos": len(entradas), "actualizados": 0, "eliminados": 0, "errores": 0, "paginas": 0}
+    with closing(_conectar(idp)) as conn:
+        conocidos = {clave: (tamano, mtime) for clave, tamano, mtime in
+                     conn.execute("SELECT clave, tamano, mtime_ns FROM archivos")}
+
+        # Archivos que ya no están en el expediente.
+        with conn:
+            for clave in set(conocidos) - set(entradas):
+                _borrar_textos(conn, clave)
+                conn.execute("DELETE FROM archivos WHERE clave = ?", (clave,))
+                resumen["eliminados"] += 1
+
+        cambiados = []
+        metadatos = []
+        for clave, entry in entradas.items():
+            try:
+                stat = entry["path"].stat()
+            except OSError:
+                continue
+            entry["tamano"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+            if conocidos.get(clave) == (stat.st_size, stat.st_mtime_ns):
+                # Sin cambios en el archivo: sólo se refrescan número y título.
+                metadatos.append((entry["ruta"], entry["n"], entry["titulo"], entry["tipo"], clave))
+            else:
+                cambiados.append(entry)
+        with conn:
+            conn.executemany("UPDATE archivos SET ruta=?, n=?, titulo=?, tipo=? WHERE clave=?", metadatos)
+
+        if not cambiados:
+            _log(log, f"[BÚSQUEDA] Índice al día ({len(entradas)} PDF).")
+            return resumen
+
+        max_workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        _log(log, f"[BÚSQUEDA] Extrayendo texto de {len(cambiados)} de {len(entradas)} PDF ({max_workers} procesos)...")
+        progreso = ProgressTracker("Búsqueda", len(cambiados), progress)
+        ultimo_commit = time.monotonic()
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {executor.submit(_extraer_paginas, str(e["path"])): e for e in cambiados}
+            for future in concurrent.futures.as_completed(futures):
+                if cancel is not None and not cancel.check():
+                    break
+                entry = futures[future]
+                error = None
+                try:
+                    textos = future.result()
+                except Exception as exc:
+                    textos, error = [], f"PDF ilegible: {exc}"
+                    resumen["errores"] += 1
+                with perfilado.span("busqueda.guardar"):
+                    resumen["paginas"] += _guardar_textos(conn, entry["clave"], textos)
+                    conn.execute(_UPSERT_ARCHIVO, (
+                        entry["clave"], entry["ruta"], entry["n"], entry["titulo"], entry["tipo"],
+                        entry["tamano"], entry["mtime_ns"], len(textos), error,
+                    ))
+                resumen["actualizados"] += 1
+                progreso.avanzar()
+                if time.monotonic() - ultimo_commit >= INTERVALO_COMMIT:
+                    conn.commit()
+                    ultimo_commit = time.monotonic()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            conn.commit()
+            progreso.terminar()
+
+    if cancel is not None and cancel.cancelled:
+        _log(log, f"[BÚSQUEDA] Indexación detenida ({resumen['actualizados']}/{len(cambiados)}). "
+                  "Lo indexado se conserva.")
+    else:
+        _log(log, f"[BÚSQUEDA] {resumen['actualizados']} PDF indexados ({resumen['paginas']} páginas con texto, "
+                  f"{resumen['errores']} ilegibles).")
+    return resumen
+
+
+def consulta_fts(texto: str) -> str:
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5 segura: cada
+    término (o "frase entre comillas") debe aparecer; 'palabra*' busca por prefijo.
+    """
+    terminos = []
+    for token in re.findall(r'"[^"]*"|\S+', texto or ""):
+        prefijo = token.endswith("*") and not token.startswith('"')
+        limpio = token.strip('"*').replace('"', '""').strip()
+        if limpio:
+            terminos.append(f'"{limpio}"' + ("*" if prefijo else ""))
+    return " ".join(terminos)
+
+
+def buscar(idp: str, texto: str, limite: int = LIMITE_RESULTADOS) -> List[Dict[str, Any]]:
+    """
+    Coincidencias por página, las más relevantes primero. Cada una trae
+    clave, ruta, n, titulo, tipo, pagina y fragmento (término entre «»).
+    """
+    consulta = consulta_fts(texto)
+    if not consulta or not get_search_db_path(idp).exists():
+        return []
+    with closing(_conectar(idp)) as conn:
+        filas = conn.execute(
+            "SELECT a.clave, a.ruta, a.n, a.titulo, a.tipo, p.pagina, "
+            "snippet(textos, 0, '«', '»', '…', 16) "
+            "FROM textos JOIN paginas p ON p.id = textos.rowid JOIN archivos a ON a.clave = p.clave "
+            "WHERE textos MATCH ? ORDER BY textos.rank LIMIT ?",
+            (consulta, limite),
+        ).fetchall()
+    return [
+        {"clave": clave, "ruta": ruta, "n": n, "titulo": titulo, "tipo": tipo, "pagina": pagina, "fragmento": frag}
+        for clave, ruta, n, titulo, tipo, pagina, frag in filas
+    ]
+
+
+def estado_indice(idp: str) -> Dict[str, int]:
+    """Archivos y páginas indexadas (ceros si aún no hay índice)."""
+    if not get_search_db_path(idp).exists():
+        return {"archivos": 0, "paginas": 0}
+    with closing(_conectar(idp)) as conn:
+        archivos = conn.execute("SELECT COUNT(*) FROM archivos").fetchone()[0]
+        paginas = conn.execute("SELECT COUNT(*) FROM paginas").fetchone()[0]
+    return {"archivos": archivos, "paginas": paginas}
+
+
+class BusquedaIndexWorker(QObject):
+    finished_signal = pyqtSignal(bool, dict)
+    progress_signal = pyqtSignal(object)  # ProgressEvent
+    log_signal = pyqtSignal(str)
+
+    def __init__(self, project_id: str):
+        super().__init__()
+        self.project_id = project_id
+        self.cancel_token = CancelToken()
+
+    @pyqtSlot()
+    def run(self) -> None:
+        success = False
+        resumen: dict = {}
+        try:
+            with perfilado.sesion(self.project_id, "busqueda", self.log_signal.emit):
+                resumen = indexar_textos(
+                    self.project_id, log=self.log_signal.emit, cancel=self.cancel_token,
+                    progress=self.progress_signal.emit,
+                )
+            success = bool(resumen) and not self.cancel_token.cancelled
+        except Exception as exc:
+            self.log_signal.emit(f"❌ Error inesperado al indexar el texto de los PDF: {exc}")
+        self.finished_signal.emit(success, resumen)
+
+
+class BusquedaController(QObject):
+    index_started = pyqtSignal()
+    index_progress = pyqtSignal(object)  # ProgressEvent
+    index_finished = pyqtSignal(bool, dict)
+    log_requested = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker: BusquedaIndexWorker | None = None
+        self.thread: QThread | None = None
+
+    def is_running(self) -> bool:
+        return bool(self.thread and self.thread.isRunning())
+
+    def start_index(self, project_id: str) -> None:
+        if self.is_running():
+            self.log_requested.emit("⚠️ La indexación de texto ya está en curso.")
+            return
+
+        self.index_started.emit()
+        self.thread = QThread()
+        self.worker = BusquedaIndexWorker(project_id)
+
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+
+        self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.progress_signal.connect(self.index_progress.emit)
+        self.worker.finished_signal.connect(self.index_finished.emit)
+        self.worker.finished_signal.connect(self.thread.quit)
+        self.worker.finished_signal.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self._cleanup_thread)
+
+        self.thread.start()
+
+    def cancel(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.cancel()
+
+    def _cleanup_thread(self) -> None:
+        if self.thread:
+            self.thread.deleteLater()
+        self.thread = None
+        self.worker = None
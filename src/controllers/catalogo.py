@@ -0,0 +1,410 @@
+"""
+Catálogo de proyectos (Ebook/_catalogo.sqlite).
+
+Guarda una fila resumen por proyecto (ID, fecha, expedientes encontrados,
+nombre y estados) para que la página "Continuar" liste miles de proyectos
+con una sola consulta, sin abrir cada <id>_fetch.json (algunos traen un
+ANTGEN_DATA pesado). Quien escribe un <id>_fetch.json llama a registrar();
+reescanear() corrige lo que cambió por fuera comparando sólo mtimes.
+
+También es el índice de búsqueda entre proyectos: los campos de ANTGEN_DATA
+(tabla FTS5 'antecedentes') y los metadatos de cada documento EXEVA (tabla
+'documentos', se actualiza en reescanear() cuando cambia <id>_EXEVA.json).
+buscar_global() consulta ambas y, opcionalmente, el índice de texto de cada
+proyecto (busqueda.py).
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from .utils import log as _log
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS proyectos (
+    id          TEXT PRIMARY KEY,
+    timestamp   TEXT,
+    encontrados INTEGER,
+    nombre      TEXT,
+    estados     TEXT,   -- " ANTGEN:edicion EXEVA:detectado "
+    mtime_ns    INTEGER
+);
+CREATE INDEX IF NOT EXISTS proyectos_timestamp ON proyectos (timestamp);
+CREATE TABLE IF NOT EXISTS referencias (
+    id       INTEGER PRIMARY KEY,  -- rowid en antecedentes o documentos
+    proyecto TEXT,
+    n        TEXT                  -- número del documento (NULL en antecedentes)
+);
+CREATE INDEX IF NOT EXISTS referencias_proyecto ON referencias (proyecto);
+CREATE VIRTUAL TABLE IF NOT EXISTS antecedentes USING fts5(
+    nombre, titular, tipo_proyecto, pas, otros, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documentos USING fts5(
+    titulo, remitido_por, fecha, formato, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Campo elegible en buscar_global() -> (tabla, columnas FTS o None para todas)
+CAMPOS_BUSQUEDA = {
+    "todo": None,
+    "nombre": ("antecedentes", "nombre"),
+    "titular": ("antecedentes", "titular"),
+    "tipo_proyecto": ("antecedentes", "tipo_proyecto"),
+    "pas": ("antecedentes", "pas"),
+    "documentos": ("documentos", None),
+    "texto": None,
+}
+
+
+def get_catalog_path() -> Path:
+    return Path(os.getcwd()) / "Ebook" / "_catalogo.sqlite"
+
+
+def _fetch_json_path(idp: str) -> Path:
+    return Path(os.getcwd()) / "Ebook" / idp / f"{idp}_fetch.json"
+
+
+def _exeva_json_path(idp: str) -> Path:
+    return Path(os.getcwd()) / "Ebook" / idp / "EXEVA" / f"{idp}_EXEVA.json"
+
+
+def _conectar() -> sqlite3.Connection:
+    path = get_catalog_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_ESQUEMA)
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(proyectos)")}
+    if "exeva_mtime_ns" not in columnas:
+        # Catálogo anterior al índice de búsqueda: el próximo reescaneo relee todo.
+        with conn:
+            conn.execute("ALTER TABLE proyectos ADD COLUMN exeva_mtime_ns INTEGER")
+            conn.execute("UPDATE proyectos SET mtime_ns = NULL")
+    return conn
+
+
+def _fila(idp: str, data: dict, mtime_ns: int) -> tuple:
+    expedientes = data.get("expedientes") or {}
+    antgen = (expedientes.get("ANTGEN") or {}).get("ANTGEN_DATA") or {}
+    estados = " ".join(
+        f"{codigo}:{info.get('status', 'detectado')}" for codigo, info in expedientes.items() if isinstance(info, dict)
+    )
+    return (
+        idp,
+        data.get("timestamp", "Sin fecha"),
+        int((data.get("summary") or {}).get("found", 0) or 0),
+        antgen.get("nombre_proyecto") or "",
+        f" {estados} ",
+        mtime_ns,
+    )
+
+
+def _texto(valor: Any) -> str:
+    """Aplana dicts/listas de ANTGEN_DATA a texto buscable."""
+    if isinstance(valor, dict):
+        return " ".join(_texto(v) for k, v in valor.items() if not str(k).endswith("_html"))
+    if isinstance(valor, list):
+        return " ".join(_texto(v) for v in valor)
+    return "" if valor is None else str(valor)
+
+
+def _borrar_referencias(conn: sqlite3.Connection, idp: str, tabla: str) -> None:
+    filtro = "n IS NULL" if tabla == "antecedentes" else "n IS NOT NULL"
+    conn.execute(f"DELETE FROM {tabla} WHERE rowid IN "
+                 f"(SELECT id FROM referencias WHERE proyecto = ? AND {filtro})", (idp,))
+    conn.execute(f"DELETE FROM referencias WHERE proyecto = ? AND {filtro}", (idp,))
+
+
+def _indexar_antecedentes(conn: sqlite3.Connection, idp: str, data: dict) -> None:
+    _borrar_referencias(conn, idp, "antecedentes")
+    antgen = dict((data.get("expedientes") or {}).get("ANTGEN", {}).get("ANTGEN_DATA") or {})
+    if not antgen:
+        return
+    titular = antgen.pop("titular", None)
+    campos = (
+        antgen.pop("nombre_proyecto", ""),
+        _texto(titular),
+        antgen.pop("tipo_proyecto", ""),
+        _texto(antgen.pop("permisos_ambientales", None)),
+        _texto(antgen),
+    )
+    cur = conn.execute("INSERT INTO referencias (proyecto, n) VALUES (?, NULL)", (idp,))
+    conn.execute(
+        "INSERT INTO antecedentes (rowid, nombre, titular, tipo_proyecto, pas, otros) VALUES (?, ?, ?, ?, ?, ?)",
+        (cur.lastrowid, *campos),
+    )
+
+
+def _indexar_documentos(conn: sqlite3.Connection, idp: str, documentos: list) -> None:
+    _borrar_referencias(conn, idp, "documentos")
+    for idx, doc in enumerate(documentos or [], 1):
+        if not isinstance(doc, dict):
+            continue
+        n = str(doc.get("n") or f"{idx:04d}")
+        cur = conn.execute("INSERT INTO referencias (proyecto, n) VALUES (?, ?)", (idp, n))
+        conn.execute(
+            "INSERT INTO documentos (rowid, titulo, remitido_por, fecha, formato) VALUES (?, ?, ?, ?, ?)",
+            (cur.lastrowid, *(str(doc.get(k) or "") for k in ("titulo", "remitido_por", "fecha", "formato"))),
+        )
+
+
+_UPSERT = """
+INSERT INTO proyectos (id, timestamp, encontrados, nombre, estados, mtime_ns) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET timestamp=excluded.timestamp, encontrados=excluded.encontrados,
+    nombre=excluded.nombre, estados=excluded.estados, mtime_ns=excluded.mtime_ns
+"""
+
+
+def registrar(idp: str, data: dict | None = None) -> None:
+    """
+    Actualiza la fila del proyecto tras escribir su <id>_fetch.json. 'data' es
+    el contenido recién guardado (evita releerlo). Nunca lanza: si falla, el
+    próximo reescaneo lo corrige.
+    """
+    try:
+        path = _fetch_json_path(idp)
+        mtime_ns = path.stat().st_mtime_ns
+        if data is None:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        with closing(_conectar()) as conn, conn:
+            conn.execute(_UPSERT, _fila(idp, data, mtime_ns))
+            _indexar_antecedentes(conn, idp, data)
+    except Exception:
+        pass
+
+
+def _filtro(busqueda: str, estado: str) -> Tuple[str, list]:
+    condiciones, params = [], []
+    if busqueda:
+        condiciones.append("(id LIKE ? OR nombre LIKE ?)")
+        params += [f"%{busqueda}%", f"%{busqueda}%"]
+    if estado:
+        condiciones.append("estados LIKE ?")
+        params.append(f"%:{estado} %")
+    return (" WHERE " + " AND ".join(condiciones)) if condiciones else "", params
+
+
+def listar(busqueda: str = "", estado: str = "", limite: int = 50, desplazamiento: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """Una página de proyectos (más recientes primero) y el total que cumple el filtro."""
+    where, params = _filtro(busqueda.strip(), estado.strip())
+    with closing(_conectar()) as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM proyectos{where}", params).fetchone()[0]
+        filas = conn.execute(
+            f"SELECT id, timestamp, encontrados, nombre, estados FROM proyectos{where} "
+            "ORDER BY timestamp DESC, id LIMIT ? OFFSET ?",
+            params + [limite, desplazamiento],
+        ).fetchall()
+    proyectos = [
+        {"id": i, "timestamp": ts, "encontrados": n, "nombre": nombre, "estados": estados.split()}
+        for i, ts, n, nombre, estados in filas
+    ]
+    return proyectos, total
+
+
+def listar_ids(busqueda: str = "", estado: str = "") -> List[str]:
+    """Todos los IDs que cumplen el filtro (p. ej. para encolarlos)."""
+    where, params = _filtro(busqueda.strip(), estado.strip())
+    with closing(_conectar()) as conn:
+        return [r[0] for r in conn.execute(f"SELECT id FROM proyectos{where} ORDER BY timestamp DESC, id", params)]
+
+
+def reescanear(log: Callable[[str], None] | None = None) -> Dict[str, int]:
+    """
+    Sincroniza el catálogo con Ebook/: sólo relee los <id>_fetch.json y
+    <id>_EXEVA.json cuyo mtime cambió, agrega los nuevos y quita los que ya
+    no existen.
+    """
+    resumen = {"nuevos": 0, "actualizados": 0, "eliminados": 0, "documentos": 0}
+    base = get_catalog_path().parent
+    if not base.is_dir():
+        return resumen
+
+    with closing(_conectar()) as conn:
+        conocidos = {idp: (mtime, exeva_mtime) for idp, mtime, exeva_mtime in
+                     conn.execute("SELECT id, mtime_ns, exeva_mtime_ns FROM proyectos")}
+        vistos = set()
+        cambios = []
+        exeva_cambios = []
+        with os.scandir(base) as entradas:
+            for entrada in entradas:
+                if not entrada.is_dir():
+                    continue
+                idp = entrada.name
+                try:
+                    mtime_ns = os.stat(os.path.join(entrada.path, f"{idp}_fetch.json")).st_mtime_ns
+                except OSError:
+                    continue
+                try:
+                    exeva_mtime_ns = _exeva_json_path(idp).stat().st_mtime_ns
+                except OSError:
+                    exeva_mtime_ns = None
+                vistos.add(idp)
+                previo, exeva_previo = conocidos.get(idp, (None, None))
+                if previo != mtime_ns:
+                    try:
+                        data = json.loads(_fetch_json_path(idp).read_text(encoding="utf-8"))
+                    except Exception:
+                        continue
+                    cambios.append((idp, data, mtime_ns))
+                    resumen["actualizados" if idp in conocidos else "nuevos"] += 1
+                if exeva_previo != exeva_mtime_ns:
+                    exeva_cambios.append((idp, exeva_mtime_ns))
+
+        eliminados = [idp for idp in conocidos if idp not in vistos]
+        resumen["eliminados"] = len(eliminados)
+        with conn:
+            for idp, data, mtime_ns in cambios:
+                conn.execute(_UPSERT, _fila(idp, data, mtime_ns))
+                _indexar_antecedentes(conn, idp, data)
+            for idp in eliminados:
+                _borrar_referencias(conn, idp, "antecedentes")
+                _borrar_referencias(conn, idp, "documentos")
+                conn.execute("DELETE FROM proyectos WHERE id = ?", (idp,))
+
+        # En lotes: el primer reescaneo puede reindexar miles de proyectos.
+        for inicio in range(0, len(exeva_cambios), 200):
+            with conn:
+                for idp, exeva_mtime_ns in exeva_cambios[inicio:inicio + 200]:
+                    documentos = []
+                    if exeva_mtime_ns is not None:
+                        try:
+                            payload = json.loads(_exeva_json_path(idp).read_text(encoding="utf-8"))
+                            documentos = (payload.get("EXEVA") or {}).get("documentos") or []
+                        except Exception:
+                            continue  # JSON a medio escribir: se reintenta en el próximo reescaneo
+                    _indexar_documentos(conn, idp, documentos)
+                    conn.execute("UPDATE proyectos SET exeva_mtime_ns = ? WHERE id = ?", (exeva_mtime_ns, idp))
+                    resumen["documentos"] += 1
+
+    if any(resumen.values()):
+        _log(log, f"[CATÁLOGO] {resumen['nuevos']} nuevos, {resumen['actualizados']} actualizados, "
+                  f"{resumen['eliminados']} eliminados, {resumen['documentos']} con documentos reindexados.")
+    return resumen
+
+
+def _coincidencias(conn: sqlite3.Connection, tabla: str, columnas: str | None, consulta: str,
+                   limite: int) -> List[tuple]:
+    """(proyecto, n, fuente, fragmento) ordenadas por relevancia."""
+    match = f"{{{columnas}}} : ({consulta})" if columnas else consulta
+    return conn.execute(
+        f"SELECT r.proyecto, r.n, snippet({tabla}, -1, '«', '»', '…', 12) "
+        f"FROM {tabla} JOIN referencias r ON r.id = {tabla}.rowid "
+        f"WHERE {tabla} MATCH ? ORDER BY {tabla}.rank LIMIT ?",
+        (match, limite),
+    ).fetchall()
+
+
+def buscar_global(texto: str, campo: str = "todo", limite: int = 100,
+                  incluir_textos: bool = False, por_proyecto: int = 5) -> List[Dict[str, Any]]:
+    """
+    Proyectos que coinciden con 'texto' en 'campo' (ver CAMPOS_BUSQUEDA), los
+    más relevantes primero. Cada uno trae id, nombre, timestamp y hasta
+    'por_proyecto' coincidencias {fuente, n, pagina, fragmento}. Con
+    'incluir_textos' (o campo "texto") también consulta el índice de texto de
+    los PDF de cada proyecto que lo tenga: es más lento, abre una base por proyecto.
+    """
+    from .busqueda import buscar, consulta_fts, get_search_db_path
+
+    consulta = consulta_fts(texto)
+    if not consulta or campo not in CAMPOS_BUSQUEDA:
+        return []
+
+    filas: List[tuple] = []
+    with closing(_conectar()) as conn:
+        if campo == "todo":
+            filas += [(p, n, "ANTGEN", f) for p, n, f in _coincidencias(conn, "antecedentes", None, consulta, limite * 4)]
+            filas += [(p, n, "documento", f) for p, n, f in _coincidencias(conn, "documentos", None, consulta, limite * 4)]
+        elif campo != "texto":
+            tabla, columnas = CAMPOS_BUSQUEDA[campo]
+            fuente = "ANTGEN" if tabla == "antecedentes" else "documento"
+            filas += [(p, n, fuente, f) for p, n, f in _coincidencias(conn, tabla, columnas, consulta, limite * 4)]
+        proyectos = {idp: (nombre, ts) for idp, nombre, ts in conn.execute("SELECT id, nombre, timestamp FROM proyectos")}
+
+    resultados: Dict[str, Dict[str, Any]] = {}
+
+    def _agregar(idp: str, coincidencia: Dict[str, Any]) -> None:
+        if idp not in proyectos:
+            return
+        if idp not in resultados:
+            if len(resultados) >= limite:
+                return
+            nombre, ts = proyectos[idp]
+            resultados[idp] = {"id": idp, "nombre": nombre, "timestamp": ts, "coincidencias": []}
+        if len(resultados[idp]["coincidencias"]) < por_proyecto:
+            resultados[idp]["coincidencias"].append(coincidencia)
+
+    for idp, n, fuente, fragmento in filas:
+        _agregar(idp, {"fuente": fuente, "n": n, "pagina": None, "fragmento": fragmento})
+
+    def _en_textos(idp: str) -> List[Dict[str, Any]]:
+        try:
+            return buscar(idp, texto, por_proyecto)
+        except Exception:
+            return []
+
+    if incluir_textos or campo == "texto":
+        con_indice = [idp for idp in proyectos if get_search_db_path(idp).exists()]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            for idp, hits in zip(con_indice, executor.map(_en_textos, con_indice)):
+                for hit in hits:
+                    _agregar(idp, {"fuente": "texto", "n": hit["n"], "pagina": hit["pagina"],
+                                   "fragmento": hit["fragmento"], "ruta": hit["ruta"]})
+    return list(resultados.values())
+
+
+class CatalogoScanWorker(QObject):
+    finished_signal = pyqtSignal(dict)
+    log_signal = pyqtSignal(str)
+
+    @pyqtSlot()
+    def run(self) -> None:
+        resumen: dict = {}
+        try:
+            resumen = reescanear(log=self.log_signal.emit)
+        except Exception as exc:
+            self.log_signal.emit(f"⚠️ No se pudo actualizar el catálogo de proyectos: {exc}")
+        self.finished_signal.emit(resumen)
+
+
+class CatalogoController(QObject):
+    """Reescaneo del catálogo en segundo plano (uno a la vez)."""
+
+    rescan_finished = pyqtSignal(dict)
+    log_requested = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker: CatalogoScanWorker | None = None
+        self.thread: QThread | None = None
+
+    def start_rescan(self) -> None:
+        if self.thread and self.thread.isRunning():
+            return
+
+        self.thread = QThread()
+        self.worker = CatalogoScanWorker()
+
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+
+        self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.finished_signal.connect(self.rescan_finished.emit)
+        self.worker.finished_signal.connect(self.thread.quit)
+        self.worker.finished_signal.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self._cleanup_thread)
+
+        self.thread.start()
+
+    def _cleanup_thread(self) -> None:
+        if self.thread:
+            self.thread.deleteLater()
+        self.thread = None
+        self.worker = None
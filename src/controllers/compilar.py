@@ -0,0 +1,425 @@
+"""
+Compilador de tomos del expediente EXEVA.
+
+Une la portada de Antecedentes Generales, los documentos, anexos y archivos
+descomprimidos en volúmenes PDF acotados por cantidad de páginas o tamaño.
+Las páginas se van escribiendo tomo a tomo: sólo los lectores y páginas del
+tomo en curso permanecen abiertos, por lo que un ebook de decenas de miles de
+páginas no se arma nunca completo en memoria.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from .foliar import load_folios_map
+from .recorrido import get_project_root, is_pdf_entry, iter_entradas, load_exeva_payload
+from .utils import log as _log
+
+DEFAULT_MAX_PAGINAS = 500
+DEFAULT_MAX_BYTES = 150 * 1024 * 1024
+
+
+def get_tomos_dir(idp: str) -> Path:
+    return get_project_root(idp) / "EXEVA" / "Tomos"
+
+
+def get_tomos_map_path(idp: str) -> Path:
+    return get_tomos_dir(idp) / f"{idp}_EXEVA_tomos.json"
+
+
+def _write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, indent=4, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _ensure_antgen_cover(idp: str, log: Callable[[str], None] | None) -> Path | None:
+    """Devuelve el PDF de ANTGEN; si no existe, lo genera desde ANTGEN_DATA."""
+    project_root = get_project_root(idp)
+    cover = project_root / f"ANTGEN_{idp}.pdf"
+    if cover.exists():
+        return cover
+
+    fetch_json = project_root / f"{idp}_fetch.json"
+    try:
+        data = json.loads(fetch_json.read_text(encoding="utf-8"))
+        antgen_data = data.get("expedientes", {}).get("ANTGEN", {}).get("ANTGEN_DATA", {})
+    except Exception:
+        antgen_data = {}
+    if not antgen_data:
+        return None
+
+    try:
+        from src.templates.antgen_report import AntGenReport
+
+        AntGenReport(str(cover)).build(antgen_data)
+        _log(log, f"[COMPILAR] Portada ANTGEN generada: {cover.name}")
+        return cover
+    except Exception as exc:
+        _log(log, f"[COMPILAR] No se pudo generar la portada ANTGEN: {exc}")
+        return None
+
+
+class _TomoWriter:
+    """Acumula páginas del tomo en curso y lo vuelca a disco al llenarse."""
+
+    def __init__(self, idp: str, out_dir: Path, max_paginas: int, max_bytes: int,
+                 log: Callable[[str], None] | None):
+        self.idp = idp
+        self.out_dir = out_dir
+        self.max_paginas = max(1, int(max_paginas))
+        self.max_bytes = max(1, int(max_bytes))
+        self.log = log
+
+        self.pagina_global = 0
+        self.parciales = 0
+        self.tomos: List[Dict[str, Any]] = []
+        self.mapa: Dict[str, Dict[str, Any]] = {}
+        self._ancestros: List[Dict[str, Any]] = []
+        self._marcados: set[str] = set()
+        self._reset()
+
+    def _reset(self) -> None:
+        from pypdf import PdfWriter
+
+        self.writer = PdfWriter()
+        self.numero = len(self.tomos) + 1
+        self.nombre = f"{self.idp}_EXEVA_Tomo_{self.numero:02d}"
+        self.paginas = 0
+        self.bytes_estimados = 0.0
+        self.handles: list = []
+        self.outline: Dict[str, Any] = {}
+        self.entradas: List[Dict[str, Any]] = []
+        self.desde_global = self.pagina_global + 1
+
+    def _lleno(self) -> bool:
+        return self.paginas >= self.max_paginas or self.bytes_estimados >= self.max_bytes
+
+    def registrar(self, entry: Dict[str, Any]) -> None:
+        """Actualiza la pila de ancestros (carpetas, documentos sin PDF, etc.)."""
+        nivel = int(entry.get("nivel") or 0)
+        self._ancestros = self._ancestros[:nivel] + [entry]
+
+    def _bookmark(self, pagina: int) -> None:
+        """Crea los marcadores de la entrada actual y de sus ancestros en este tomo."""
+        parent = None
+        for ancestro in self._ancestros:
+            key = ancestro["n"]
+            if key not in self.outline:
+                titulo = f"{ancestro['n']} {ancestro['titulo']}"
+                if key in self._marcados:
+                    titulo += " (continuación)"
+                self.outline[key] = self.writer.add_outline_item(titulo, pagina, parent=parent)
+            parent = self.outline[key]
+
+    def agregar(self, entry: Dict[str, Any]) -> int:
+        """
+        Agrega todas las páginas del PDF de la entrada. Devuelve páginas escritas.
+        Si una página falla, las anteriores quedan compiladas y la entrada se
+        marca como parcial (una sola vez, con la página que falló); si falla la
+        primera, se propaga el error y nada queda registrado.
+        """
+        from pypdf import PdfReader
+
+        path: Path = entry["path"]
+        handle = open(path, "rb")
+        try:
+            reader = PdfReader(handle)
+            total = len(reader.pages)
+        except Exception:
+            handle.close()
+            raise
+
+        if total == 0:
+            handle.close()
+            return 0
+
+        bytes_por_pagina = path.stat().st_size / total
+        tramo: Dict[str, Any] | None = None
+        for idx in range(total):
+            try:
+                pagina = reader.pages[idx]  # antes de cerrar el tomo: si falla, queda en este
+            except Exception as exc:
+                return self._parcial(entry, tramo, idx, exc)
+            if self.paginas and self._lleno():
+                self._cerrar_tramo(tramo)
+                tramo = None
+                self.flush(keep=handle)
+            nuevo_tramo = tramo is None
+            if nuevo_tramo:
+                self.handles.append(handle)
+                tramo = {
+                    "n": entry["n"],
+                    "titulo": entry["titulo"],
+                    "tipo": entry["tipo"],
+                    "ruta": entry["ruta"],
+                    "compilado": True,
+                    "pagina_desde": self.paginas + 1,
+                    "global_desde": self.pagina_global + 1,
+                }
+            try:
+                self.writer.add_page(pagina)
+            except Exception as exc:
+                return self._parcial(entry, tramo, idx, exc)
+            if nuevo_tramo:
+                self._bookmark(self.paginas)
+            self.paginas += 1
+            self.pagina_global += 1
+            self.bytes_estimados += bytes_por_pagina
+        self._cerrar_tramo(tramo)
+        return total
+
+    def _parcial(self, entry: Dict[str, Any], tramo: Dict[str, Any] | None, idx: int,
+                 exc: Exception) -> int:
+        """Cierra una entrada cuya página idx falló tras compilar las anteriores."""
+        if idx == 0:
+            raise exc
+        marca = {"parcial": True, "error_pagina": idx + 1, "motivo": f"PDF ilegible: {exc}"}
+        if tramo and self.paginas >= tramo["pagina_desde"]:
+            tramo.update(marca)
+            self._cerrar_tramo(tramo)
+        self.mapa[entry["ruta"] or entry["n"]].update(marca)
+        self.parciales += 1
+        _log(self.log, f"[COMPILAR] ⚠️ {entry['ruta']}: página {idx + 1} ilegible; "
+                       f"se compilaron las {idx} anteriores.")
+        return idx
+
+    def _cerrar_tramo(self, tramo: Dict[str, Any] | None) -> None:
+        if not tramo:
+            return
+        tramo["pagina_hasta"] = self.paginas
+        tramo["global_hasta"] = self.pagina_global
+        self.entradas.append(tramo)
+
+        info = self.mapa.setdefault(tramo["ruta"] or tramo["n"], {
+            "n": tramo["n"],
+            "titulo": tramo["titulo"],
+            "global_desde": tramo["global_desde"],
+            "tomos": [],
+        })
+        info["global_hasta"] = tramo["global_hasta"]
+        info["tomos"].append({
+            "tomo": self.numero,
+            "archivo": f"{self.nombre}.pdf",
+            "desde": tramo["pagina_desde"],
+            "hasta": tramo["pagina_hasta"],
+        })
+
+    def omitir(self, entry: Dict[str, Any], motivo: str) -> None:
+        """Registra en el manifiesto una entrada que no se pudo incorporar."""
+        self.entradas.append({
+            "n": entry["n"],
+            "titulo": entry["titulo"],
+            "tipo": entry["tipo"],
+            "ruta": entry["ruta"],
+            "compilado": False,
+            "motivo": motivo,
+        })
+
+    def repetir(self, entry: Dict[str, Any], n_original: str) -> None:
+        """Registra una entrada cuyo archivo ya se compiló en otra posición."""
+        self.entradas.append({
+            "n": entry["n"],
+            "titulo": entry["titulo"],
+            "tipo": entry["tipo"],
+            "ruta": entry["ruta"],
+            "compilado": False,
+            "repetido_de": n_original,
+        })
+
+    def flush(self, keep=None) -> None:
+        """Escribe el tomo en curso y libera sus lectores (salvo 'keep')."""
+        if not self.paginas:
+            return
+        pdf_path = self.out_dir / f"{self.nombre}.pdf"
+        tmp_path = pdf_path.with_suffix(".pdf.tmp")
+
+        with open(tmp_path, "wb") as f:
+            self.writer.write(f)
+        os.replace(tmp_path, pdf_path)
+        for handle in set(self.handles):
+            if handle is not keep:
+                handle.close()
+
+        manifest = {
+            "tomo": self.numero,
+            "archivo": pdf_path.name,
+            "paginas": self.paginas,
+            "bytes": pdf_path.stat().st_size,
+            "global_desde": self.desde_global,
+            "global_hasta": self.pagina_global,
+            "generado": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "entradas": self.entradas,
+        }
+        _write_json(self.out_dir / f"{self.nombre}.json", manifest)
+        _log(self.log, f"[COMPILAR] {pdf_path.name}: {self.paginas} páginas.")
+
+        self._marcados.update(self.outline.keys())
+        self.tomos.append({k: v for k, v in manifest.items() if k != "entradas"})
+        self._reset()
+
+    def close(self) -> None:
+        for handle in set(self.handles):
+            handle.close()
+        self.handles = []
+
+
+def compilar_tomos(
+    idp: str,
+    max_paginas: int = DEFAULT_MAX_PAGINAS,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    log: Callable[[str], None] | None = None,
+    usar_foliados: bool = True,
+) -> dict:
+    payload = load_exeva_payload(idp) or {}
+    exeva = payload.get("EXEVA")
+    if not isinstance(exeva, dict):
+        _log(log, "[COMPILAR] No hay datos EXEVA para compilar.")
+        return {}
+
+    project_root = get_project_root(idp)
+    out_dir = get_tomos_dir(idp)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.glob(f"{idp}_EXEVA_Tomo_*"):
+        old.unlink()
+
+    _log(log, f"[COMPILAR] Compilando tomos (máx. {max_paginas} páginas / "
+              f"{max_bytes // (1024 * 1024)} MB por tomo)...")
+    tomo = _TomoWriter(idp, out_dir, max_paginas, max_bytes, log)
+    folios = load_folios_map(idp).get("mapa", {}) if usar_foliados else {}
+    if folios:
+        _log(log, "[COMPILAR] Usando versiones foliadas de los documentos.")
+
+    cover = _ensure_antgen_cover(idp, log)
+    if cover:
+        portada = {
+            "clave": "ANTGEN", "n": "ANTGEN", "titulo": "Antecedentes Generales",
+            "nivel": 0, "tipo": "portada", "formato": "pdf",
+            "ruta": cover.name, "path": cover,
+        }
+        tomo.registrar(portada)
+        try:
+            tomo.agregar(portada)
+        except Exception as exc:
+            _log(log, f"[COMPILAR] Portada ANTGEN ilegible: {exc}")
+
+    omitidos = 0
+    # Un mismo archivo (anexo compartido por varios documentos) se compila una
+    # sola vez, como en foliar: las demás apariciones apuntan a esas páginas
+    # a través de su clave en el mapa.
+    compilados: Dict[str, str] = {}
+    for entry in iter_entradas(exeva, project_root):
+        tomo.registrar(entry)
+        if entry["tipo"] == "carpeta":
+            continue
+        if not is_pdf_entry(entry):
+            if entry["ruta"]:
+                motivo = "archivo no encontrado" if entry["path"] is None else "formato no compilable"
+                tomo.omitir(entry, motivo)
+                omitidos += 1
+            continue
+        if entry["clave"] in compilados:
+            tomo.repetir(entry, compilados[entry["clave"]])
+            continue
+        foliado = folios.get(entry["clave"], {}).get("ruta_foliada")
+        if foliado and (project_root / foliado).is_file():
+            entry = dict(entry, path=project_root / foliado)
+        try:
+            tomo.agregar(entry)
+        except Exception as exc:
+            tomo.omitir(entry, f"PDF ilegible: {exc}")
+            omitidos += 1
+            _log(log, f"[COMPILAR] No se pudo leer {entry['ruta']}: {exc}")
+            continue
+        compilados[entry["clave"]] = entry["n"]
+
+    tomo.flush()
+    tomo.close()
+
+    result = {
+        "IDP": idp,
+        "generado": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "max_paginas": max_paginas,
+        "max_bytes": max_bytes,
+        "paginas_totales": tomo.pagina_global,
+        "tomos": tomo.tomos,
+        "mapa": tomo.mapa,
+    }
+    _write_json(get_tomos_map_path(idp), result)
+    _log(log, f"[COMPILAR] {len(tomo.tomos)} tomos, {tomo.pagina_global} páginas. "
+              f"Entradas no compiladas: {omitidos}; parciales: {tomo.parciales}.")
+    return result
+
+
+class CompilarWorker(QObject):
+    finished_signal = pyqtSignal(bool, dict)
+    log_signal = pyqtSignal(str)
+
+    def __init__(self, project_id: str, max_paginas: int, max_bytes: int):
+        super().__init__()
+        self.project_id = project_id
+        self.max_paginas = max_paginas
+        self.max_bytes = max_bytes
+
+    @pyqtSlot()
+    def run(self) -> None:
+        success = False
+        result_data: dict = {}
+        try:
+            result_data = compilar_tomos(
+                self.project_id, self.max_paginas, self.max_bytes, log=self.log_signal.emit
+            )
+            success = bool(result_data.get("tomos"))
+            if success:
+                self.log_signal.emit("✅ Compilación de tomos completada.")
+            else:
+                self.log_signal.emit("⚠️ No hay documentos PDF para compilar.")
+        except Exception as exc:
+            self.log_signal.emit(f"❌ Error inesperado durante la compilación: {exc}")
+        self.finished_signal.emit(success, result_data)
+
+
+class CompilarController(QObject):
+    compile_started = pyqtSignal()
+    compile_finished = pyqtSignal(bool, dict)
+    log_requested = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker: CompilarWorker | None = None
+        self.thread: QThread | None = None
+
+    def start_compile(self, project_id: str, max_paginas: int = DEFAULT_MAX_PAGINAS,
+                      max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        if self.thread and self.thread.isRunning():
+            self.log_requested.emit("⚠️ La compilación de tomos ya está en curso.")
+            return
+
+        self.compile_started.emit()
+        self.thread = QThread()
+        self.worker = CompilarWorker(project_id, max_paginas, max_bytes)
+
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+
+        self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.finished_signal.connect(self.compile_finished.emit)
+        self.worker.finished_signal.connect(self.thread.quit)
+        self.worker.finished_signal.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self._cleanup_thread)
+
+        self.thread.start()
+
+    def _cleanup_thread(self) -> None:
+        if self.thread:
+            self.thread.deleteLater()
+        self.thread = None
+        self.worker = None
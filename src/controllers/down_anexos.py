@@ -19,7 +19,15 @@ import shutil
 from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
 
 # Importar utilidades centralizadas
-from .utils import log as _log, sanitize_filename, url_extension, url_filename, download_binary
+from .utils import (
+    CancelToken, log as _log, sanitize_filename, url_extension, url_filename, download_binary,
+)
+from . import perfilado
+from .integridad import REINTENTOS, poner_en_cuarentena, verificar_archivo
+from .enlaces import (
+    CAMPOS_RESULTADO, clave_enlace, copiar_resultado, enlazar_documentos, iterar_enlaces,
+)
+from .progreso import ProgressEvent, ProgressTracker
 
 
 def _doc_folder_name(n: str) -> str:
@@ -31,6 +39,21 @@ def _doc_folder_name(n: str) -> str:
         return (n[-2:] or "00").zfill(2)
 
 
+def _descarte_danado(full_path: Path, cuarentena: Path, log: Callable | None) -> bool:
+    """
+    Verifica (inicio y final) un archivo ya descargado. Si está dañado lo mueve
+    a cuarentena y retorna True para que se descargue de nuevo.
+    """
+    if not full_path.is_file():
+        return False  # carpeta de un comprimido ya descomprimido
+    motivo = verificar_archivo(full_path)
+    if motivo is None:
+        return False
+    _log(log, f"[Worker] ⚠️ {full_path.name}: {motivo}. Se mueve a cuarentena y se descarga de nuevo.")
+    poner_en_cuarentena(full_path, cuarentena)
+    return True
+
+
 def _process_link_item(
     link_obj: dict,
     parent_n: str,
@@ -40,17 +63,21 @@ def _process_link_item(
     log: Callable | None,
     *,
     overwrite: bool = False,
+    cancel: CancelToken | None = None,
+    progreso: ProgressTracker | None = None,
 ) -> bool:
     url = link_obj.get("url")
     if not url: return False
 
+    cuarentena = detect_dir / "cuarentena"
+
     # Si ya tiene ruta válida, saltar
     if link_obj.get("ruta"):
-        # Validación rápida: si el archivo existe, no hacemos nada.
-        # Si no existe (se borró), download_binary lo bajará de nuevo.
+        # Validación rápida: si el archivo existe y está sano, no hacemos nada.
+        # Si no existe (se borró) o estaba dañado, download_binary lo bajará de nuevo.
         try:
             full_path = detect_dir / link_obj["ruta"]
-            if full_path.exists() and full_path.stat().st_size > 0:
+            if full_path.exists() and not _descarte_danado(full_path, cuarentena, log):
                 return True
         except Exception:
             pass
@@ -70,9 +97,19 @@ def _process_link_item(
 
     _log(log, f"[Worker] Procesando anexo: {safe_title}")
 
-    # Descarga inteligente (verifica si existe, renombra si hay colisión, etc.)
-    # Timeout de 90s para archivos grandes de anexos
-    ok, final_path = download_binary(url, target_path, timeout=90, overwrite=overwrite)
+    # Descarga inteligente (renombra si hay colisión, verifica el contenido, etc.)
+    # Timeout de 90s para archivos grandes de anexos. Un archivo rechazado por
+    # la verificación queda en cuarentena y se vuelve a pedir.
+    for intento in range(REINTENTOS + 1):
+        verificacion: dict = {}
+        ok, final_path = download_binary(
+            url, target_path, timeout=90, overwrite=overwrite, cancel=cancel, progreso=progreso,
+            cuarentena=cuarentena, verificacion=verificacion,
+        )
+        if ok or "motivo" not in verificacion or (cancel is not None and cancel.cancelled):
+            break
+        _log(log, f"[Worker] ⚠️ {safe_title}: {verificacion['motivo']}. Archivo en cuarentena"
+                  + (", reintentando." if intento < REINTENTOS else "."))
 
     if ok:
         try:
@@ -82,16 +119,23 @@ def _process_link_item(
 
             # Guardar en el objeto del link
             link_obj["ruta"] = clean_path
+            link_obj["sha256"] = verificacion["sha256"]
 
-            # Limpiar marca de error si existía
-            if "error" in link_obj:
-                del link_obj["error"]
+            # Limpiar marcas de error si existían
+            link_obj.pop("error", None)
+            link_obj.pop("error_verificacion", None)
             return True
         except Exception:
             pass
 
+    # Detenido a mitad de descarga: no es un error, se reintenta al reanudar
+    if cancel is not None and cancel.cancelled:
+        return False
+
     # Si falló, marcar error para que la UI lo muestre en rojo
     link_obj["error"] = True
+    if "motivo" in verificacion:
+        link_obj["error_verificacion"] = verificacion["motivo"]
     _log(log, f"[Worker] Error descargando: {url}")
     return False
 
@@ -110,6 +154,7 @@ def _load_payload(idp: str) -> dict:
         return {}
 
 
+@perfilado.medir("json.guardar")
 def _save_payload(idp: str, payload: dict) -> Path:
     path = _get_exeva_json_path(idp)
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -117,7 +162,9 @@ def _save_payload(idp: str, payload: dict) -> Path:
     return path
 
 
-def download_attachments_files(idp: str, log: Callable[[str], None] | None = None) -> dict:
+def download_attachments_files(idp: str, log: Callable[[str], None] | None = None,
+                               cancel: CancelToken | None = None,
+                               progress: Callable[[ProgressEvent], None] | None = None) -> dict:
     payload = _load_payload(idp) or {}
     exeva = payload.get("EXEVA")
     if not isinstance(exeva, dict):
@@ -130,7 +177,11 @@ def download_attachments_files(idp: str, log: Callable[[str], None] | None = Non
 
     tasks = []
 
-    # 1. Recolectar tareas
+    # 1. Recolectar tareas: una por nodo del grafo de enlaces, aunque el
+    # mismo destino esté citado por varios documentos. El resultado se copia
+    # al resto de los ítems al terminar (enlazar_documentos).
+    enlaces = enlazar_documentos(exeva)
+    claves_en_cola = set()
     for doc in documentos:
         if not isinstance(doc, dict): continue
         n = str(doc.get("n") or "0000").strip()
@@ -139,27 +190,47 @@ def download_attachments_files(idp: str, log: Callable[[str], None] | None = Non
         listas = (doc.get("anexos_detectados") or []) + (doc.get("vinculados_detectados") or [])
 
         for link in listas:
-            # Procesar si no tiene ruta O si tuvo error previo
-            if not link.get("ruta") or link.get("error"):
+            clave = link.get("enlace")
+            if clave and clave in claves_en_cola:
+                continue
+            # Procesar si no tiene ruta, si tuvo error previo o si el archivo está dañado
+            if not link.get("ruta") or link.get("error") or _descarte_danado(
+                detect_dir / link["ruta"], detect_dir / "cuarentena", log
+            ):
                 tasks.append((link, n))
+                claves_en_cola.add(clave)
 
     total = len(tasks)
     if total == 0:
+        _save_payload(idp, payload)
         _log(log, "[Descarga de Anexos] Todos los anexos están descargados.")
         return exeva
 
+    referencias = sum(len(nodo["documentos"]) for nodo in enlaces.values())
+    if referencias > len(enlaces):
+        _log(log, f"[Descarga de Anexos] {len(enlaces)} enlaces distintos para {referencias} referencias.")
+
     _log(log, f"[Descarga de Anexos] Iniciando descarga de {total} anexos (4 workers)...")
 
     # OPTIMIZACIÓN: Intervalo de guardado más largo para no saturar disco
     SAVE_INTERVAL = 50
     processed = 0
 
+    progreso = ProgressTracker("Anexos", total, progress)
+
+    def _tarea(link_obj: dict, parent_n: str) -> bool:
+        if cancel is not None and not cancel.check():
+            return False
+        try:
+            return _process_link_item(
+                link_obj, parent_n, out_base, detect_dir, idp, log, cancel=cancel, progreso=progreso
+            )
+        finally:
+            progreso.avanzar()
+
     # OPTIMIZACIÓN: Menos workers para estabilidad en descargas pesadas
     with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-        futures = []
-        for link_obj, parent_n in tasks:
-            f = executor.submit(_process_link_item, link_obj, parent_n, out_base, detect_dir, idp, log)
-            futures.append(f)
+        futures = [executor.submit(_tarea, link_obj, parent_n) for link_obj, parent_n in tasks]
 
         for f in concurrent.futures.as_completed(futures):
             try:
@@ -174,31 +245,32 @@ def download_attachments_files(idp: str, log: Callable[[str], None] | None = Non
             except Exception as e:
                 _log(log, f"Error en hilo: {e}")
 
-    # Guardado final asegurado
+    progreso.terminar()
+    enlazar_documentos(exeva)
+
+    # Guardado final asegurado. Los anexos sin ruta se retoman en la próxima ejecución.
     path_res = _save_payload(idp, payload)
-    _log(log, f"[Descarga de Anexos] Proceso finalizado. Datos actualizados.")
+    if cancel is not None and cancel.cancelled:
+        _log(log, f"[Descarga de Anexos] Descarga detenida ({processed}/{total}). Progreso guardado.")
+    else:
+        _log(log, f"[Descarga de Anexos] Proceso finalizado. Datos actualizados.")
 
     return exeva
 
 
-def _clear_attachment_node(link_obj: dict, detect_dir: Path, log: Callable | None) -> None:
-    ruta = link_obj.get("ruta")
-    if ruta:
-        try:
-            full_path = detect_dir / ruta
-            if full_path.exists():
-                if full_path.is_dir():
-                    shutil.rmtree(full_path)
-                else:
-                    full_path.unlink()
-            extracted_path = full_path.with_suffix("")
-            if extracted_path.exists() and extracted_path.is_dir():
-                shutil.rmtree(extracted_path)
-        except Exception as exc:
-            _log(log, f"[Worker] No se pudo limpiar archivo previo: {exc}")
-
-    for key in ("ruta", "descomprimidos", "error"):
-        link_obj.pop(key, None)
+def _clear_attachment_files(ruta: str, detect_dir: Path, log: Callable | None) -> None:
+    try:
+        full_path = detect_dir / ruta
+        if full_path.exists():
+            if full_path.is_dir():
+                shutil.rmtree(full_path)
+            else:
+                full_path.unlink()
+        extracted_path = full_path.with_suffix("")
+        if extracted_path.exists() and extracted_path.is_dir():
+            shutil.rmtree(extracted_path)
+    except Exception as exc:
+        _log(log, f"[Worker] No se pudo limpiar archivo previo: {exc}")
 
 
 def download_single_attachment(
@@ -207,14 +279,32 @@ def download_single_attachment(
     link_obj: dict,
     log: Callable[[str], None] | None = None,
 ) -> bool:
-    """Descarga un único anexo (para el botón Reintentar de la UI)."""
+    """
+    Descarga de nuevo un anexo (para el botón Reintentar de la UI). El
+    reintento es del nodo de EXEVA.enlaces: los ítems de todos los documentos
+    que apuntan al mismo enlace se limpian juntos y reciben el resultado, que
+    queda guardado en el JSON (y en link_obj, la copia que muestra la UI).
+    """
     exeva_dir = Path(os.getcwd()) / "Ebook" / idp / "EXEVA"
     detect_dir = exeva_dir
     out_base = exeva_dir / "files"
 
-    _clear_attachment_node(link_obj, detect_dir, log)
-
-    return _process_link_item(
+    payload = _load_payload(idp)
+    exeva = payload.get("EXEVA") if isinstance(payload.get("EXEVA"), dict) else {}
+    clave = clave_enlace(link_obj)
+    items = [
+        link for _doc, link in iterar_enlaces(exeva.get("documentos") or [])
+        if clave and clave_enlace(link) == clave
+    ]
+
+    for ruta in dict.fromkeys(item.get("ruta") for item in [link_obj, *items]):
+        if ruta:
+            _clear_attachment_files(ruta, detect_dir, log)
+    for item in [link_obj, *items]:
+        for key in CAMPOS_RESULTADO:
+            item.pop(key, None)
+
+    ok = _process_link_item(
         link_obj,
         parent_n,
         out_base,
@@ -224,22 +314,37 @@ def download_single_attachment(
         overwrite=True,
     )
 
+    if items:
+        for item in items:
+            copiar_resultado(link_obj, item)
+        enlazar_documentos(exeva)
+        _save_payload(idp, payload)
+    return ok
+
 
 class AnexosDownloadWorker(QObject):
     finished_signal = pyqtSignal(bool, dict)
+    progress_signal = pyqtSignal(object)  # ProgressEvent
     log_signal = pyqtSignal(str)
 
     def __init__(self, project_id: str):
         super().__init__()
         self.project_id = project_id
+        self.cancel_token = CancelToken()
 
     @pyqtSlot()
     def run(self) -> None:
         success = False
         result_data: dict = {}
         try:
-            result_data = download_attachments_files(self.project_id, log=self.log_signal.emit)
-            if result_data:
+            with perfilado.sesion(self.project_id, "descargar_anexos", self.log_signal.emit):
+                result_data = download_attachments_files(
+                    self.project_id, log=self.log_signal.emit, cancel=self.cancel_token,
+                    progress=self.progress_signal.emit,
+                )
+            if self.cancel_token.cancelled:
+                self.log_signal.emit("⏹️ Descarga de anexos detenida. Progreso guardado.")
+            elif result_data:
                 success = True
                 self.log_signal.emit("✅ Descarga de anexos completada.")
             else:
@@ -252,6 +357,7 @@ class AnexosDownloadWorker(QObject):
 class DownAnexosController(QObject):
     download_started = pyqtSignal()
     download_finished = pyqtSignal(bool, dict)
+    download_progress = pyqtSignal(object)  # ProgressEvent
     log_requested = pyqtSignal(str)
 
     def __init__(self, parent=None):
@@ -274,6 +380,7 @@ class DownAnexosController(QObject):
         self.thread.started.connect(self.worker.run)
 
         self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.progress_signal.connect(self.download_progress.emit)
         self.worker.finished_signal.connect(self._on_finished)
         self.thread.finished.connect(self._on_thread_finished)
 
@@ -288,6 +395,21 @@ class DownAnexosController(QObject):
         self.thread = None
         self.worker = None
 
+    def pause(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.pause()
+            self.log_requested.emit("⏸️ Descarga de anexos en pausa.")
+
+    def resume(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.resume()
+            self.log_requested.emit("▶️ Descarga de anexos reanudada.")
+
+    def cancel(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.cancel()
+            self.log_requested.emit("⏹️ Deteniendo descarga de anexos (se guarda el progreso)...")
+
     @pyqtSlot(bool, dict)
     def _on_finished(self, success: bool, exeva_data: dict) -> None:
         self._finished_dispatched = True
@@ -0,0 +1,93 @@
+"""
+Grafo de enlaces del proyecto (EXEVA["enlaces"]).
+
+Un mismo anexo o resolución suele estar enlazado desde muchos documentos.
+Cada destino se identifica por su docId (si se conoce) o por su URL
+normalizada, y queda una sola vez en EXEVA["enlaces"] con la lista de
+documentos que lo citan. Los ítems de anexos_detectados/vinculados_detectados
+apuntan a su nodo con "enlace": <clave>; la descarga y la descompresión se
+hacen una vez por nodo y el resultado se copia a todos los ítems.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# Campos que produce la descarga/descompresión y que comparten los ítems de un nodo.
+CAMPOS_RESULTADO = (
+    "ruta", "error", "sha256", "error_verificacion", "descomprimidos", "error_descompresion", "errores_descompresion",
+)
+
+
+def normalizar_url(url: str) -> str:
+    """Esquema y host en minúsculas, parámetros ordenados y sin fragmento."""
+    try:
+        partes = urlparse(url.strip())
+    except Exception:
+        return url
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    return urlunparse((partes.scheme.lower(), partes.netloc.lower(), partes.path or "/", "", query, ""))
+
+
+def clave_enlace(link: dict) -> str | None:
+    doc_id = link.get("docId")
+    if doc_id:
+        return f"docId:{doc_id}"
+    url = link.get("url")
+    return f"url:{normalizar_url(url)}" if url else None
+
+
+def iterar_enlaces(documentos: list) -> Iterator[Tuple[dict, dict]]:
+    """(documento, ítem) para cada anexo o vinculado detectado."""
+    for doc in documentos or []:
+        if not isinstance(doc, dict):
+            continue
+        for key in ("anexos_detectados", "vinculados_detectados"):
+            for link in doc.get(key) or []:
+                if isinstance(link, dict):
+                    yield doc, link
+
+
+def copiar_resultado(origen: dict, destino: dict) -> None:
+    """Deja en 'destino' los CAMPOS_RESULTADO de 'origen' (quita los que no tiene)."""
+    for campo in CAMPOS_RESULTADO:
+        if campo in origen:
+            destino[campo] = copy.deepcopy(origen[campo])
+        else:
+            destino.pop(campo, None)
+
+
+def enlazar_documentos(exeva: dict) -> Dict[str, dict]:
+    """
+    Reconstruye EXEVA["enlaces"] a partir de los documentos, marca cada ítem
+    con su clave y copia el resultado de descarga del ítem que ya lo tiene
+    (el primero con "ruta") a los demás ítems del mismo nodo.
+    """
+    grupos: Dict[str, List[Tuple[str, dict]]] = {}
+    for doc, link in iterar_enlaces(exeva.get("documentos") or []):
+        clave = clave_enlace(link)
+        if not clave:
+            continue
+        link["enlace"] = clave
+        grupos.setdefault(clave, []).append((str(doc.get("n") or "").strip(), link))
+
+    enlaces: Dict[str, dict] = {}
+    for clave, items in grupos.items():
+        origen = next((link for _n, link in items if link.get("ruta")), None) \
+            or next((link for _n, link in items if link.get("error")), items[0][1])
+        for _n, link in items:
+            if link is not origen:
+                copiar_resultado(origen, link)
+        nodo = {
+            "url": origen.get("url"),
+            "documentos": list(dict.fromkeys(n for n, _link in items)),
+        }
+        for campo in ("docId", "ruta", "error", "sha256"):
+            if origen.get(campo):
+                nodo[campo] = origen[campo]
+        enlaces[clave] = nodo
+
+    exeva["enlaces"] = enlaces
+    return enlaces
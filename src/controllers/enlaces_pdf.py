@@ -0,0 +1,182 @@
+"""
+Extracción de enlaces (/URI) desde PDF locales para la detección de vinculados.
+
+Recorrer las anotaciones con pypdf es lo más costoso de "Detectar Anexos" y,
+en hilos, queda limitado por el GIL. Aquí:
+
+- Se descartan sin parsear los PDF que no contienen ni "/URI" ni "/ObjStm"
+  (las anotaciones pueden ir comprimidas dentro de un flujo de objetos),
+  leyendo el archivo por bloques hasta PRESUPUESTO_BYTES más la cola.
+- El parseo se hace en un pool de procesos y se detiene en PRESUPUESTO_PAGINAS.
+- El resultado (incluido "sin enlaces") se guarda en Ebook/_enlaces_pdf.json
+  por huella del archivo (hash del contenido completo), así volver a detectar
+  no vuelve a parsear los PDF sin cambios.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+from .utils import escribir_atomico
+
+PRESUPUESTO_BYTES = 256 * 1024 * 1024  # lectura máxima para la verificación rápida
+PRESUPUESTO_PAGINAS = 2000             # páginas máximas a recorrer con pypdf
+BLOQUE = 1024 * 1024
+MARCAS = (b"/URI", b"/ObjStm")
+CACHE_ARCHIVO = "_enlaces_pdf.json"
+VERSION_CACHE = 2  # cambiarla invalida lo guardado si cambia la huella o la extracción
+
+# Serializa leer-fusionar-escribir de la caché global entre extractores del proceso.
+_cache_lock = threading.Lock()
+
+
+def get_cache_path() -> Path:
+    return Path(os.getcwd()) / "Ebook" / CACHE_ARCHIVO
+
+
+def huella(path: Path) -> str:
+    """blake2b del archivo completo: un cambio en cualquier parte invalida la caché."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(BLOQUE), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def tiene_marcas(path: Path, max_bytes: int = PRESUPUESTO_BYTES) -> bool:
+    """True si el PDF podría tener enlaces (aparece /URI o /ObjStm)."""
+    solape = max(len(m) for m in MARCAS) - 1
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        previo = b""
+        leidos = 0
+        while leidos < max_bytes:
+            bloque = f.read(BLOQUE)
+            if not bloque:
+                return False
+            datos = previo + bloque
+            if any(m in datos for m in MARCAS):
+                return True
+            previo = datos[-solape:]
+            leidos += len(bloque)
+        # Archivo mayor que el presupuesto: las actualizaciones incrementales
+        # (donde suelen quedar anotaciones agregadas) van al final.
+        f.seek(max(leidos, size - BLOQUE))
+        return any(m in f.read(BLOQUE) for m in MARCAS)
+
+
+def _uris_en_pdf(path: str, max_paginas: int = PRESUPUESTO_PAGINAS) -> List[str]:
+    """Se ejecuta en un proceso del pool."""
+    from pypdf import PdfReader
+
+    uris: List[str] = []
+    reader = PdfReader(path)
+    for idx, page in enumerate(reader.pages):
+        if idx >= max_paginas:
+            break
+        if "/Annots" not in page:
+            continue
+        for annot in page["/Annots"]:
+            obj = annot.get_object()
+            accion = obj.get("/A")
+            if accion is not None and "/URI" in accion:
+                uris.append(str(accion["/URI"]))
+    return uris
+
+
+class ExtractorEnlacesPdf:
+    """
+    Extrae las URI de PDF locales con caché por huella y parseo en procesos.
+    extraer() se llama desde los hilos de detección (bloquea sólo ese hilo).
+    Usar como context manager para cerrar el pool y guardar la caché.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self._lock = threading.Lock()
+        self._executor: concurrent.futures.ProcessPoolExecutor | None = None
+        self._cache: Dict[str, List[str]] = self._leer()
+        self._nuevas: Dict[str, List[str]] = {}
+        self.parseados = 0
+        self.descartados = 0
+
+    @staticmethod
+    def _leer() -> Dict[str, List[str]]:
+        try:
+            data = json.loads(get_cache_path().read_text(encoding="utf-8"))
+            if data.get("version") != VERSION_CACHE:
+                return {}
+            return data.get("pdf", {})
+        except Exception:
+            return {}
+
+    def _pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def extraer(self, path: Path) -> List[str]:
+        try:
+            clave = huella(path)
+        except OSError:
+            return []
+        with self._lock:
+            if clave in self._cache:
+                return list(self._cache[clave])
+
+        uris: List[str] = []
+        try:
+            marcas = tiene_marcas(path)
+            if marcas:
+                uris = self._pool().submit(_uris_en_pdf, str(path)).result()
+        except Exception:
+            return []  # PDF ilegible: no se guarda, se reintenta en la próxima detección
+
+        with self._lock:
+            if marcas:
+                self.parseados += 1
+            else:
+                self.descartados += 1
+            self._cache[clave] = uris
+            self._nuevas[clave] = uris
+        return list(uris)
+
+    def guardar(self) -> None:
+        """
+        Agrega las entradas nuevas a la caché global. Se llama una vez al
+        cerrar: varios proyectos pueden estar detectando a la vez y cada
+        guardado reescribe el archivo completo.
+        """
+        with self._lock:
+            nuevas = dict(self._nuevas)
+            self._nuevas.clear()
+        if not nuevas:
+            return
+        try:
+            with _cache_lock:
+                data = self._leer()  # otro proyecto pudo agregar entradas
+                data.update(nuevas)
+                escribir_atomico(get_cache_path(), json.dumps({"version": VERSION_CACHE, "pdf": data}))
+        except Exception:
+            with self._lock:
+                self._nuevas.update(nuevas)
+
+    def cerrar(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.guardar()
+
+    def __enter__(self) -> "ExtractorEnlacesPdf":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
@@ -8,6 +8,8 @@ Usa utilidades centralizadas.
 import concurrent.futures
 import json
 import os
+import threading
+import time
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Set
 from urllib.parse import parse_qs, urljoin, urlparse
@@ -16,6 +18,12 @@ import requests
 from bs4 import BeautifulSoup
 from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
 
+from . import perfilado
+from .enlaces import clave_enlace, enlazar_documentos
+from .enlaces_pdf import ExtractorEnlacesPdf
+from .progreso import ProgressEvent, ProgressTracker
+from .utils import CancelToken, escribir_atomico, marcar_interrupcion
+
 # Intentar importar pypdf
 try:
     from pypdf import PdfReader
@@ -74,6 +82,7 @@ def _load_payload(idp: str) -> dict:
         return {}
 
 
+@perfilado.medir("json.guardar")
 def _save_result(payload: dict, idp: str) -> Path:
     path = _get_exeva_json_path(idp)
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -121,6 +130,7 @@ def _normalize_url(base_context_url: str, href: str) -> str:
     return urljoin(BASE_URL, href)
 
 
+@perfilado.medir("http.fetch_html")
 def _fetch_html(url: str) -> str | None:
     try:
         resp = requests.get(url, timeout=30, verify=False)
@@ -131,8 +141,7 @@ def _fetch_html(url: str) -> str | None:
     return None
 
 
-def _resolve_and_extract_id(url: str) -> str | None:
-    if not url: return None
+def _docid_en_url(url: str) -> str | None:
     if "docId=" in url:
         try:
             parsed = urlparse(url)
@@ -140,10 +149,18 @@ def _resolve_and_extract_id(url: str) -> str | None:
             if "docId" in qs: return qs["docId"][0]
         except Exception:
             pass
+    return None
+
+
+def _resolve_and_extract_id(url: str, session: requests.Session | None = None) -> str | None:
+    if not url: return None
+    doc_id = _docid_en_url(url)
+    if doc_id:
+        return doc_id
 
     if "documento.php" in url:
         try:
-            resp = requests.head(url, allow_redirects=True, timeout=10, verify=False)
+            resp = (session or requests).head(url, allow_redirects=True, timeout=10, verify=False)
             final_url = resp.url
             if "docId=" in final_url:
                 parsed = urlparse(final_url)
@@ -155,6 +172,137 @@ def _resolve_and_extract_id(url: str) -> str | None:
     return None
 
 
+# =========================
+# Caché de resolución URL -> docId
+# =========================
+
+DOCIDS_GLOBAL = "_docids.json"
+REINTENTO_SIN_DOCID = 6 * 3600  # segundos antes de volver a consultar una URL que no resolvió
+_docids_lock = threading.Lock()  # leer-fusionar-escribir de los archivos de docId
+
+
+def _docids_paths(idp: str | None) -> List[Path]:
+    base = Path(os.getcwd()) / "Ebook"
+    paths = [base / DOCIDS_GLOBAL]
+    if idp:
+        paths.append(base / idp / "EXEVA" / f"{idp}_docids.json")
+    return paths
+
+
+class DocIdResolver:
+    """
+    Resuelve URLs documento.php a su docId con HEAD (siguiendo redirecciones)
+    una sola vez: guarda el resultado en memoria, en Ebook/<id>/EXEVA/<id>_docids.json
+    y en Ebook/_docids.json (compartido entre proyectos). Las URLs que no
+    resolvieron quedan registradas y no se reintentan hasta pasado
+    REINTENTO_SIN_DOCID. Seguro entre hilos: si dos hilos piden la misma URL,
+    sólo uno consulta y el otro espera su resultado.
+    """
+
+    def __init__(self, idp: str | None = None, session: requests.Session | None = None):
+        self.idp = idp
+        self.session = session or self._nueva_sesion()
+        self._lock = threading.Lock()
+        self._entradas: Dict[str, dict] = {}  # url -> {"id": str | None, "ts": epoch}
+        self._en_curso: Dict[str, threading.Event] = {}
+        self._nuevas: Dict[str, dict] = {}
+        self._sin_global: Dict[str, dict] = {}  # pendientes de escribir en el global
+        for path in _docids_paths(idp):
+            self._entradas.update(self._leer(path))
+        self.consultas = 0
+
+    @staticmethod
+    def _nueva_sesion() -> requests.Session:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @staticmethod
+    def _leer(path: Path) -> Dict[str, dict]:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            return {url: e for url, e in data.get("docids", {}).items() if isinstance(e, dict)}
+        except Exception:
+            return {}
+
+    def _vigente(self, entrada: dict | None) -> bool:
+        if not entrada:
+            return False
+        return bool(entrada.get("id")) or time.time() - entrada.get("ts", 0) < REINTENTO_SIN_DOCID
+
+    def resolver(self, url: str | None) -> str | None:
+        if not url:
+            return None
+        doc_id = _docid_en_url(url)
+        if doc_id or "documento.php" not in url:
+            return doc_id
+
+        with self._lock:
+            entrada = self._entradas.get(url)
+            if self._vigente(entrada):
+                return entrada.get("id")
+            evento = self._en_curso.get(url)
+            propio = evento is None
+            if propio:
+                evento = self._en_curso[url] = threading.Event()
+
+        if not propio:
+            evento.wait(timeout=15)
+            with self._lock:
+                return (self._entradas.get(url) or {}).get("id")
+
+        doc_id = None
+        try:
+            doc_id = _resolve_and_extract_id(url, self.session)
+        finally:
+            entrada = {"id": doc_id, "ts": time.time()}
+            with self._lock:
+                self._entradas[url] = entrada
+                self._nuevas[url] = entrada
+                self._en_curso.pop(url, None)
+                self.consultas += 1
+            evento.set()
+        return doc_id
+
+    def resolver_lote(self, urls: List[str], max_workers: int = 8) -> Dict[str, str | None]:
+        """Resuelve en paralelo las URLs distintas de la lista."""
+        unicas = list(dict.fromkeys(u for u in urls if u))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(unicas, executor.map(self.resolver, unicas)))
+
+    def guardar(self, final: bool = False) -> None:
+        """
+        Persiste las resoluciones nuevas en el archivo del proyecto. El global
+        (compartido con los proyectos que se procesan a la vez) sólo se
+        reescribe con final=True, al terminar la ejecución.
+        """
+        with self._lock:
+            nuevas = dict(self._nuevas)
+            self._nuevas.clear()
+            self._sin_global.update(nuevas)
+            para_global = dict(self._sin_global) if final else {}
+        if nuevas and self.idp and not self._escribir(_docids_paths(self.idp)[1], nuevas):
+            with self._lock:
+                self._nuevas.update(nuevas)  # se reintenta en el próximo guardado
+        if para_global and self._escribir(_docids_paths(None)[0], para_global):
+            with self._lock:
+                for url, entrada in para_global.items():
+                    if self._sin_global.get(url) is entrada:
+                        del self._sin_global[url]
+
+    def _escribir(self, path: Path, entradas: Dict[str, dict]) -> bool:
+        try:
+            with _docids_lock:
+                data = self._leer(path)  # otro proyecto pudo actualizar el global
+                data.update(entradas)
+                escribir_atomico(path, json.dumps({"docids": data}, ensure_ascii=False))
+            return True
+        except Exception:
+            return False
+
+
 def _extract_links_from_html_table(html: str, context_url: str) -> List[Dict[str, str]]:
     soup = BeautifulSoup(html, "html.parser")
     links_encontrados = []
@@ -194,24 +342,29 @@ def _extract_links_from_html_table(html: str, context_url: str) -> List[Dict[str
     return links_encontrados
 
 
-def _extract_links_from_pdf_file(file_path: Path) -> List[Dict[str, str]]:
+def _extract_links_from_pdf_file(file_path: Path, extractor: ExtractorEnlacesPdf | None = None) -> List[Dict[str, str]]:
     if not PYPDF_AVAILABLE or not file_path.exists():
         return []
     links = []
     try:
-        reader = PdfReader(str(file_path))
-        for page in reader.pages:
-            if "/Annots" in page:
-                for annot in page["/Annots"]:
-                    obj = annot.get_object()
-                    if "/A" in obj and "/URI" in obj["/A"]:
-                        uri = obj["/A"]["/URI"]
-                        if _is_valid_url(uri):
-                            links.append({
-                                "titulo": "Enlace en PDF",
-                                "url": uri,
-                                "origen": "pdf_interno"
-                            })
+        if extractor is not None:
+            uris = extractor.extraer(file_path)
+        else:
+            uris = []
+            reader = PdfReader(str(file_path))
+            for page in reader.pages:
+                if "/Annots" in page:
+                    for annot in page["/Annots"]:
+                        obj = annot.get_object()
+                        if "/A" in obj and "/URI" in obj["/A"]:
+                            uris.append(obj["/A"]["/URI"])
+        for uri in uris:
+            if _is_valid_url(uri):
+                links.append({
+                    "titulo": "Enlace en PDF",
+                    "url": uri,
+                    "origen": "pdf_interno"
+                })
     except Exception:
         pass
     return links
@@ -221,15 +374,18 @@ def _extract_links_from_pdf_file(file_path: Path) -> List[Dict[str, str]]:
 # Lógica Principal (Workers + Guardado Incremental)
 # =========================
 
-def _process_doc_attachments(doc: dict, detect_dir: Path, log: Callable | None) -> None:
+def _process_doc_attachments(doc: dict, detect_dir: Path, log: Callable | None,
+                             resolver: DocIdResolver | None = None,
+                             extractor: ExtractorEnlacesPdf | None = None) -> None:
+    resolve = resolver.resolver if resolver is not None else _resolve_and_extract_id
     anexos_list = []
     vinculados_list = []
-    urls_vistas = set()
+    claves_vistas = set()
 
     doc_titulo = str(doc.get("titulo", "Doc"))[:40]
 
     parent_url = doc.get("URL_documento")
-    parent_doc_id = _resolve_and_extract_id(parent_url) if parent_url else None
+    parent_doc_id = resolve(parent_url) if parent_url else None
 
     # 1. ANEXOS
     url_anexos = doc.get("anexos_expediente")
@@ -238,9 +394,10 @@ def _process_doc_attachments(doc: dict, detect_dir: Path, log: Callable | None)
         if html:
             encontrados = _extract_links_from_html_table(html, url_anexos)
             for item in encontrados:
-                if item["url"] not in urls_vistas:
+                clave = clave_enlace(item)
+                if clave not in claves_vistas:
                     anexos_list.append(item)
-                    urls_vistas.add(item["url"])
+                    claves_vistas.add(clave)
 
     # 2. DOC DIGITAL
     formato = str(doc.get("formato", "")).lower()
@@ -250,12 +407,15 @@ def _process_doc_attachments(doc: dict, detect_dir: Path, log: Callable | None)
         if html:
             encontrados = _extract_links_from_html_table(html, url_doc)
             for item in encontrados:
-                link_id = _resolve_and_extract_id(item["url"])
+                link_id = resolve(item["url"])
                 if parent_doc_id and link_id and parent_doc_id == link_id: continue
-                if item["url"] not in urls_vistas:
+                if link_id:
+                    item["docId"] = link_id
+                clave = clave_enlace(item)
+                if clave not in claves_vistas:
                     item["tipo"] = "vinculado_html"
                     vinculados_list.append(item)
-                    urls_vistas.add(item["url"])
+                    claves_vistas.add(clave)
 
     # 3. PDF LOCAL
     ruta_local = doc.get("ruta")
@@ -267,14 +427,17 @@ def _process_doc_attachments(doc: dict, detect_dir: Path, log: Callable | None)
                 path_obj = detect_dir / path_obj
 
             if path_obj.exists() and path_obj.suffix.lower() == ".pdf":
-                pdf_links = _extract_links_from_pdf_file(path_obj)
+                pdf_links = _extract_links_from_pdf_file(path_obj, extractor)
                 for item in pdf_links:
-                    link_id = _resolve_and_extract_id(item["url"])
+                    link_id = resolve(item["url"])
                     if parent_doc_id and link_id and parent_doc_id == link_id: continue
-                    if item["url"] not in urls_vistas:
+                    if link_id:
+                        item["docId"] = link_id
+                    clave = clave_enlace(item)
+                    if clave not in claves_vistas:
                         item["tipo"] = "vinculado_pdf"
                         vinculados_list.append(item)
-                        urls_vistas.add(item["url"])
+                        claves_vistas.add(clave)
         except Exception:
             pass
 
@@ -285,7 +448,9 @@ def _process_doc_attachments(doc: dict, detect_dir: Path, log: Callable | None)
         _log(log, f"[Worker] {doc_titulo}: {len(anexos_list)} anexos, {len(vinculados_list)} vinculados.")
 
 
-def detect_attachments(idp: str, log: Callable[[str], None] | None = None) -> dict:
+def detect_attachments(idp: str, log: Callable[[str], None] | None = None,
+                       cancel: CancelToken | None = None,
+                       progress: Callable[[ProgressEvent], None] | None = None) -> dict:
     payload = _load_payload(idp) or {}
     exeva = payload.get("EXEVA")
     if not isinstance(exeva, dict):
@@ -294,19 +459,39 @@ def detect_attachments(idp: str, log: Callable[[str], None] | None = None) -> di
 
     documentos = exeva.get("documentos") or []
     total = len(documentos)
-    detect_dir = Path(__file__).resolve().parent / "Detect"
+    # Las rutas de los documentos son relativas a la carpeta del proyecto.
+    detect_dir = Path(os.getcwd()) / "Ebook" / idp
+
+    # Tras una detención, sólo se analizan los documentos que faltaban.
+    pendientes = [d for d in documentos if isinstance(d, dict)]
+    if exeva.get("interrumpido") == "anexos":
+        pendientes = [d for d in pendientes if "anexos_detectados" not in d]
+        _log(log, f"[EXEVA3] Reanudando análisis: faltan {len(pendientes)} de {total} documentos.")
+        total = len(pendientes)
 
     _log(log, f"[EXEVA3] Iniciando análisis concurrente (10 workers) sobre {total} documentos...")
 
     SAVE_INTERVAL = 10
     processed_count = 0
+    progreso = ProgressTracker("Detección", total, progress)
+
+    # docId de los documentos madre: se resuelven juntos antes del análisis
+    # (los que ya estaban en caché no generan consultas).
+    resolver = DocIdResolver(idp)
+    resolver.resolver_lote([d.get("URL_documento") for d in pendientes])
+
+    extractor = ExtractorEnlacesPdf()
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        futures = []
-        for d in documentos:
-            if isinstance(d, dict):
-                f = executor.submit(_process_doc_attachments, d, detect_dir, log)
-                futures.append(f)
+    def _tarea(d: dict) -> None:
+        if cancel is not None and not cancel.check():
+            return
+        try:
+            _process_doc_attachments(d, detect_dir, log, resolver, extractor)
+        finally:
+            progreso.avanzar()
+
+    with extractor, concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+        futures = [executor.submit(_tarea, d) for d in pendientes]
 
         for f in concurrent.futures.as_completed(futures):
             try:
@@ -315,30 +500,55 @@ def detect_attachments(idp: str, log: Callable[[str], None] | None = None) -> di
                 if processed_count % SAVE_INTERVAL == 0:
                     payload["EXEVA"] = exeva
                     _save_result(payload, idp)
+                    resolver.guardar()
                     _log(log, f"[Persistencia] Progreso parcial guardado ({processed_count}/{total}).")
             except Exception as e:
                 _log(log, f"[EXEVA3] Error en un hilo: {e}")
 
+    progreso.terminar()
+    resolver.guardar(final=True)
+    if resolver.consultas:
+        _log(log, f"[EXEVA3] docId resueltos con {resolver.consultas} consultas HEAD (el resto desde caché).")
+    if extractor.parseados or extractor.descartados:
+        _log(log, f"[EXEVA3] PDF locales: {extractor.parseados} analizados, "
+                  f"{extractor.descartados} sin enlaces descartados sin parsear.")
+    enlaces = enlazar_documentos(exeva)
+    referencias = sum(len(nodo["documentos"]) for nodo in enlaces.values())
+    if referencias > len(enlaces):
+        _log(log, f"[EXEVA3] {len(enlaces)} enlaces distintos citados {referencias} veces en el proyecto.")
+    detenido = marcar_interrupcion(exeva, "anexos", cancel)
+    payload["EXEVA"] = exeva
     path_res = _save_result(payload, idp)
-    _log(log, f"[EXEVA3] Proceso finalizado. Datos guardados en: {path_res}")
+    if detenido:
+        _log(log, f"[EXEVA3] Análisis detenido. Progreso guardado en: {path_res}")
+    else:
+        _log(log, f"[EXEVA3] Proceso finalizado. Datos guardados en: {path_res}")
     return exeva
 
 
 class AnexosDetectWorker(QObject):
     finished_signal = pyqtSignal(bool, dict)
+    progress_signal = pyqtSignal(object)  # ProgressEvent
     log_signal = pyqtSignal(str)
 
     def __init__(self, project_id: str):
         super().__init__()
         self.project_id = project_id
+        self.cancel_token = CancelToken()
 
     @pyqtSlot()
     def run(self) -> None:
         success = False
         result_data: dict = {}
         try:
-            result_data = detect_attachments(self.project_id, log=self.log_signal.emit)
-            if result_data:
+            with perfilado.sesion(self.project_id, "anexos", self.log_signal.emit):
+                result_data = detect_attachments(
+                    self.project_id, log=self.log_signal.emit, cancel=self.cancel_token,
+                    progress=self.progress_signal.emit,
+                )
+            if self.cancel_token.cancelled:
+                self.log_signal.emit("⏹️ Detección de anexos detenida. Progreso guardado.")
+            elif result_data:
                 success = True
                 self.log_signal.emit("✅ Detección de anexos completada.")
             else:
@@ -351,6 +561,7 @@ class AnexosDetectWorker(QObject):
 class FetchAnexosController(QObject):
     detection_started = pyqtSignal()
     detection_finished = pyqtSignal(bool, dict)
+    detection_progress = pyqtSignal(object)  # ProgressEvent
     log_requested = pyqtSignal(str)
 
     def __init__(self, parent=None):
@@ -373,6 +584,7 @@ class FetchAnexosController(QObject):
         self.thread.started.connect(self.worker.run)
 
         self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.progress_signal.connect(self.detection_progress.emit)
         self.worker.finished_signal.connect(self._on_finished)
         self.thread.finished.connect(self._on_thread_finished)
 
@@ -387,6 +599,21 @@ class FetchAnexosController(QObject):
         self.thread = None
         self.worker = None
 
+    def pause(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.pause()
+            self.log_requested.emit("⏸️ Detección de anexos en pausa.")
+
+    def resume(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.resume()
+            self.log_requested.emit("▶️ Detección de anexos reanudada.")
+
+    def cancel(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.cancel()
+            self.log_requested.emit("⏹️ Deteniendo detección de anexos (se guarda el progreso)...")
+
     @pyqtSlot(bool, dict)
     def _on_finished(self, success: bool, exeva_data: dict) -> None:
         self._finished_dispatched = True
@@ -8,6 +8,9 @@ from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
 from bs4 import BeautifulSoup
 from typing import Callable, Dict, Any, List
 
+from . import catalogo
+from .utils import tomar_prefetch
+
 
 # --- LÓGICA DE PERSISTENCIA ---
 
@@ -36,6 +39,7 @@ def _save_antgen_data(idp: str, antgen_data: dict, new_status: str, log: Callabl
         # 3. Guardar payload modificado
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=4, ensure_ascii=False)
+        catalogo.registrar(idp, data)
 
     except Exception as e:
         log(f"❌ Error crítico al escribir en JSON: {e}")
@@ -51,16 +55,18 @@ ANTGEN_URL_TEMPLATE = (
 def _extract_antgen(idp: str, log: Callable[[str], None]) -> Dict[str, Any]:
     """Extrae los Antecedentes Generales de la ficha del expediente."""
     url = ANTGEN_URL_TEMPLATE.format(IDP=idp)
-    log(f"🔎 Conectando a {url}...")
-
-    try:
-        r = requests.get(url, timeout=20)
-        r.raise_for_status()  # Lanza excepción si el estado HTTP es 4xx o 5xx
-    except requests.RequestException as e:
-        log(f"❌ Error de conexión/HTTP: {e}")
-        return {}
-
-    soup = BeautifulSoup(r.text, "html.parser")
+    html = tomar_prefetch(url)  # pre-cargada al detectar el ID
+    if html is None:
+        log(f"🔎 Conectando a {url}...")
+        try:
+            r = requests.get(url, timeout=20)
+            r.raise_for_status()  # Lanza excepción si el estado HTTP es 4xx o 5xx
+        except requests.RequestException as e:
+            log(f"❌ Error de conexión/HTTP: {e}")
+            return {}
+        html = r.text
+
+    soup = BeautifulSoup(html, "html.parser")
     ant: Dict[str, Any] = {}
 
     # Título y forma de presentación
@@ -12,6 +12,7 @@ import time
 import base64
 import concurrent.futures
 from collections import Counter
+from collections.abc import Mapping
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
@@ -21,6 +22,10 @@ import urllib3
 from bs4 import BeautifulSoup
 from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
 
+from . import catalogo, integridad, perfilado
+from .progreso import ProgressEvent, ProgressTracker
+from .utils import CancelToken, marcar_interrupcion, rutas_descarga, tomar_prefetch
+
 BASE_URL = "https://seia.sea.gob.cl"
 EXEVA_URL_TEMPLATES = [
     "https://seia.sea.gob.cl/expediente/xhr_expediente2.php?id_expediente={IDP}",
@@ -56,15 +61,26 @@ def _url_extension(url: str) -> str:
     return os.path.splitext(path)[1]
 
 
-def _download_binary(url: str, out_path: Path) -> Tuple[bool, Path]:
+@perfilado.medir("http.descarga")
+def _download_binary(url: str, out_path: Path, cancel: CancelToken | None = None,
+                     progreso: ProgressTracker | None = None, cuarentena: Path | None = None,
+                     verificacion: dict | None = None) -> Tuple[bool, Path]:
     out_path.parent.mkdir(parents=True, exist_ok=True)
     try:
         with requests.get(url, stream=True, timeout=30, verify=False) as r:
             r.raise_for_status()
-            with open(out_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            verificador = integridad.escribir_verificando(r, out_path, cancel, progreso, cuarentena)
+        if verificador is None:
+            return False, out_path
+        motivo = verificador.motivo()
+        if motivo:
+            if verificacion is not None:
+                verificacion["motivo"] = motivo
+            return False, out_path
+        if verificacion is not None:
+            verificacion["sha256"] = verificador.sha256
+        if perfilado.activo():
+            perfilado.contar("bytes.descargados", verificador.bytes)
         return True, out_path
     except Exception:
         return False, out_path
@@ -223,6 +239,7 @@ def _parse_tabla_vieja(tabla) -> List[Dict[str, Any]]:
     return documentos
 
 
+@perfilado.medir("parseo.documentos_exeva")
 def _parse_documentos_from_html(html: str, log: Callable[[str], None] | None) -> List[Dict[str, Any]]:
     """Parsea HTML de EXEVA y devuelve la lista de documentos encontrados."""
 
@@ -257,7 +274,9 @@ def _parse_documentos_from_html(html: str, log: Callable[[str], None] | None) ->
 # ---------------------------------------------------------------------------
 
 
-def _print_docdigital(url: str, out_path: Path, log: Callable[[str], None] | None = None) -> Tuple[bool, Path]:
+@perfilado.medir("selenium.imprimir")
+def _print_docdigital(url: str, out_path: Path, log: Callable[[str], None] | None = None,
+                      cuarentena: Path | None = None, verificacion: dict | None = None) -> Tuple[bool, Path]:
     """Imprime un documento digital usando Selenium (modo headless)."""
 
     try:
@@ -287,10 +306,15 @@ def _print_docdigital(url: str, out_path: Path, log: Callable[[str], None] | Non
         if out_path.suffix.lower() != ".pdf":
             out_path = out_path.with_suffix(".pdf")
 
-        with open(out_path, "wb") as f:
-            f.write(base64.b64decode(pdf["data"]))
-
         driver.quit()
+        verificador = integridad.guardar_verificando(base64.b64decode(pdf["data"]), out_path, cuarentena)
+        motivo = verificador.motivo()
+        if motivo:
+            if verificacion is not None:
+                verificacion["motivo"] = motivo
+            return False, out_path
+        if verificacion is not None:
+            verificacion["sha256"] = verificador.sha256
         return True, out_path
     except Exception as exc:
         _log(log, f"[EXEVA] Falló la impresión Selenium: {exc}")
@@ -306,66 +330,155 @@ def _doc_folder_name(n: str) -> str:
         return (n[-2:] or "00").zfill(2)
 
 
-def _process_doc(d: dict, base_dir: Path, project_id: str, log: Callable | None, overwrite: bool = False) -> bool:
+def _doc_destino(d: Mapping, files_root: Path) -> Path | None:
+    """Archivo de destino 'natural' del documento (sin numerar), o None si no tiene URL."""
+    url = d.get("URL_documento") or d.get("url") or ""
+    if not url:
+        return None
+    folio = str(d.get("folio") or "").strip()
+    titulo = str(d.get("titulo") or "").strip()
+    n = str(d.get("n") or d.get("num_doc") or "").strip()
+    formato = (d.get("formato") or "").strip().lower()
+
+    base_name = _sanitize_filename("_".join([p for p in [n, folio, titulo] if p])) or "documento"
+    ext_url = _url_extension(url)
+    is_php_like = ext_url in ("", ".php") or "documento.php" in url.lower()
+
+    final_ext = ext_url or ".bin"
+    if is_php_like or formato == "doc digital" or "pdf" in formato:
+        final_ext = ".pdf"
+    return files_root / _doc_folder_name(n) / (base_name + final_ext)
+
+
+def _ruta_previa(d: Mapping, base_dir: Path) -> Path | None:
+    ruta_prev = d.get("ruta")
+    if not ruta_prev:
+        return None
+    p_prev = Path(str(ruta_prev).replace("/", os.sep).replace("\\", os.sep))
+    return p_prev if p_prev.is_absolute() else (base_dir / p_prev).resolve()
+
+
+class NombresDocumentos:
+    """
+    Archivo de destino de cada documento en una ejecución de descarga.
+
+    Se asignan en el orden del expediente antes de lanzar los hilos. Los
+    nombres de los documentos que ya tienen 'ruta' quedan tomados; el resto
+    usa el primero libre entre nombre, nombre_1, nombre_2... Un archivo que ya
+    estaba en disco sin dueño (p. ej. tras re-extraer la tabla, que no trae
+    'ruta') se reemplaza en lugar de numerar otra copia.
+    """
+
+    def __init__(self, documentos: list, base_dir: Path):
+        files_root = base_dir / "EXEVA" / "files"
+        docs = [d for d in documentos or [] if isinstance(d, Mapping)]
+        tomados = set()
+        for d in docs:
+            previa = _ruta_previa(d, base_dir)
+            if previa is not None:
+                tomados.add(os.path.normcase(str(previa)))
+
+        self._destinos: Dict[int, Path] = {}
+        for d in docs:
+            if d.get("ruta"):
+                continue
+            path = _doc_destino(d, files_root)
+            if path is None:
+                continue
+            candidato, idx = path.resolve(), 0
+            while os.path.normcase(str(candidato)) in tomados:
+                idx += 1
+                candidato = candidato.with_name(f"{path.stem}_{idx}{path.suffix}")
+            tomados.add(os.path.normcase(str(candidato)))
+            self._destinos[id(d)] = candidato
+
+    def destino(self, d: Mapping) -> Path | None:
+        return self._destinos.get(id(d))
+
+
+def _process_doc(d: dict, base_dir: Path, project_id: str, log: Callable | None, overwrite: bool = False,
+                 cancel: CancelToken | None = None, progreso: ProgressTracker | None = None,
+                 nombres: NombresDocumentos | None = None) -> bool:
     exeva_dir = base_dir / "EXEVA"
     files_root = exeva_dir / "files"
 
     # 1. Validar si ya existe
     if not overwrite:
-        ruta_prev = d.get("ruta")
         try:
-            if ruta_prev:
-                p_str = str(ruta_prev).replace("/", os.sep).replace("\\", os.sep)
-                p_prev = Path(p_str)
-                if not p_prev.is_absolute():
-                    p_prev = (base_dir / p_prev).resolve()
-                if p_prev.is_file():
+            p_prev = _ruta_previa(d, base_dir)
+            if p_prev is not None and p_prev.is_file():
+                motivo = integridad.verificar_archivo(p_prev)
+                if motivo is None:
                     return True
+                # Descarga anterior dañada (HTML, truncada, vacía): se aparta y se baja de nuevo.
+                _log(log, f"[Worker] ⚠️ {p_prev.name}: {motivo}. Se mueve a cuarentena y se descarga de nuevo.")
+                integridad.poner_en_cuarentena(p_prev, exeva_dir / "cuarentena")
         except Exception:
             pass
 
     # 2. Datos
-    folio = str(d.get("folio") or "").strip()
     titulo = str(d.get("titulo") or "").strip()
-    n = str(d.get("n") or d.get("num_doc") or "").strip()
     formato = (d.get("formato") or "").strip().lower()
     url = d.get("URL_documento") or d.get("url") or ""
 
-    if not url:
+    destino = _doc_destino(d, files_root)
+    if destino is None:
         d["error_descarga"] = True
         return False
-
-    folder_name = _doc_folder_name(n)
-    out_dir = files_root / folder_name
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    # 3. Ruta usando utilidades
-    base_name = _sanitize_filename("_".join([p for p in [n, folio, titulo] if p])) or "documento"
     ext_url = _url_extension(url)
     is_php_like = ext_url in ("", ".php") or "documento.php" in url.lower()
 
-    final_ext = ext_url or ".bin"
-    if is_php_like or formato == "doc digital" or "pdf" in formato:
-        final_ext = ".pdf"
-
-    saved_path = out_dir / (base_name + final_ext)
+    # 3. Ruta: la propia si ya tenía (re-descarga), la asignada en esta
+    # ejecución (NombresDocumentos) o, sin asignación, una libre: dos
+    # documentos con el mismo nombre saneado no se pisan.
+    reemplazar = True
+    propia = _ruta_previa(d, base_dir)
+    if propia is not None:
+        destino = propia
+    elif nombres is not None and nombres.destino(d) is not None:
+        destino = nombres.destino(d)
+    else:
+        reemplazar = overwrite
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        reservada = rutas_descarga.reservar(destino, reemplazar=reemplazar)
+    except OSError as exc:
+        _log(log, f"[Worker] No se pudo crear el archivo de {titulo}: {exc}")
+        d["error_descarga"] = True
+        return False
+    saved_path = reservada
 
-    # 4. Descarga
+    # 4. Descarga (verificada; un archivo rechazado va a cuarentena y se reintenta)
     use_printer = (is_php_like or formato == "doc digital") and ("pdf firmado" not in formato)
+    cuarentena = exeva_dir / "cuarentena"
 
     ok = False
-    if use_printer:
-        if overwrite:
-            _log(log, f"[Worker] Recargando (Selenium): {titulo}")
+    verificacion: dict = {}
+    for intento in range(integridad.REINTENTOS + 1):
+        verificacion = {}
+        if use_printer:
+            if overwrite:
+                _log(log, f"[Worker] Recargando (Selenium): {titulo}")
+            else:
+                _log(log, f"[Worker] Imprimiendo: {titulo}")
+            ok, saved_path = _print_docdigital(url, saved_path, log=log, cuarentena=cuarentena,
+                                               verificacion=verificacion)
         else:
-            _log(log, f"[Worker] Imprimiendo: {titulo}")
-        ok, saved_path = _print_docdigital(url, saved_path, log=log)
+            if overwrite:
+                _log(log, f"[Worker] Recargando: {titulo}")
+            else:
+                _log(log, f"[Worker] Descargando: {titulo}")
+            ok, saved_path = _download_binary(url, saved_path, cancel, progreso, cuarentena=cuarentena,
+                                              verificacion=verificacion)
+        if ok or "motivo" not in verificacion or (cancel is not None and cancel.cancelled):
+            break
+        _log(log, f"[Worker] ⚠️ {titulo}: {verificacion['motivo']}. Archivo en cuarentena"
+                  + (", reintentando." if intento < integridad.REINTENTOS else "."))
+
+    if ok and saved_path == reservada:
+        rutas_descarga.liberar(reservada)
     else:
-        if overwrite:
-            _log(log, f"[Worker] Recargando: {titulo}")
-        else:
-            _log(log, f"[Worker] Descargando: {titulo}")
-        ok, saved_path = _download_binary(url, saved_path)
+        rutas_descarga.descartar(reservada)
 
     # 5. Guardar ruta
     if ok:
@@ -379,15 +492,24 @@ def _process_doc(d: dict, base_dir: Path, project_id: str, log: Callable | None,
             clean_path = clean_path[1:]
 
         d["ruta"] = clean_path
+        d["sha256"] = verificacion["sha256"]
         d.pop("error_descarga", None)
+        d.pop("error_verificacion", None)
         return True
 
+    if cancel is not None and cancel.cancelled:
+        # Detenido a mitad de descarga: no es un error, se reintenta al reanudar.
+        return False
     _log(log, f"[Worker] Falló: {titulo}")
     d["error_descarga"] = True
+    if "motivo" in verificacion:
+        d["error_verificacion"] = verificacion["motivo"]
     return False
 
 
-def _download_documents(project_id: str, exeva_data: dict, log: Callable[[str], None] | None = None) -> None:
+def _download_documents(project_id: str, exeva_data: dict, log: Callable[[str], None] | None = None,
+                        cancel: CancelToken | None = None,
+                        progress: Callable[[ProgressEvent], None] | None = None) -> None:
     documentos = exeva_data.get("EXEVA", {}).get("documentos", []) if isinstance(exeva_data, dict) else []
     total = len(documentos)
 
@@ -397,12 +519,20 @@ def _download_documents(project_id: str, exeva_data: dict, log: Callable[[str],
         return
 
     _log(log, f"[EXEVA] Iniciando descarga de {total} documentos...")
+    progreso = ProgressTracker("Descarga", total, progress)
+    nombres = NombresDocumentos(documentos, base_dir)
+
+    def _tarea(d: dict) -> bool:
+        # Entre documentos: espera si está en pausa y no empieza nuevos si se detuvo.
+        if cancel is not None and not cancel.check():
+            return False
+        try:
+            return _process_doc(d, base_dir, project_id, log, False, cancel, progreso, nombres)
+        finally:
+            progreso.avanzar()
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-        futures = [
-            executor.submit(_process_doc, d, base_dir, project_id, log, False)
-            for d in documentos
-        ]
+        futures = [executor.submit(_tarea, d) for d in documentos]
 
         completed = 0
         for future in concurrent.futures.as_completed(futures):
@@ -412,7 +542,39 @@ def _download_documents(project_id: str, exeva_data: dict, log: Callable[[str],
             except Exception as exc:
                 _log(log, f"[EXEVA] Error en descarga concurrente: {exc}")
 
-    _log(log, "[EXEVA] Descarga finalizada.")
+    progreso.terminar()
+    if cancel is not None and cancel.cancelled:
+        _log(log, "[EXEVA] Descarga detenida.")
+    else:
+        _log(log, "[EXEVA] Descarga finalizada.")
+
+
+def _reanudar_descargas(idp: str, exeva_data: dict) -> int:
+    """
+    Si la descarga anterior quedó detenida, conserva las rutas ya bajadas
+    (por URL del documento) para no repetirlas. Retorna cuántas se conservan.
+    """
+    path = os.path.join(os.getcwd(), "Ebook", idp, "EXEVA", f"{idp}_EXEVA.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            previo = json.load(f).get("EXEVA", {})
+    except Exception:
+        return 0
+    if previo.get("interrumpido") != "exeva":
+        return 0
+
+    rutas = {
+        d.get("URL_documento"): d["ruta"]
+        for d in previo.get("documentos") or []
+        if isinstance(d, dict) and d.get("URL_documento") and d.get("ruta")
+    }
+    conservadas = 0
+    for d in exeva_data.get("EXEVA", {}).get("documentos", []):
+        ruta = rutas.get(d.get("URL_documento"))
+        if ruta and not d.get("ruta"):
+            d["ruta"] = ruta
+            conservadas += 1
+    return conservadas
 
 
 # ---------------------------------------------------------------------------
@@ -425,19 +587,21 @@ def _extract_exeva(idp: str, log: Callable[[str], None] | None = None) -> Dict[s
     documentos: List[Dict[str, Any]] = []
     for template in EXEVA_URL_TEMPLATES:
         url = template.format(IDP=idp)
-        _log(log, f"[EXEVA] Consultando expediente: {url}")
-
-        try:
-            r = requests.get(url, timeout=15, verify=False)
-        except requests.RequestException as exc:
-            _log(log, f"[EXEVA] Error de conexión con '{url}': {exc}")
-            continue
+        html = tomar_prefetch(url)  # pre-cargada al detectar el ID
+        if html is None:
+            _log(log, f"[EXEVA] Consultando expediente: {url}")
+            try:
+                r = requests.get(url, timeout=15, verify=False)
+            except requests.RequestException as exc:
+                _log(log, f"[EXEVA] Error de conexión con '{url}': {exc}")
+                continue
 
-        if r.status_code != 200:
-            _log(log, f"[EXEVA] Respuesta HTTP inesperada ({r.status_code}) para '{url}'")
-            continue
+            if r.status_code != 200:
+                _log(log, f"[EXEVA] Respuesta HTTP inesperada ({r.status_code}) para '{url}'")
+                continue
+            html = r.text
 
-        documentos = _parse_documentos_from_html(r.text, log)
+        documentos = _parse_documentos_from_html(html, log)
         if documentos:
             break
         _log(log, f"[EXEVA] Respuesta sin documentos desde '{url}', probando siguiente plantilla...")
@@ -459,6 +623,7 @@ def _extract_exeva(idp: str, log: Callable[[str], None] | None = None) -> Dict[s
 # Persistencia
 # ---------------------------------------------------------------------------
 
+@perfilado.medir("json.guardar")
 def _save_exeva_data(idp: str, exeva_data: dict, new_status: str, log: Callable[[str], None]):
     base_folder = os.path.join(os.getcwd(), "Ebook", idp)
     base_json_path = os.path.join(base_folder, f"{idp}_fetch.json")
@@ -490,6 +655,7 @@ def _save_exeva_data(idp: str, exeva_data: dict, new_status: str, log: Callable[
 
         with open(base_json_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4, ensure_ascii=False)
+        catalogo.registrar(idp, data)
     except Exception as exc:
         log(f"❌ Error crítico al actualizar estado en JSON base: {exc}")
 
@@ -501,11 +667,13 @@ def _save_exeva_data(idp: str, exeva_data: dict, new_status: str, log: Callable[
 
 class ExevaFetchWorker(QObject):
     log_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal(object)  # ProgressEvent
     finished_signal = pyqtSignal(bool, dict)
 
     def __init__(self, project_id: str):
         super().__init__()
         self.project_id = project_id
+        self.cancel_token = CancelToken()
 
     @pyqtSlot()
     def run(self):
@@ -513,14 +681,26 @@ class ExevaFetchWorker(QObject):
         success = False
         result_data: Dict[str, Any] = {}
         try:
-            exeva_data = _extract_exeva(self.project_id, log=self.log_signal.emit)
+            with perfilado.sesion(self.project_id, "exeva_extraccion", self.log_signal.emit):
+                exeva_data = _extract_exeva(self.project_id, log=self.log_signal.emit)
             documentos = exeva_data.get("EXEVA", {}).get("documentos", [])
 
             if documentos:
-                _download_documents(self.project_id, exeva_data, log=self.log_signal.emit)
+                conservadas = _reanudar_descargas(self.project_id, exeva_data)
+                if conservadas:
+                    self.log_signal.emit(f"⏳ Reanudando descarga: {conservadas} documentos ya descargados.")
+                with perfilado.sesion(self.project_id, "exeva_descarga", self.log_signal.emit):
+                    _download_documents(
+                        self.project_id, exeva_data, log=self.log_signal.emit, cancel=self.cancel_token,
+                        progress=self.progress_signal.emit,
+                    )
+                detenido = marcar_interrupcion(exeva_data["EXEVA"], "exeva", self.cancel_token)
                 _save_exeva_data(self.project_id, exeva_data, "edicion", log=self.log_signal.emit)
-                self.log_signal.emit("✅ Extracción de EXEVA completada.")
-                success = True
+                if detenido:
+                    self.log_signal.emit("⏹️ Extracción de EXEVA detenida. Progreso guardado.")
+                else:
+                    self.log_signal.emit("✅ Extracción de EXEVA completada.")
+                    success = True
                 result_data = exeva_data
             else:
                 _save_exeva_data(self.project_id, exeva_data, "error", log=self.log_signal.emit)
@@ -533,7 +713,7 @@ class ExevaFetchWorker(QObject):
 
 class SingleDocDownloadWorker(QObject):
     log_signal = pyqtSignal(str)
-    finished_signal = pyqtSignal(bool, dict)
+    finished_signal = pyqtSignal(bool, object)  # el mismo doc_data (dict o Documento), sin copiar
 
     def __init__(self, project_id: str, doc_data: dict):
         super().__init__()
@@ -558,8 +738,9 @@ class SingleDocDownloadWorker(QObject):
 class FetchExevaController(QObject):
     extraction_started = pyqtSignal()
     extraction_finished = pyqtSignal(bool, dict)
+    extraction_progress = pyqtSignal(object)  # ProgressEvent
     retry_started = pyqtSignal()
-    retry_finished = pyqtSignal(bool, dict)
+    retry_finished = pyqtSignal(bool, object)
     log_requested = pyqtSignal(str)
 
     def __init__(self, parent=None):
@@ -585,6 +766,7 @@ class FetchExevaController(QObject):
         self.thread.started.connect(self.worker.run)
 
         self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.progress_signal.connect(self.extraction_progress.emit)
         self.worker.finished_signal.connect(self._on_finished)
         self.thread.finished.connect(self._on_thread_finished)
 
@@ -599,6 +781,21 @@ class FetchExevaController(QObject):
         self.thread = None
         self.worker = None
 
+    def pause(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.pause()
+            self.log_requested.emit("⏸️ Extracción de EXEVA en pausa.")
+
+    def resume(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.resume()
+            self.log_requested.emit("▶️ Extracción de EXEVA reanudada.")
+
+    def cancel(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.cancel()
+            self.log_requested.emit("⏹️ Deteniendo extracción de EXEVA (se guarda el progreso)...")
+
     @pyqtSlot(bool, dict)
     def _on_finished(self, success: bool, exeva_data: dict):
         self._finished_dispatched = True
@@ -637,8 +834,8 @@ class FetchExevaController(QObject):
         self.retry_thread = None
         self.retry_worker = None
 
-    @pyqtSlot(bool, dict)
-    def _on_retry_finished(self, success: bool, doc_data: dict) -> None:
+    @pyqtSlot(bool, object)
+    def _on_retry_finished(self, success: bool, doc_data) -> None:
         self._retry_finished_dispatched = True
         self.retry_finished.emit(success, doc_data)
 
@@ -1,11 +1,17 @@
 import os
 import json
 import requests
+import threading
 import time
 import re
+import concurrent.futures
+from typing import Callable, Dict, List, Tuple
 from bs4 import BeautifulSoup
 from PyQt6.QtCore import QObject, QThread, pyqtSignal
 
+from . import catalogo, perfilado
+from .utils import guardar_prefetch
+
 # --- CONFIGURACIÓN BASE ---
 EXPEDIENTES_FRAGMENTS = {
     "ANTGEN": "fichaPrincipal.php",
@@ -33,188 +39,288 @@ UI_TITLES = {
 }
 
 
-class FetchWorker(QThread):
-    log_signal = pyqtSignal(str)
-    finished_signal = pyqtSignal(bool, int, str)
+SEIA_USER_AGENT = "EDJ5/1.0 (+UI)"
 
-    def __init__(self, project_id):
-        super().__init__()
-        self.project_id = project_id
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": "EDJ5/1.0 (+UI)"})
 
-    def _extraer_idr_desde_onclick(self, onclick: str) -> str | None:
-        if not onclick:
-            return None
-        m = re.search(r"id_expediente=(\d+)", onclick)
-        return m.group(1) if m else None
+def _log(cb: Callable[[str], None] | None, message: str) -> None:
+    if cb:
+        cb(message)
 
-    def run(self):
-        idp = self.project_id
-        self.log_signal.emit(f"🔍 Consultando SEIA para ID: {idp}...")
-
-        found_count = 0
-        expedientes_data = {}
-
-        # ---------------------------------------------------------
-        # 1. Detección Base (Ficha Principal)
-        # ---------------------------------------------------------
-        url_base = f"https://seia.sea.gob.cl/expediente/expedientesEvaluacion.php?modo=ficha&id_expediente={idp}"
-        html_main = self._fetch_html(url_base)
-
-        if html_main:
-            self.log_signal.emit("Analizando secciones generales...")
-            html_lower = html_main.lower()
-
-            for code, fragments in EXPEDIENTES_FRAGMENTS.items():
-                fragment_list = fragments if isinstance(fragments, (list, tuple, set)) else [fragments]
-                is_present = any(fragment.lower() in html_lower for fragment in fragment_list)
-                if is_present:
-                    found_count += 1
-                    expedientes_data[code] = {
-                        "status": "detectado",
-                        "titulo": UI_TITLES.get(code, code),
-                        "tipo": "base",
-                        "step_index": 0,
-                        "step_status": "detectado"  # <--- AGREGADO: Inicializa en azul
-                    }
-        else:
-            self.log_signal.emit("⚠️ No se pudo cargar la ficha principal (posible error de conexión).")
 
-        # ---------------------------------------------------------
-        # 2. Detección de Recursos (SIEMPRE INTENTAR)
-        # ---------------------------------------------------------
-        self.log_signal.emit("🔎 Buscando recursos asociados...")
+def new_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update({"User-Agent": SEIA_USER_AGENT})
+    return session
 
-        recursos_found = self._obtener_recursos_con_id(idp)
 
-        if recursos_found:
-            self.log_signal.emit(f"   ↳ ¡Éxito! Se encontraron {len(recursos_found)} recursos.")
-            for res in recursos_found:
-                found_count += 1
-                unique_key = f"REC_{res['idr']}"
-                titulo_dinamico = f"{res['tipo']} ({res['fecha']})"
+def _extraer_idr_desde_onclick(onclick: str) -> str | None:
+    if not onclick:
+        return None
+    m = re.search(r"id_expediente=(\d+)", onclick)
+    return m.group(1) if m else None
+
+
+@perfilado.medir("http.fetch_html")
+def _fetch_html(session: requests.Session, url: str) -> str | None:
+    try:
+        r = session.get(url, timeout=15)
+        if r.status_code == 200:
+            return r.text
+    except Exception:
+        pass
+    return None
+
+
+def _primera_valida(session: requests.Session, urls: List[str], es_valida: Callable[[str], object]):
+    """
+    Consulta todas las URLs a la vez y retorna el primer resultado válido
+    (es_valida(html) distinto de None/False). No espera a las consultas
+    restantes: las pendientes se cancelan y las que ya están en curso se
+    descartan al terminar.
+    """
+    resuelto = threading.Event()
+
+    def _sonda(url: str):
+        html = _fetch_html(session, url)
+        if not html or resuelto.is_set():
+            return None
+        return es_valida(html)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="sonda")
+    try:
+        futures = [executor.submit(_sonda, url) for url in urls]
+        for future in concurrent.futures.as_completed(futures):
+            resultado = future.result()
+            if resultado:
+                resuelto.set()
+                return resultado
+        return None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _tabla_recursos(html: str) -> BeautifulSoup | None:
+    soup = BeautifulSoup(html, "html.parser")
+    if soup.find("table", id="tbldocumentos") or \
+            soup.select_one("table.dataTable") or \
+            "Número de registros" in soup.get_text():
+        return soup
+    return None
+
+
+def _obtener_recursos_con_id(session: requests.Session, idp: str) -> List[Dict[str, str]]:
+    urls = [
+        f"https://seia.sea.gob.cl/expediente/expedientesRecursos.php?modo=ficha&id_expediente={idp}",
+        f"https://seia.sea.gob.cl/recursos/xhr_principal.php?modo=ficha&id_expediente={idp}",
+        f"https://seia.sea.gob.cl/expediente/expedientesRecursos.php?id_expediente={idp}"
+    ]
+
+    # Las tres variantes se consultan en paralelo; gana la primera con tabla.
+    soup = _primera_valida(session, urls, _tabla_recursos)
+    if not soup:
+        return []
+
+    recursos = []
+    tabla = soup.find("table", id="tbldocumentos") or \
+            soup.select_one("table.table-striped.tabla-dinamica") or \
+            soup.select_one("table.dataTable")
+
+    if tabla:
+        tbody = tabla.find("tbody")
+        filas = tbody.find_all("tr") if tbody else tabla.find_all("tr")
+
+        for fila in filas:
+            if fila.find("th"):
+                continue
+
+            c = fila.find_all("td")
+            if len(c) < 3:
+                continue
+
+            fecha = c[0].get_text(strip=True)
+            col_tipo = c[1]
+            a_tag = col_tipo.find("a", href=True)
+            tipo = a_tag.get_text(strip=True) if a_tag else "Recurso"
+            href = a_tag["href"] if a_tag else ""
+
+            idr = None
+            if href:
+                m = re.search(r"id_expediente=(\d+)", href)
+                if m: idr = m.group(1)
+
+            if not idr:
+                for td in c:
+                    btn = td.find("button", onclick=True)
+                    if btn:
+                        idr_btn = _extraer_idr_desde_onclick(btn.get("onclick", ""))
+                        if idr_btn:
+                            idr = idr_btn
+                            break
+
+            estado = c[2].get_text(strip=True)
+
+            if idr:
+                recursos.append({
+                    "idr": idr,
+                    "fecha": fecha,
+                    "tipo": tipo,
+                    "estado": estado
+                })
+
+    return recursos
+
+
+def _prefetch_secciones(session: requests.Session, idp: str, codigos: List[str],
+                        log: Callable[[str], None] | None) -> None:
+    """Pre-carga en segundo plano las páginas de ANTGEN y EXEVA detectadas."""
+    from .fetch_antgen import ANTGEN_URL_TEMPLATE
+    from .fetch_exeva import EXEVA_URL_TEMPLATES
+
+    urls = []
+    if "ANTGEN" in codigos:
+        urls.append(ANTGEN_URL_TEMPLATE.format(IDP=idp))
+    if "EXEVA" in codigos:
+        urls.append(EXEVA_URL_TEMPLATES[0].format(IDP=idp))
+
+    def _cargar(url: str) -> None:
+        try:
+            r = session.get(url, timeout=20, verify=False)
+            if r.status_code == 200:
+                guardar_prefetch(url, r.text)
+        except Exception:
+            pass
 
-                expedientes_data[unique_key] = {
+    for url in urls:
+        threading.Thread(target=_cargar, args=(url,), name="prefetch", daemon=True).start()
+    if urls:
+        _log(log, f"⏳ Pre-cargando {', '.join(c for c in ('ANTGEN', 'EXEVA') if c in codigos)} en segundo plano.")
+
+
+def detect_expedientes(
+    idp: str,
+    log: Callable[[str], None] | None = None,
+    session: requests.Session | None = None,
+    prefetch: bool = False,
+) -> Tuple[bool, int]:
+    """
+    Detecta las secciones del proyecto en SEIA y guarda Ebook/<id>/<id>_fetch.json.
+    Retorna (success, found_count). Sin dependencias de la interfaz.
+
+    La ficha principal y las consultas de recursos se hacen en paralelo (una
+    sola ida y vuelta). Con prefetch=True, además se pre-cargan en segundo
+    plano las páginas de ANTGEN y EXEVA detectadas para las etapas siguientes.
+    """
+    session = session or new_session()
+    _log(log, f"🔍 Consultando SEIA para ID: {idp}...")
+
+    found_count = 0
+    expedientes_data = {}
+
+    url_base = f"https://seia.sea.gob.cl/expediente/expedientesEvaluacion.php?modo=ficha&id_expediente={idp}"
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        futuro_ficha = executor.submit(_fetch_html, session, url_base)
+        futuro_recursos = executor.submit(_obtener_recursos_con_id, session, idp)
+
+    # ---------------------------------------------------------
+    # 1. Detección Base (Ficha Principal)
+    # ---------------------------------------------------------
+    html_main = futuro_ficha.result()
+
+    if html_main:
+        _log(log, "Analizando secciones generales...")
+        html_lower = html_main.lower()
+
+        for code, fragments in EXPEDIENTES_FRAGMENTS.items():
+            fragment_list = fragments if isinstance(fragments, (list, tuple, set)) else [fragments]
+            is_present = any(fragment.lower() in html_lower for fragment in fragment_list)
+            if is_present:
+                found_count += 1
+                expedientes_data[code] = {
                     "status": "detectado",
-                    "titulo": titulo_dinamico,
-                    "tipo": "recurso",
-                    "idr": res['idr'],
-                    "estado_sea": res['estado'],
+                    "titulo": UI_TITLES.get(code, code),
+                    "tipo": "base",
                     "step_index": 0,
                     "step_status": "detectado"  # <--- AGREGADO: Inicializa en azul
                 }
-        else:
-            self.log_signal.emit("   ↳ No se detectaron recursos activos.")
-
-        # ---------------------------------------------------------
-        # 3. Guardado
-        # ---------------------------------------------------------
-        if found_count == 0:
-            self.log_signal.emit("❌ No se encontró nada (ni ficha base ni recursos).")
-            self.finished_signal.emit(True, 0, idp)
-            return
-
-        try:
-            base_folder = os.path.join(os.getcwd(), "Ebook", idp)
-            os.makedirs(base_folder, exist_ok=True)
-
-            payload = {
-                "id": idp,
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "summary": {"found": found_count},
-                "expedientes": expedientes_data
+    else:
+        _log(log, "⚠️ No se pudo cargar la ficha principal (posible error de conexión).")
+
+    # ---------------------------------------------------------
+    # 2. Detección de Recursos (SIEMPRE INTENTAR)
+    # ---------------------------------------------------------
+    _log(log, "🔎 Buscando recursos asociados...")
+
+    try:
+        recursos_found = futuro_recursos.result()
+    except Exception:
+        recursos_found = []
+
+    if recursos_found:
+        _log(log, f"   ↳ ¡Éxito! Se encontraron {len(recursos_found)} recursos.")
+        for res in recursos_found:
+            found_count += 1
+            unique_key = f"REC_{res['idr']}"
+            titulo_dinamico = f"{res['tipo']} ({res['fecha']})"
+
+            expedientes_data[unique_key] = {
+                "status": "detectado",
+                "titulo": titulo_dinamico,
+                "tipo": "recurso",
+                "idr": res['idr'],
+                "estado_sea": res['estado'],
+                "step_index": 0,
+                "step_status": "detectado"  # <--- AGREGADO: Inicializa en azul
             }
+    else:
+        _log(log, "   ↳ No se detectaron recursos activos.")
+
+    # ---------------------------------------------------------
+    # 3. Guardado
+    # ---------------------------------------------------------
+    if found_count == 0:
+        _log(log, "❌ No se encontró nada (ni ficha base ni recursos).")
+        return True, 0
+
+    try:
+        base_folder = os.path.join(os.getcwd(), "Ebook", idp)
+        os.makedirs(base_folder, exist_ok=True)
+
+        payload = {
+            "id": idp,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "summary": {"found": found_count},
+            "expedientes": expedientes_data
+        }
+
+        json_path = os.path.join(base_folder, f"{idp}_fetch.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=4)
+        catalogo.registrar(idp, payload)
+
+        _log(log, f"✅ Análisis finalizado. Total secciones: {found_count}")
+        if prefetch:
+            _prefetch_secciones(session, idp, list(expedientes_data), log)
+        return True, found_count
+
+    except Exception as e:
+        _log(log, f"❌ Error al guardar JSON: {e}")
+        return False, 0
 
-            json_path = os.path.join(base_folder, f"{idp}_fetch.json")
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(payload, f, ensure_ascii=False, indent=4)
-
-            self.log_signal.emit(f"✅ Análisis finalizado. Total secciones: {found_count}")
-            self.finished_signal.emit(True, found_count, idp)
 
-        except Exception as e:
-            self.log_signal.emit(f"❌ Error al guardar JSON: {e}")
-            self.finished_signal.emit(False, 0, idp)
+class FetchWorker(QThread):
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, int, str)
 
-    def _fetch_html(self, url):
-        try:
-            r = self.session.get(url, timeout=15)
-            if r.status_code == 200:
-                return r.text
-        except Exception:
-            pass
-        return None
+    def __init__(self, project_id):
+        super().__init__()
+        self.project_id = project_id
+        self.session = new_session()
 
-    def _obtener_recursos_con_id(self, idp):
-        urls = [
-            f"https://seia.sea.gob.cl/expediente/expedientesRecursos.php?modo=ficha&id_expediente={idp}",
-            f"https://seia.sea.gob.cl/recursos/xhr_principal.php?modo=ficha&id_expediente={idp}",
-            f"https://seia.sea.gob.cl/expediente/expedientesRecursos.php?id_expediente={idp}"
-        ]
-
-        soup = None
-        for url in urls:
-            html = self._fetch_html(url)
-            if html:
-                tmp = BeautifulSoup(html, "html.parser")
-                if tmp.find("table", id="tbldocumentos") or \
-                        tmp.select_one("table.dataTable") or \
-                        "Número de registros" in tmp.get_text():
-                    soup = tmp
-                    break
-
-        if not soup:
-            return []
-
-        recursos = []
-        tabla = soup.find("table", id="tbldocumentos") or \
-                soup.select_one("table.table-striped.tabla-dinamica") or \
-                soup.select_one("table.dataTable")
-
-        if tabla:
-            tbody = tabla.find("tbody")
-            filas = tbody.find_all("tr") if tbody else tabla.find_all("tr")
-
-            for fila in filas:
-                if fila.find("th"):
-                    continue
-
-                c = fila.find_all("td")
-                if len(c) < 3:
-                    continue
-
-                fecha = c[0].get_text(strip=True)
-                col_tipo = c[1]
-                a_tag = col_tipo.find("a", href=True)
-                tipo = a_tag.get_text(strip=True) if a_tag else "Recurso"
-                href = a_tag["href"] if a_tag else ""
-
-                idr = None
-                if href:
-                    m = re.search(r"id_expediente=(\d+)", href)
-                    if m: idr = m.group(1)
-
-                if not idr:
-                    for td in c:
-                        btn = td.find("button", onclick=True)
-                        if btn:
-                            idr_btn = self._extraer_idr_desde_onclick(btn.get("onclick", ""))
-                            if idr_btn:
-                                idr = idr_btn
-                                break
-
-                estado = c[2].get_text(strip=True)
-
-                if idr:
-                    recursos.append({
-                        "idr": idr,
-                        "fecha": fecha,
-                        "tipo": tipo,
-                        "estado": estado
-                    })
-
-        return recursos
+    def run(self):
+        success, found_count = detect_expedientes(
+            self.project_id, log=self.log_signal.emit, session=self.session, prefetch=True
+        )
+        self.finished_signal.emit(success, found_count, self.project_id)
 
 
 class FetchExp(QObject):
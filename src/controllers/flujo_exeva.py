@@ -0,0 +1,293 @@
+"""
+Flujo EXEVA por documento (descarga → anexos → descarga de anexos →
+descompresión → indexación) con etapas encadenadas por colas acotadas.
+
+En lugar de esperar a que termine cada etapa para todo el expediente, cada
+documento avanza en cuanto sale de la etapa anterior: apenas se descarga un
+documento se detectan sus anexos, y apenas llega un comprimido se descomprime
+e indexa. Así se solapan las etapas de red con las de CPU/disco. Reutiliza las
+funciones de cada controlador (_process_doc, _process_doc_attachments,
+_process_link_item, _process_item, _indexar_item).
+
+Se ejecuta como la etapa "exeva_flujo" de pipeline.py (CLI y planificador),
+que ya abre su sesión de perfilado.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, List
+
+from .progreso import ProgressEvent, ProgressTracker
+from .utils import CancelToken, log as _log, marcar_interrupcion
+
+_FIN = object()
+
+# Hilos y capacidad de la cola de entrada por etapa.
+HILOS_ETAPA = {
+    "descarga": 8,
+    "anexos": 6,
+    "descarga_anexos": 4,
+    "descompresion": 2,
+}
+CAPACIDAD_COLA = 64
+INTERVALO_GUARDADO = 15.0  # segundos
+
+
+class _Etapa:
+    """
+    Pool de hilos que consume una cola acotada y entrega a etapas siguientes.
+    Si 'total' es None, el total del progreso crece con cada ítem recibido.
+    """
+
+    def __init__(self, nombre: str, funcion: Callable[[Any], None], hilos: int, productores: int,
+                 log: Callable[[str], None] | None, cancel: CancelToken | None = None,
+                 total: int | None = None, progress: Callable[[ProgressEvent], None] | None = None):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.hilos = hilos
+        self.cola: queue.Queue = queue.Queue(maxsize=CAPACIDAD_COLA)
+        self.siguientes: List[_Etapa] = []
+        self.procesados = 0
+        self._productores = productores
+        self._vivos = hilos
+        self._lock = threading.Lock()
+        self._fin = threading.Event()
+        self._log = log
+        self._cancel = cancel
+        self._total_fijo = total is not None
+        self.progreso = ProgressTracker(nombre, total or 0, progress)
+        self._threads = [
+            threading.Thread(target=self._run, name=f"flujo-{nombre}-{i}", daemon=True)
+            for i in range(hilos)
+        ]
+
+    def start(self) -> None:
+        for t in self._threads:
+            t.start()
+
+    def join(self) -> None:
+        for t in self._threads:
+            t.join()
+
+    def terminada(self, timeout: float) -> bool:
+        """Espera hasta 'timeout' segundos a que terminen todos los hilos."""
+        return self._fin.wait(timeout)
+
+    def put(self, item: Any) -> None:
+        if not self._total_fijo:
+            self.progreso.agregar_total()
+        self.cola.put(item)
+
+    def cerrar_productor(self) -> None:
+        with self._lock:
+            self._productores -= 1
+            ultimo = self._productores == 0
+        if ultimo:
+            for _ in range(self.hilos):
+                self.cola.put(_FIN)
+
+    def _run(self) -> None:
+        while True:
+            item = self.cola.get()
+            if item is _FIN:
+                break
+            # En pausa, el hilo espera aquí; si se detuvo, sólo drena la cola.
+            if self._cancel is not None and not self._cancel.check():
+                continue
+            try:
+                self.funcion(item)
+            except Exception as exc:
+                _log(self._log, f"[FLUJO] Error en etapa {self.nombre}: {exc}")
+            with self._lock:
+                self.procesados += 1
+            self.progreso.avanzar()
+
+        with self._lock:
+            self._vivos -= 1
+            ultimo = self._vivos == 0
+        if ultimo:
+            self.progreso.terminar()
+            self._fin.set()
+            for siguiente in self.siguientes:
+                siguiente.cerrar_productor()
+
+
+def _get_exeva_json_path(idp: str) -> Path:
+    return Path(os.getcwd()) / "Ebook" / idp / "EXEVA" / f"{idp}_EXEVA.json"
+
+
+def _load_payload(idp: str) -> dict:
+    path = _get_exeva_json_path(idp)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def _guardar_avance(idp: str, payload: dict) -> bool:
+    """
+    Punto de control atómico del JSON EXEVA mientras los hilos siguen
+    trabajando. Si un hilo modifica el payload durante la serialización se
+    omite este guardado (se reintenta en el siguiente intervalo).
+    """
+    try:
+        texto = json.dumps(payload, indent=4, ensure_ascii=False)
+    except RuntimeError:
+        return False
+    path = _get_exeva_json_path(idp)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(texto, encoding="utf-8")
+    os.replace(tmp, path)
+    return True
+
+
+def procesar_expediente(
+    idp: str,
+    extraer: bool = False,
+    log: Callable[[str], None] | None = None,
+    progress: Callable[[ProgressEvent], None] | None = None,
+    cancel: CancelToken | None = None,
+) -> dict:
+    """
+    Ejecuta el flujo completo por documento. Si 'extraer' es True (o no hay
+    JSON EXEVA previo) consulta primero la lista de documentos en SEIA.
+    Con 'cancel' se puede pausar o detener; al detenerse se guarda el avance
+    y la siguiente ejecución retoma sin repetir lo ya hecho.
+    Retorna el bloque EXEVA actualizado ({} si no hay documentos).
+    """
+    from .down_anexos import _process_link_item
+    from .enlaces import clave_enlace, enlazar_documentos
+    from .enlaces_pdf import ExtractorEnlacesPdf
+    from .fetch_anexos import DocIdResolver, _process_doc_attachments
+    from .fetch_exeva import NombresDocumentos, _extract_exeva, _process_doc, _save_exeva_data
+    from .indexar import _indexar_item, numerar_expediente
+    from .unpack import _process_item, _set_unrar_tool
+
+    emit = log or (lambda _msg: None)
+    payload = {} if extraer else _load_payload(idp)
+    if not payload.get("EXEVA", {}).get("documentos"):
+        payload = _extract_exeva(idp, log=log)
+    exeva = payload.get("EXEVA") or {}
+    documentos = [d for d in exeva.get("documentos") or [] if isinstance(d, dict)]
+    if not documentos:
+        _save_exeva_data(idp, payload, "error", log=emit)
+        return {}
+
+    _set_unrar_tool(log)
+    project_root = Path(os.getcwd()) / "Ebook" / idp
+    project_root.mkdir(parents=True, exist_ok=True)
+    exeva_root = project_root / "EXEVA"
+    files_root = exeva_root / "files"
+    failures: List[dict] = []
+    resolver = DocIdResolver(idp)
+    extractor = ExtractorEnlacesPdf()
+    # Cada destino del grafo de enlaces se descarga y descomprime una sola vez;
+    # al final enlazar_documentos copia el resultado a los demás documentos.
+    reclamados: set = set()
+    reclamados_lock = threading.Lock()
+    nombres = NombresDocumentos(documentos, project_root)
+    reanudar = exeva.get("interrumpido") == "flujo"
+    if reanudar:
+        _log(log, "[FLUJO] Reanudando flujo interrumpido.")
+
+    # --- Funciones de cada etapa ---
+
+    def descargar(doc: dict) -> None:
+        _process_doc(doc, project_root, idp, log, False, cancel, descarga.progreso, nombres)
+        anexos.put(doc)
+
+    def detectar(doc: dict) -> None:
+        if not (reanudar and "anexos_detectados" in doc):
+            _process_doc_attachments(doc, project_root, log, resolver, extractor)
+        descompresion.put(doc)
+        n = str(doc.get("n") or "0000").strip()
+        for link in (doc.get("anexos_detectados") or []) + (doc.get("vinculados_detectados") or []):
+            if not isinstance(link, dict):
+                continue
+            clave = clave_enlace(link)
+            with reclamados_lock:
+                if clave in reclamados:
+                    continue
+                if clave:
+                    reclamados.add(clave)
+            descarga_anexos.put((link, n))
+
+    def descargar_anexo(tarea: tuple) -> None:
+        link, n = tarea
+        _process_link_item(
+            link, n, files_root, exeva_root, idp, log, cancel=cancel, progreso=descarga_anexos.progreso
+        )
+        descompresion.put(link)
+
+    def descomprimir(item: dict) -> None:
+        if not (reanudar and "descomprimidos" in item):
+            item.pop("descomprimidos", None)
+            _process_item(item, project_root, exeva_root, log, failures, progreso=descompresion.progreso)
+        _indexar_item(item)
+
+    # --- Cadena de etapas ---
+    total = len(documentos)
+    descarga = _Etapa("Descarga", descargar, HILOS_ETAPA["descarga"], 1, log, cancel, total, progress)
+    anexos = _Etapa("Detección", detectar, HILOS_ETAPA["anexos"], 1, log, cancel, total, progress)
+    descarga_anexos = _Etapa(
+        "Anexos", descargar_anexo, HILOS_ETAPA["descarga_anexos"], 1, log, cancel, None, progress
+    )
+    descompresion = _Etapa(
+        "Descompresión", descomprimir, HILOS_ETAPA["descompresion"], 2, log, cancel, None, progress
+    )
+    descarga.siguientes = [anexos]
+    anexos.siguientes = [descarga_anexos, descompresion]
+    descarga_anexos.siguientes = [descompresion]
+    etapas = [descarga, anexos, descarga_anexos, descompresion]
+
+    _log(log, f"[FLUJO] Procesando {len(documentos)} documentos por etapas encadenadas...")
+    inicio = time.monotonic()
+    for etapa in etapas:
+        etapa.start()
+
+    def alimentar() -> None:
+        for doc in documentos:
+            if cancel is not None and cancel.cancelled:
+                break
+            descarga.put(doc)
+        descarga.cerrar_productor()
+
+    feeder = threading.Thread(target=alimentar, name="flujo-alimentador", daemon=True)
+    feeder.start()
+
+    # Guardado periódico mientras avanza el flujo.
+    ultimo_guardado = time.monotonic()
+    while not descompresion.terminada(timeout=1.0):
+        if time.monotonic() - ultimo_guardado >= INTERVALO_GUARDADO and _guardar_avance(idp, payload):
+            ultimo_guardado = time.monotonic()
+
+    feeder.join()
+    for etapa in etapas:
+        etapa.join()
+    extractor.cerrar()
+
+    enlazar_documentos(exeva)
+    numerar_expediente(idp, exeva, log=log)
+    resolver.guardar(final=True)
+    detenido = marcar_interrupcion(exeva, "flujo", cancel)
+    _save_exeva_data(idp, payload, "edicion", log=emit)
+    if detenido:
+        _log(log, "[FLUJO] Flujo detenido. Progreso guardado; se retoma en la próxima ejecución.")
+
+    if failures:
+        _log(log, "[FLUJO] Archivos con error en descompresión:")
+        for failure in failures:
+            _log(log, f" - {failure['archivo']}: {failure['error']}")
+    _log(log, f"[FLUJO] Expediente procesado en {time.monotonic() - inicio:.1f} s "
+              f"({descarga_anexos.procesados} anexos, {descompresion.procesados} ítems revisados).")
+    return exeva
+
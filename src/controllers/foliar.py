@@ -0,0 +1,378 @@
+"""
+Foliado continuo del expediente EXEVA.
+
+Estampa en cada página de los PDF descargados un número de folio (o Bates),
+el ID del proyecto y el N° del documento. La parte fija del estampado se
+dibuja una sola vez por tamaño de página y se inserta como Form XObject
+compartido; por página sólo se agrega un flujo mínimo con el número.
+Los archivos se procesan en paralelo (procesos) y el resultado queda en
+EXEVA/Foliado junto a un mapa documento → primera/última página.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import io
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from .recorrido import get_project_root, is_pdf_entry, iter_entradas, load_exeva_payload
+from .utils import log as _log
+
+FORMATOS_FOLIO = {
+    "folio": "Folio {folio:06d}",
+    "bates": "{idp}-{folio:07d}",
+}
+
+# Recurso de fuente de los estampados; render_service lo reutiliza en el pie.
+FONT_NAME = "/EDJFolioF"
+_FONT_SIZE = 9
+_MARGEN = 18
+
+
+def get_foliado_dir(idp: str) -> Path:
+    return get_project_root(idp) / "EXEVA" / "Foliado"
+
+
+def get_folios_map_path(idp: str) -> Path:
+    return get_foliado_dir(idp) / f"{idp}_folios.json"
+
+
+def load_folios_map(idp: str) -> dict:
+    path = get_folios_map_path(idp)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def pdf_escape(text: str) -> bytes:
+    """Codifica texto (WinAnsi) como literal de un operador Tj."""
+    raw = text.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _render_overlay(width: float, height: float, texto: str) -> bytes:
+    """Dibuja la parte fija del estampado (reportlab) para un tamaño de página."""
+    from reportlab.pdfgen import canvas
+    from src.templates.pdf_styles import COLOR_PRIMARIO
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=(width, height))
+    c.setFillColor(COLOR_PRIMARIO)
+    c.setStrokeColor(COLOR_PRIMARIO)
+    c.setFont("Helvetica", 8)
+    c.drawString(_MARGEN, _MARGEN, texto)
+    c.setLineWidth(0.4)
+    c.line(_MARGEN, _MARGEN + 11, width - _MARGEN, _MARGEN + 11)
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+class _Estampador:
+    """Cachea por tamaño de página el XObject fijo y los recursos compartidos."""
+
+    def __init__(self, writer, texto_fijo: str):
+        from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+        self.writer = writer
+        self.texto_fijo = texto_fijo
+        self._xobjects: Dict[tuple, tuple] = {}
+
+        font = DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+            NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+        })
+        self.font_ref = writer._add_object(font)
+
+        # Un único "q" compartido aísla el estado gráfico del contenido original.
+        push = DecodedStreamObject()
+        push.set_data(b"q\n")
+        self.push_ref = writer._add_object(push)
+
+    def xobject(self, width: float, height: float):
+        from pypdf import PdfReader
+        from pypdf.generic import (
+            ArrayObject, DecodedStreamObject, FloatObject, NameObject,
+        )
+
+        key = (round(width, 1), round(height, 1))
+        if key not in self._xobjects:
+            overlay = PdfReader(io.BytesIO(_render_overlay(width, height, self.texto_fijo))).pages[0]
+            form = DecodedStreamObject()
+            form.set_data(overlay.get_contents().get_data())
+            form[NameObject("/Type")] = NameObject("/XObject")
+            form[NameObject("/Subtype")] = NameObject("/Form")
+            form[NameObject("/BBox")] = ArrayObject(
+                [FloatObject(0), FloatObject(0), FloatObject(width), FloatObject(height)]
+            )
+            form[NameObject("/Resources")] = overlay["/Resources"].clone(self.writer)
+            name = NameObject(f"/EDJFolio{len(self._xobjects)}")
+            self._xobjects[key] = (name, self.writer._add_object(form))
+        return self._xobjects[key]
+
+    def estampar(self, page, texto_folio: str) -> None:
+        from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+
+        if page.get("/Rotate"):
+            page.transfer_rotation_to_content()
+
+        box = page.mediabox
+        llx, lly = float(box.left), float(box.bottom)
+        width, height = float(box.width), float(box.height)
+        name, ref = self.xobject(width, height)
+
+        if "/Resources" not in page:
+            page[NameObject("/Resources")] = DictionaryObject()
+        resources = page["/Resources"].get_object()
+        for key in ("/XObject", "/Font"):
+            if key not in resources:
+                resources[NameObject(key)] = DictionaryObject()
+        resources["/XObject"].get_object()[name] = ref
+        resources["/Font"].get_object()[NameObject(FONT_NAME)] = self.font_ref
+
+        text_w = stringWidth(texto_folio, "Helvetica", _FONT_SIZE)
+        x = width - _MARGEN - text_w
+        stamp = DecodedStreamObject()
+        stamp.set_data(
+            b"Q\nq 1 0 0 1 %.2f %.2f cm %s Do " % (llx, lly, name.encode())
+            + b"0.082 0.376 0.51 rg BT %s %d Tf %.2f %.2f Td (%s) Tj ET Q\n"
+            % (FONT_NAME.encode(), _FONT_SIZE, x, float(_MARGEN), pdf_escape(texto_folio))
+        )
+
+        contents = page.get("/Contents")
+        originales: List[Any] = []
+        if contents is not None:
+            contents = contents.get_object()
+            originales = list(contents) if isinstance(contents, ArrayObject) else [page.raw_get("/Contents")]
+        page[NameObject("/Contents")] = ArrayObject(
+            [self.push_ref, *originales, self.writer._add_object(stamp)]
+        )
+
+
+def _contar_paginas(path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def _estampar_archivo(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Estampa un PDF completo. Se ejecuta en un proceso del pool."""
+    from pypdf import PdfWriter
+
+    src, dst = task["src"], task["dst"]
+    try:
+        writer = PdfWriter(clone_from=src)
+        estampador = _Estampador(writer, task["texto_fijo"])
+        folio = task["desde"]
+        for page in writer.pages:
+            texto = task["formato"].format(folio=folio, idp=task["idp"])
+            estampador.estampar(page, texto)
+            folio += 1
+
+        Path(dst).parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst + ".tmp"
+        with open(tmp, "wb") as f:
+            writer.write(f)
+        os.replace(tmp, dst)
+        return {"clave": task["clave"], "ok": True}
+    except Exception as exc:
+        return {"clave": task["clave"], "ok": False, "error": str(exc)}
+
+
+def _destino_foliado(foliado_dir: Path, ruta: str) -> Path:
+    rel = ruta.replace("\\", "/")
+    if rel.startswith("EXEVA/"):
+        rel = rel[len("EXEVA/"):]
+    return foliado_dir / rel
+
+
+def foliar_expediente(
+    idp: str,
+    formato: str = "folio",
+    inicio: int = 1,
+    workers: int | None = None,
+    log: Callable[[str], None] | None = None,
+) -> dict:
+    payload = load_exeva_payload(idp) or {}
+    exeva = payload.get("EXEVA")
+    if not isinstance(exeva, dict):
+        _log(log, "[FOLIAR] No hay datos EXEVA para foliar.")
+        return {}
+
+    project_root = get_project_root(idp)
+    foliado_dir = get_foliado_dir(idp)
+    plantilla = FORMATOS_FOLIO.get(formato, formato)
+    previo = load_folios_map(idp).get("mapa", {})
+
+    entradas: List[Dict[str, Any]] = []
+    vistos = set()
+    for entry in iter_entradas(exeva, project_root):
+        if is_pdf_entry(entry) and entry["clave"] not in vistos:
+            vistos.add(entry["clave"])
+            entradas.append(entry)
+
+    if not entradas:
+        _log(log, "[FOLIAR] No hay PDF descargados para foliar.")
+        return {}
+
+    max_workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    _log(log, f"[FOLIAR] Contando páginas de {len(entradas)} archivos ({max_workers} procesos)...")
+
+    mapa: Dict[str, Dict[str, Any]] = {}
+    errores: List[Dict[str, str]] = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_contar_paginas, str(e["path"])) for e in entradas]
+        folio = int(inicio)
+        for entry, future in zip(entradas, futures):
+            try:
+                paginas = future.result()
+            except Exception as exc:
+                errores.append({"ruta": entry["ruta"], "error": f"PDF ilegible: {exc}"})
+                continue
+            if paginas <= 0:
+                continue
+            mapa[entry["clave"]] = {
+                "n": entry["n"],
+                "titulo": entry["titulo"],
+                "paginas": paginas,
+                "desde": folio,
+                "hasta": folio + paginas - 1,
+                "ruta_foliada": _destino_foliado(foliado_dir, entry["ruta"]).relative_to(project_root).as_posix(),
+            }
+            folio += paginas
+
+        tasks = []
+        for entry in entradas:
+            info = mapa.get(entry["clave"])
+            if not info:
+                continue
+            dst = project_root / info["ruta_foliada"]
+            anterior = previo.get(entry["clave"]) or {}
+            texto_fijo = f"ID {idp} · Doc. N° {entry['n']}"
+            # Se re-estampa si cambió el folio, el formato, el texto fijo (p. ej. el N° del
+            # documento) o el PDF original.
+            vigente = (
+                dst.exists()
+                and anterior.get("desde") == info["desde"]
+                and anterior.get("formato", plantilla) == plantilla
+                and anterior.get("texto_fijo") == texto_fijo
+                and dst.stat().st_mtime >= entry["path"].stat().st_mtime
+            )
+            info["formato"] = plantilla
+            info["texto_fijo"] = texto_fijo
+            if vigente:
+                continue
+            tasks.append({
+                "clave": entry["clave"],
+                "idp": idp,
+                "src": str(entry["path"]),
+                "dst": str(dst),
+                "desde": info["desde"],
+                "formato": plantilla,
+                "texto_fijo": texto_fijo,
+            })
+
+        _log(log, f"[FOLIAR] Estampando {len(tasks)} archivos "
+                  f"({len(mapa) - len(tasks)} sin cambios)...")
+        procesados = 0
+        for future in concurrent.futures.as_completed(
+            [executor.submit(_estampar_archivo, t) for t in tasks]
+        ):
+            res = future.result()
+            procesados += 1
+            if not res.get("ok"):
+                mapa.pop(res["clave"], None)
+                errores.append({"ruta": res["clave"], "error": res.get("error", "")})
+                _log(log, f"[FOLIAR] Error en {res['clave']}: {res.get('error')}")
+            if procesados % 50 == 0:
+                _log(log, f"[FOLIAR] Progreso: {procesados}/{len(tasks)}")
+
+    result = {
+        "IDP": idp,
+        "generado": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "formato": plantilla,
+        "folio_inicial": int(inicio),
+        "folio_final": max((v["hasta"] for v in mapa.values()), default=int(inicio) - 1),
+        "mapa": mapa,
+        "errores": errores,
+    }
+    path = get_folios_map_path(idp)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=4, ensure_ascii=False), encoding="utf-8")
+    _log(log, f"[FOLIAR] Folios {result['folio_inicial']}–{result['folio_final']} asignados. "
+              f"Errores: {len(errores)}.")
+    return result
+
+
+class FoliarWorker(QObject):
+    finished_signal = pyqtSignal(bool, dict)
+    log_signal = pyqtSignal(str)
+
+    def __init__(self, project_id: str, formato: str):
+        super().__init__()
+        self.project_id = project_id
+        self.formato = formato
+
+    @pyqtSlot()
+    def run(self) -> None:
+        success = False
+        result_data: dict = {}
+        try:
+            result_data = foliar_expediente(self.project_id, self.formato, log=self.log_signal.emit)
+            success = bool(result_data.get("mapa"))
+            if success:
+                self.log_signal.emit("✅ Foliado del expediente completado.")
+            else:
+                self.log_signal.emit("⚠️ No hay documentos para foliar.")
+        except Exception as exc:
+            self.log_signal.emit(f"❌ Error inesperado durante el foliado: {exc}")
+        self.finished_signal.emit(success, result_data)
+
+
+class FoliarController(QObject):
+    foliar_started = pyqtSignal()
+    foliar_finished = pyqtSignal(bool, dict)
+    log_requested = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker: FoliarWorker | None = None
+        self.thread: QThread | None = None
+
+    def start_foliar(self, project_id: str, formato: str = "folio") -> None:
+        if self.thread and self.thread.isRunning():
+            self.log_requested.emit("⚠️ El foliado ya está en curso.")
+            return
+
+        self.foliar_started.emit()
+        self.thread = QThread()
+        self.worker = FoliarWorker(project_id, formato)
+
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+
+        self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.finished_signal.connect(self.foliar_finished.emit)
+        self.worker.finished_signal.connect(self.thread.quit)
+        self.worker.finished_signal.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self._cleanup_thread)
+
+        self.thread.start()
+
+    def _cleanup_thread(self) -> None:
+        if self.thread:
+            self.thread.deleteLater()
+        self.thread = None
+        self.worker = None
@@ -3,11 +3,15 @@ from __future__ import annotations
 import json
 import os
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Dict, List
 
 from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
 
-from .utils import log as _log
+from . import perfilado
+from .progreso import ProgressEvent, ProgressTracker
+from .utils import CancelToken, escribir_atomico, log as _log
+
+VERSION_NUMERACION = 1
 
 
 def _get_exeva_json_path(idp: str) -> Path:
@@ -24,6 +28,7 @@ def _load_payload(idp: str) -> dict:
         return {}
 
 
+@perfilado.medir("json.guardar")
 def _save_payload(idp: str, payload: dict) -> Path:
     path = _get_exeva_json_path(idp)
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -31,32 +36,101 @@ def _save_payload(idp: str, payload: dict) -> Path:
     return path
 
 
-def _assign_n_to_tree(node: dict | list) -> None:
-    if isinstance(node, list):
-        for idx, item in enumerate(node, 1):
-            if isinstance(item, dict):
-                item.setdefault("n", f"{idx:04d}")
-            _assign_n_to_tree(item)
-        return
+def _get_numeracion_path(idp: str) -> Path:
+    return _get_exeva_json_path(idp).with_name(f"{idp}_numeracion.json")
+
+
+def numerar_arbol(raiz: dict) -> Dict[str, str]:
+    """
+    Asigna 'n' a los nodos de un árbol 'descomprimidos' sin pisar los que ya
+    tienen. Recorre sólo 'contenido' con pila explícita (sin límite de
+    profundidad). Devuelve {n relativo ('0002.0013'): ruta} del subárbol,
+    omitiendo la raíz como hace recorrido.iter_entradas.
+    """
+    if "n" not in raiz and any(key in raiz for key in ("ruta", "nombre", "titulo", "archivo")):
+        raiz["n"] = "0001"
+    rutas: Dict[str, str] = {}
+    contenido = raiz.get("contenido")
+    stack: List[tuple[list, str]] = [(contenido, "")] if isinstance(contenido, list) else []
+    while stack:
+        items, prefijo = stack.pop()
+        for idx, node in enumerate(items, 1):
+            if not isinstance(node, dict):
+                continue
+            n = str(node.setdefault("n", f"{idx:04d}"))
+            ruta_n = f"{prefijo}.{n}" if prefijo else n
+            rutas[ruta_n] = str(node.get("ruta") or "").replace("\\", "/")
+            hijos = node.get("contenido")
+            if isinstance(hijos, list) and hijos:
+                stack.append((hijos, ruta_n))
+    return rutas
+
+
+def _leer_numeracion(idp: str) -> Dict[str, dict]:
+    try:
+        data = json.loads(_get_numeracion_path(idp).read_text(encoding="utf-8"))
+        if data.get("version") != VERSION_NUMERACION:
+            return {}
+        return data.get("items") or {}
+    except Exception:
+        return {}
 
-    if not isinstance(node, dict):
-        return
 
-    if "n" not in node and any(key in node for key in ("ruta", "nombre", "titulo", "archivo")):
-        node["n"] = "0001"
+def numerar_expediente(idp: str, exeva: dict, completo: bool = False,
+                       log: Callable[[str], None] | None = None) -> int:
+    """
+    Numera documentos, anexos/vinculados y árboles 'descomprimidos' y
+    actualiza el índice lateral <id>_numeracion.json (n jerárquico → ruta,
+    misma numeración que recorrido.iter_entradas).
 
-    contenido = node.get("contenido")
-    if isinstance(contenido, list):
-        for idx, item in enumerate(contenido, 1):
-            if isinstance(item, dict):
-                item.setdefault("n", f"{idx:04d}")
-            _assign_n_to_tree(item)
+    Un árbol está pendiente si su raíz aún no tiene 'n' (unpack lo acaba de
+    generar) o si el índice no lo tiene para ese ítem; los demás se reutilizan
+    sin recorrerlos. Con completo=True se recorren todos.
+    Retorna la cantidad de árboles recorridos.
+    """
+    documentos = exeva.get("documentos") or []
+    previo = {} if completo else _leer_numeracion(idp)
+    items: Dict[str, dict] = {}
+    recorridos = 0
 
-    for key, value in node.items():
-        if key == "contenido":
+    for d_idx, doc in enumerate(documentos, 1):
+        if not isinstance(doc, dict):
             continue
-        if isinstance(value, (dict, list)):
-            _assign_n_to_tree(value)
+        doc.setdefault("n", f"{d_idx:04d}")
+        doc_n = str(doc["n"]).strip() or f"{d_idx:04d}"
+        entradas = [(doc_n, doc)]
+        links = []
+        for key in ("anexos_detectados", "vinculados_detectados"):
+            lista = doc.get(key)
+            if not isinstance(lista, list):
+                continue
+            for idx, link in enumerate(lista, 1):
+                if isinstance(link, dict):
+                    link.setdefault("n", f"{idx:04d}")
+                    links.append(link)
+        # Anexos y vinculados comparten una sola serie por documento (recorrido).
+        entradas.extend((f"{doc_n}.{l_idx:04d}", link) for l_idx, link in enumerate(links, 1))
+
+        for item_n, item in entradas:
+            ruta = str(item.get("ruta") or "").replace("\\", "/")
+            bloque = {"ruta": ruta}
+            arbol = item.get("descomprimidos")
+            if isinstance(arbol, dict):
+                anterior = previo.get(item_n)
+                if "n" in arbol and anterior and anterior.get("ruta") == ruta and "arbol" in anterior:
+                    bloque["arbol"] = anterior["arbol"]
+                else:
+                    bloque["arbol"] = numerar_arbol(arbol)
+                    recorridos += 1
+            items[item_n] = bloque
+
+    path = _get_numeracion_path(idp)
+    try:
+        escribir_atomico(path, json.dumps({"version": VERSION_NUMERACION, "items": items}, ensure_ascii=False))
+    except OSError as e:
+        # Sin índice lateral la próxima indexación recorre todos los árboles.
+        _log(log, f"[INDEXAR] ⚠️ No se pudo guardar {path.name}: {e}")
+    return recorridos
 
 
 def _mark_index_error(item: dict, error: str) -> None:
@@ -77,14 +151,16 @@ def _indexar_item(item: dict) -> bool:
         _mark_index_error(item, "No se encontró estructura descomprimida.")
         return False
     had_error = bool(item.get("error_indexacion") or item.get("errores_indexacion"))
-    _assign_n_to_tree(tree)
     _clear_index_error(item)
     if had_error:
         item["estado_descompresion"] = "verificado"
     return True
 
 
-def indexar_exeva(idp: str, log: Callable[[str], None] | None = None) -> dict:
+def indexar_exeva(idp: str, log: Callable[[str], None] | None = None,
+                  cancel: CancelToken | None = None,
+                  progress: Callable[[ProgressEvent], None] | None = None,
+                  completo: bool = False) -> dict:
     payload = _load_payload(idp) or {}
     exeva = payload.get("EXEVA")
     if not isinstance(exeva, dict):
@@ -97,7 +173,12 @@ def indexar_exeva(idp: str, log: Callable[[str], None] | None = None) -> dict:
         return {}
 
     indexados = 0
+    progreso = ProgressTracker("Indexación", len(documentos), progress)
     for doc in documentos:
+        if cancel is not None and not cancel.check():
+            _log(log, "[INDEXAR] Indexación detenida.")
+            break
+        progreso.avanzar()
         if not isinstance(doc, dict):
             continue
         if _indexar_item(doc):
@@ -112,28 +193,37 @@ def indexar_exeva(idp: str, log: Callable[[str], None] | None = None) -> dict:
                 if _indexar_item(link):
                     indexados += 1
 
-    _assign_n_to_tree(documentos)
+    progreso.terminar()
+    recorridos = numerar_expediente(idp, exeva, completo=completo, log=log)
     _save_payload(idp, payload)
-    _log(log, f"[INDEXAR] Ítems con N asignado: {indexados}.")
+    _log(log, f"[INDEXAR] Ítems con N asignado: {indexados} ({recorridos} árboles renumerados).")
     return exeva
 
 
 class IndexarWorker(QObject):
     finished_signal = pyqtSignal(bool, dict)
+    progress_signal = pyqtSignal(object)  # ProgressEvent
     log_signal = pyqtSignal(str)
 
     def __init__(self, project_id: str):
         super().__init__()
         self.project_id = project_id
+        self.cancel_token = CancelToken()
 
     @pyqtSlot()
     def run(self) -> None:
         success = False
         result_data: dict = {}
         try:
-            result_data = indexar_exeva(self.project_id, log=self.log_signal.emit)
-            success = bool(result_data)
-            if success:
+            with perfilado.sesion(self.project_id, "indexar", self.log_signal.emit):
+                result_data = indexar_exeva(
+                    self.project_id, log=self.log_signal.emit, cancel=self.cancel_token,
+                    progress=self.progress_signal.emit,
+                )
+            success = bool(result_data) and not self.cancel_token.cancelled
+            if self.cancel_token.cancelled:
+                self.log_signal.emit("⏹️ Indexación detenida. Progreso guardado.")
+            elif success:
                 self.log_signal.emit("✅ Indexación de descomprimidos completada.")
             else:
                 self.log_signal.emit("⚠️ No hay datos para indexar.")
@@ -145,6 +235,7 @@ class IndexarWorker(QObject):
 class IndexarController(QObject):
     index_started = pyqtSignal()
     index_finished = pyqtSignal(bool, dict)
+    index_progress = pyqtSignal(object)  # ProgressEvent
     log_requested = pyqtSignal(str)
 
     def __init__(self, parent=None):
@@ -165,6 +256,7 @@ class IndexarController(QObject):
         self.thread.started.connect(self.worker.run)
 
         self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.progress_signal.connect(self.index_progress.emit)
         self.worker.finished_signal.connect(self.index_finished.emit)
         self.worker.finished_signal.connect(self.thread.quit)
         self.worker.finished_signal.connect(self.worker.deleteLater)
@@ -177,3 +269,18 @@ class IndexarController(QObject):
             self.thread.deleteLater()
         self.thread = None
         self.worker = None
+
+    def pause(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.pause()
+            self.log_requested.emit("⏸️ Indexación en pausa.")
+
+    def resume(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.resume()
+            self.log_requested.emit("▶️ Indexación reanudada.")
+
+    def cancel(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.cancel()
+            self.log_requested.emit("⏹️ Deteniendo indexación (se guarda el progreso)...")
@@ -0,0 +1,208 @@
+"""
+Generador del índice del expediente EXEVA.
+
+Recorre documentos, anexos, vinculados y descomprimidos y arma el índice
+en PDF (con enlaces al tomo y página compilados), más una versión JSON y
+HTML para búsqueda. Usa el mapa de tomos (compilar) y el de folios (foliar)
+cuando existen.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from html import escape
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from .compilar import get_tomos_dir, get_tomos_map_path
+from .foliar import load_folios_map
+from .recorrido import get_project_root, iter_entradas, load_exeva_payload
+from .render_service import render_reports
+from .utils import log as _log
+
+
+def _load_json(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def _load_antgen_data(idp: str) -> dict:
+    data = _load_json(get_project_root(idp) / f"{idp}_fetch.json")
+    return data.get("expedientes", {}).get("ANTGEN", {}).get("ANTGEN_DATA", {}) or {}
+
+
+def construir_filas(idp: str, exeva: dict) -> List[Dict[str, Any]]:
+    """Une el recorrido del expediente con los mapas de tomos y folios."""
+    project_root = get_project_root(idp)
+    tomos = _load_json(get_tomos_map_path(idp)).get("mapa", {})
+    folios = load_folios_map(idp).get("mapa", {})
+
+    filas: List[Dict[str, Any]] = []
+    for entry in iter_entradas(exeva, project_root):
+        fila: Dict[str, Any] = {
+            "n": entry["n"],
+            "titulo": entry["titulo"],
+            "tipo": entry["tipo"],
+            "nivel": entry["nivel"],
+            "ruta": entry["ruta"],
+        }
+        folio = folios.get(entry["clave"])
+        if folio:
+            fila["folio_desde"] = folio["desde"]
+            fila["folio_hasta"] = folio["hasta"]
+        ubicacion = tomos.get(entry["clave"])
+        if ubicacion and ubicacion.get("tomos"):
+            primero = ubicacion["tomos"][0]
+            fila["tomo"] = primero["tomo"]
+            fila["pagina"] = primero["desde"]
+            fila["href"] = f"{primero['archivo']}#page={primero['desde']}"
+        filas.append(fila)
+    return filas
+
+
+def _write_html(path: Path, idp: str, filas: List[Dict[str, Any]]) -> None:
+    """Escribe el índice HTML fila a fila (sin armar el documento en memoria)."""
+    tmp = path.with_suffix(".html.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(
+            "<!DOCTYPE html><html lang='es'><head><meta charset='utf-8'>"
+            f"<title>Índice expediente {escape(idp)}</title>"
+            "<style>body{font-family:sans-serif}table{border-collapse:collapse;width:100%}"
+            "td,th{border-bottom:1px solid #ddd;padding:2px 6px;font-size:13px;text-align:left}"
+            "th{background:#d3d3d3;color:#156082}a{color:#156082}</style></head><body>"
+            f"<h2>Índice expediente {escape(idp)}</h2>"
+            "<input id='q' placeholder='Buscar...' style='width:40%;padding:4px'>"
+            "<table id='t'><thead><tr><th>N°</th><th>Documento</th><th>Folios</th>"
+            "<th>Tomo / Pág.</th></tr></thead><tbody>\n"
+        )
+        for fila in filas:
+            titulo = escape(fila["titulo"])
+            if fila.get("href"):
+                titulo = f"<a href='{escape(fila['href'])}'>{titulo}</a>"
+            folios = f"{fila['folio_desde']}–{fila['folio_hasta']}" if fila.get("folio_desde") else ""
+            ubicacion = f"T{fila['tomo']} / {fila['pagina']}" if fila.get("tomo") else ""
+            pad = 18 * int(fila.get("nivel") or 0)
+            f.write(
+                f"<tr id='n{escape(fila['n'])}'><td>{escape(fila['n'])}</td>"
+                f"<td style='padding-left:{pad + 6}px'>{titulo}</td>"
+                f"<td>{folios}</td><td>{ubicacion}</td></tr>\n"
+            )
+        f.write(
+            "</tbody></table><script>"
+            "document.getElementById('q').addEventListener('input',function(e){"
+            "var q=e.target.value.toLowerCase();"
+            "document.querySelectorAll('#t tbody tr').forEach(function(r){"
+            "r.style.display=r.textContent.toLowerCase().indexOf(q)<0?'none':'';});});"
+            "</script></body></html>\n"
+        )
+    os.replace(tmp, path)
+
+
+def generar_indice(idp: str, log: Callable[[str], None] | None = None) -> dict:
+    payload = load_exeva_payload(idp) or {}
+    exeva = payload.get("EXEVA")
+    if not isinstance(exeva, dict):
+        _log(log, "[ÍNDICE] No hay datos EXEVA para generar el índice.")
+        return {}
+
+    filas = construir_filas(idp, exeva)
+    if not filas:
+        _log(log, "[ÍNDICE] El expediente no tiene documentos.")
+        return {}
+
+    out_dir = get_tomos_dir(idp)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    base = out_dir / f"{idp}_EXEVA_Indice"
+    _log(log, f"[ÍNDICE] Generando índice con {len(filas)} entradas...")
+
+    result = {
+        "IDP": idp,
+        "generado": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "total": len(filas),
+        "pdf": f"{base.name}.pdf",
+        "html": f"{base.name}.html",
+        "entradas": filas,
+    }
+    json_path = base.with_suffix(".json")
+    json_path.write_text(json.dumps(result, indent=1, ensure_ascii=False), encoding="utf-8")
+    _write_html(base.with_suffix(".html"), idp, filas)
+
+    data = dict(_load_antgen_data(idp))
+    data["filas"] = filas
+    render = render_reports(
+        [{"reporte": "indice", "salida": str(base.with_suffix(".pdf")), "data": data}], log=log
+    )
+    if render["errores"]:
+        raise RuntimeError(render["errores"][0]["error"])
+
+    _log(log, f"[ÍNDICE] Índice guardado en {base.with_suffix('.pdf')}")
+    return result
+
+
+class IndiceWorker(QObject):
+    finished_signal = pyqtSignal(bool, dict)
+    log_signal = pyqtSignal(str)
+
+    def __init__(self, project_id: str):
+        super().__init__()
+        self.project_id = project_id
+
+    @pyqtSlot()
+    def run(self) -> None:
+        success = False
+        result_data: dict = {}
+        try:
+            result_data = generar_indice(self.project_id, log=self.log_signal.emit)
+            success = bool(result_data)
+            if success:
+                self.log_signal.emit("✅ Índice del expediente generado.")
+            else:
+                self.log_signal.emit("⚠️ No hay datos para generar el índice.")
+        except Exception as exc:
+            self.log_signal.emit(f"❌ Error inesperado al generar el índice: {exc}")
+        self.finished_signal.emit(success, result_data)
+
+
+class IndiceController(QObject):
+    indice_started = pyqtSignal()
+    indice_finished = pyqtSignal(bool, dict)
+    log_requested = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker: IndiceWorker | None = None
+        self.thread: QThread | None = None
+
+    def start_indice(self, project_id: str) -> None:
+        if self.thread and self.thread.isRunning():
+            self.log_requested.emit("⚠️ La generación del índice ya está en curso.")
+            return
+
+        self.indice_started.emit()
+        self.thread = QThread()
+        self.worker = IndiceWorker(project_id)
+
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+
+        self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.finished_signal.connect(self.indice_finished.emit)
+        self.worker.finished_signal.connect(self.thread.quit)
+        self.worker.finished_signal.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self._cleanup_thread)
+
+        self.thread.start()
+
+    def _cleanup_thread(self) -> None:
+        if self.thread:
+            self.thread.deleteLater()
+        self.thread = None
+        self.worker = None
@@ -0,0 +1,212 @@
+"""
+Verificación de integridad de las descargas.
+
+Un 200 no garantiza un archivo válido: SEIA a veces responde páginas HTML de
+error, las transferencias se cortan y quedan archivos vacíos. Antes eso se
+descubría recién al compilar los tomos. Aquí la verificación se hace mientras
+se escribe la respuesta (sin releer el archivo):
+
+- bytes recibidos contra Content-Length,
+- firma inicial contra la extensión (y HTML donde se esperaba un binario),
+- estructura mínima: "%%EOF" al final de un PDF, directorio central de un ZIP,
+- sha256 del contenido, que se guarda en el JSON.
+
+La respuesta se escribe en un temporal que sólo reemplaza al destino si pasa
+la verificación, así una re-descarga fallida no destruye el archivo anterior.
+Los archivos rechazados se mueven a EXEVA/cuarentena/ para poder revisarlos y
+el ítem se vuelve a descargar.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .progreso import ProgressTracker
+    from .utils import CancelToken
+
+REINTENTOS = 1  # nuevas descargas de un archivo rechazado antes de marcarlo con error
+CABECERA = 1024  # el encabezado %PDF- puede venir precedido de basura hasta 1 KiB
+ZIP_EOCD = b"PK\x05\x06"
+COLA_ZIP = 22 + 65535  # registro de fin de directorio + comentario máximo
+
+_ZIP = (b"PK\x03\x04", ZIP_EOCD, b"PK\x07\x08")
+_OLE = (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",)
+FIRMAS: dict[str, tuple[bytes, ...]] = {
+    ".pdf": (b"%PDF-",),
+    ".zip": _ZIP,
+    ".docx": _ZIP, ".xlsx": _ZIP, ".pptx": _ZIP, ".kmz": _ZIP, ".odt": _ZIP, ".ods": _ZIP,
+    ".rar": (b"Rar!\x1a\x07",),
+    ".7z": (b"7z\xbc\xaf\x27\x1c",),
+    ".doc": _OLE, ".xls": _OLE, ".ppt": _OLE,
+    ".png": (b"\x89PNG\r\n\x1a\n",),
+    ".jpg": (b"\xff\xd8\xff",), ".jpeg": (b"\xff\xd8\xff",),
+    ".gif": (b"GIF87a", b"GIF89a"),
+    ".tif": (b"II*\x00", b"MM\x00*"), ".tiff": (b"II*\x00", b"MM\x00*"),
+}
+# Bytes finales que se conservan para revisar la estructura.
+COLAS = {".pdf": CABECERA, **{ext: COLA_ZIP for ext, firmas in FIRMAS.items() if firmas is _ZIP}}
+
+
+def _es_html(cabecera: bytes) -> bool:
+    inicio = cabecera.lstrip(b"\xef\xbb\xbf \t\r\n")[:64].lower()
+    return inicio.startswith((b"<!doctype html", b"<html", b"<head", b"<body"))
+
+
+def _motivo(ext: str, cabecera: bytes, cola: bytes, total: int, esperado: int | None) -> str | None:
+    if total == 0:
+        return "Archivo vacío"
+    if esperado is not None and total != esperado:
+        return f"Descarga incompleta ({total} de {esperado} bytes)"
+    firmas = FIRMAS.get(ext)
+    if firmas is None:
+        return None  # extensión sin firma conocida: no se puede juzgar el contenido
+    if _es_html(cabecera):
+        return f"Página HTML en lugar de {ext.lstrip('.').upper()}"
+    if ext == ".pdf":
+        if b"%PDF-" not in cabecera:
+            return "No es un PDF (sin encabezado %PDF-)"
+        if b"%%EOF" not in cola:
+            return "PDF truncado (sin %%EOF)"
+        return None
+    if not cabecera.startswith(firmas):
+        return f"El contenido no corresponde a {ext.lstrip('.').upper()}"
+    if ext in COLAS and ZIP_EOCD not in cola:
+        return f"{ext.lstrip('.').upper()} truncado (sin directorio central)"
+    return None
+
+
+class VerificadorDescarga:
+    """Acumula lo necesario para verificar una descarga a medida que llega."""
+
+    def __init__(self, ext: str, esperado: int | None = None):
+        self.ext = ext.lower()
+        self.esperado = esperado
+        self.bytes = 0
+        self._hash = hashlib.sha256()
+        self._cabecera = bytearray()
+        self._cola = bytearray()
+        self._max_cola = COLAS.get(self.ext, 0)
+
+    def agregar(self, chunk: bytes) -> None:
+        self.bytes += len(chunk)
+        self._hash.update(chunk)
+        if len(self._cabecera) < CABECERA:
+            self._cabecera += chunk[:CABECERA - len(self._cabecera)]
+        if self._max_cola:
+            self._cola += chunk[-self._max_cola:]
+            if len(self._cola) > self._max_cola:
+                del self._cola[:-self._max_cola]
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def motivo(self) -> str | None:
+        """None si la descarga es válida; si no, la razón del rechazo."""
+        return _motivo(self.ext, bytes(self._cabecera), bytes(self._cola), self.bytes, self.esperado)
+
+
+def largo_esperado(response) -> int | None:
+    """Content-Length si describe los bytes que entrega iter_content (sin compresión)."""
+    if response.headers.get("Content-Encoding", "identity").lower() not in ("", "identity"):
+        return None
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _volcar_verificando(chunks, path: Path, verificador: VerificadorDescarga, cuarentena: Path | None,
+                       cancel: CancelToken | None = None,
+                       progreso: ProgressTracker | None = None) -> VerificadorDescarga | None:
+    """
+    Escribe en un temporal propio junto a 'path' y sólo si pasa la verificación
+    lo mueve sobre 'path': un archivo previo queda intacto si la descarga falla
+    o se cancela. Lo rechazado va a 'cuarentena'. None si se canceló.
+    """
+    fd, tmp = tempfile.mkstemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent)
+    tmp = Path(tmp)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                if cancel is not None and cancel.cancelled:
+                    return None
+                if chunk:
+                    f.write(chunk)
+                    verificador.agregar(chunk)
+                    if progreso is not None:
+                        progreso.agregar_bytes(len(chunk))
+        if verificador.motivo():
+            poner_en_cuarentena(tmp, cuarentena, nombre=path.name)
+        else:
+            os.replace(tmp, path)
+        return verificador
+    finally:
+        try:
+            tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def escribir_verificando(response, path: Path, cancel: CancelToken | None = None,
+                         progreso: ProgressTracker | None = None,
+                         cuarentena: Path | None = None) -> VerificadorDescarga | None:
+    """Escribe el cuerpo de 'response' en 'path' verificándolo al pasar. None si se canceló."""
+    if progreso is not None:
+        progreso.agregar_bytes_total(int(response.headers.get("Content-Length") or 0))
+    verificador = VerificadorDescarga(path.suffix, largo_esperado(response))
+    return _volcar_verificando(response.iter_content(chunk_size=8192), path, verificador,
+                               cuarentena, cancel, progreso)
+
+
+def guardar_verificando(datos: bytes, path: Path, cuarentena: Path | None = None) -> VerificadorDescarga:
+    """Como escribir_verificando, para un contenido ya en memoria (PDF impreso)."""
+    return _volcar_verificando((datos,), path, VerificadorDescarga(path.suffix), cuarentena)
+
+
+def verificar_archivo(path: Path) -> str | None:
+    """
+    Verificación rápida de un archivo ya descargado (sólo lee el inicio y el
+    final). Se usa antes de dar por bueno un archivo existente.
+    """
+    ext = path.suffix.lower()
+    try:
+        total = path.stat().st_size
+        with open(path, "rb") as f:
+            cabecera = f.read(CABECERA)
+            largo_cola = COLAS.get(ext, 0)
+            cola = b""
+            if largo_cola:
+                f.seek(max(0, total - largo_cola))
+                cola = f.read(largo_cola)
+    except OSError as exc:
+        return f"No se pudo leer: {exc}"
+    return _motivo(ext, cabecera, cola, total, None)
+
+
+def poner_en_cuarentena(path: Path, carpeta: Path | None, nombre: str | None = None) -> Path | None:
+    """
+    Mueve el archivo rechazado a 'carpeta' (o lo borra si no hay), con
+    'nombre' (por defecto el suyo) tras una marca de tiempo. Retorna el destino.
+    """
+    try:
+        if carpeta is None:
+            path.unlink(missing_ok=True)
+            return None
+        carpeta.mkdir(parents=True, exist_ok=True)
+        destino = carpeta / f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}_{nombre or path.name}"
+        os.replace(path, destino)
+        return destino
+    except OSError:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+        return None
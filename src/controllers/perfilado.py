@@ -0,0 +1,197 @@
+"""
+Perfilado opcional de las rutas críticas (HTTP, parseo, impresión con
+Selenium, descargas, guardado de JSON, descompresión, miniaturas).
+
+Se activa con la variable de entorno EDJ_PROFILE=1 o con `cli.py --profile`.
+Desactivado, medir()/span() sólo cuestan una comprobación de bandera.
+Activado, cada tramo medido se registra (nombre, hilo, inicio, duración) y al
+cerrar una sesion(idp, etapa) se exportan en Ebook/<id>/perfil/:
+
+    <etapa>_<fecha>_trace.json    formato Chrome trace (chrome://tracing, Perfetto)
+    <etapa>_<fecha>_resumen.json  por tramo: n, total, media, p50, p95, máx; contadores
+
+Las sesiones toman los tramos de su ventana de tiempo: si corren proyectos en
+paralelo (CLI con --workers > 1), el trace incluye también los de los otros.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator
+
+MAX_EVENTOS = 500_000
+
+_activo = os.environ.get("EDJ_PROFILE", "").strip().lower() not in ("", "0", "false", "no")
+_lock = threading.Lock()
+_eventos: deque = deque(maxlen=MAX_EVENTOS)  # (tipo, nombre, tid, ts_us, dur_us | valor)
+_sesiones = 0
+
+
+def _log(cb: Callable[[str], None] | None, message: str) -> None:
+    # Local (no desde utils): utils importa este módulo para medir las descargas.
+    if cb:
+        cb(message)
+
+
+def activar(valor: bool = True) -> None:
+    global _activo
+    _activo = valor
+
+
+def activo() -> bool:
+    return _activo
+
+
+def _ahora_us() -> int:
+    return time.perf_counter_ns() // 1000
+
+
+@contextmanager
+def span(nombre: str) -> Iterator[None]:
+    """Mide el bloque como un tramo con nombre (no hace nada si está desactivado)."""
+    if not _activo:
+        yield
+        return
+    inicio = _ahora_us()
+    try:
+        yield
+    finally:
+        _eventos.append(("X", nombre, threading.get_ident(), inicio, _ahora_us() - inicio))
+
+
+def medir(nombre: str) -> Callable:
+    """Decorador: mide cada llamada a la función como un tramo 'nombre'."""
+
+    def decorador(funcion: Callable) -> Callable:
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activo:
+                return funcion(*args, **kwargs)
+            inicio = _ahora_us()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                _eventos.append(("X", nombre, threading.get_ident(), inicio, _ahora_us() - inicio))
+
+        return envoltura
+
+    return decorador
+
+
+def contar(nombre: str, valor: int = 1) -> None:
+    """Suma 'valor' al contador 'nombre' (p. ej. bytes descargados)."""
+    if _activo:
+        _eventos.append(("C", nombre, threading.get_ident(), _ahora_us(), valor))
+
+
+def _percentil(valores: list[int], p: float) -> int:
+    if not valores:
+        return 0
+    idx = min(len(valores) - 1, int(round(p * (len(valores) - 1))))
+    return valores[idx]
+
+
+def _resumen(eventos: list[tuple], duracion_us: int) -> Dict[str, Any]:
+    tramos: Dict[str, list[int]] = {}
+    contadores: Dict[str, int] = {}
+    hilos = set()
+    for tipo, nombre, tid, _ts, valor in eventos:
+        hilos.add(tid)
+        if tipo == "X":
+            tramos.setdefault(nombre, []).append(valor)
+        else:
+            contadores[nombre] = contadores.get(nombre, 0) + valor
+
+    detalle = {}
+    for nombre, duraciones in tramos.items():
+        duraciones.sort()
+        total = sum(duraciones)
+        detalle[nombre] = {
+            "n": len(duraciones),
+            "total_ms": round(total / 1000, 2),
+            "media_ms": round(total / len(duraciones) / 1000, 2),
+            "p50_ms": round(_percentil(duraciones, 0.5) / 1000, 2),
+            "p95_ms": round(_percentil(duraciones, 0.95) / 1000, 2),
+            "max_ms": round(duraciones[-1] / 1000, 2),
+        }
+    detalle = dict(sorted(detalle.items(), key=lambda kv: -kv[1]["total_ms"]))
+    return {
+        "duracion_ms": round(duracion_us / 1000, 2),
+        "hilos": len(hilos),
+        "tramos": detalle,
+        "contadores": contadores,
+    }
+
+
+def _chrome_trace(eventos: list[tuple]) -> Dict[str, Any]:
+    pid = os.getpid()
+    nombres_hilo = {t.ident: t.name for t in threading.enumerate()}
+    trace = []
+    acumulado: Dict[str, int] = {}
+    for tipo, nombre, tid, ts, valor in eventos:
+        if tipo == "X":
+            trace.append({"name": nombre, "cat": nombre.split(".")[0], "ph": "X",
+                          "ts": ts, "dur": valor, "pid": pid, "tid": tid})
+        else:
+            acumulado[nombre] = acumulado.get(nombre, 0) + valor
+            trace.append({"name": nombre, "ph": "C", "ts": ts, "pid": pid,
+                          "args": {nombre: acumulado[nombre]}})
+    for tid in {e[2] for e in eventos}:
+        trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                      "args": {"name": nombres_hilo.get(tid, str(tid))}})
+    return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+
+def exportar(idp: str, etapa: str, desde_us: int, log: Callable[[str], None] | None = None) -> Path | None:
+    """Escribe trace y resumen de los eventos registrados desde 'desde_us'."""
+    hasta = _ahora_us()
+    with _lock:
+        eventos = [e for e in _eventos.copy() if e[3] >= desde_us]
+    if not eventos:
+        return None
+
+    carpeta = Path(os.getcwd()) / "Ebook" / idp / "perfil"
+    carpeta.mkdir(parents=True, exist_ok=True)
+    base = f"{etapa}_{time.strftime('%Y%m%d_%H%M%S')}"
+    resumen = _resumen(eventos, hasta - desde_us)
+    resumen.update({"proyecto": idp, "etapa": etapa})
+    (carpeta / f"{base}_trace.json").write_text(json.dumps(_chrome_trace(eventos)), encoding="utf-8")
+    ruta = carpeta / f"{base}_resumen.json"
+    ruta.write_text(json.dumps(resumen, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    principales = list(resumen["tramos"].items())[:5]
+    detalle = ", ".join(f"{nombre} {datos['total_ms']:.0f} ms ({datos['n']})" for nombre, datos in principales)
+    _log(log, f"[PERFIL] {etapa}: {resumen['duracion_ms']:.0f} ms. Principales: {detalle}")
+    _log(log, f"[PERFIL] Trace y resumen en {carpeta}")
+    return ruta
+
+
+@contextmanager
+def sesion(idp: str, etapa: str, log: Callable[[str], None] | None = None) -> Iterator[None]:
+    """Agrupa lo medido durante el bloque y lo exporta al salir."""
+    global _sesiones
+    if not _activo:
+        yield
+        return
+    inicio = _ahora_us()
+    with _lock:
+        _sesiones += 1
+    try:
+        with span(f"etapa.{etapa}"):
+            yield
+    finally:
+        try:
+            exportar(idp, etapa, inicio, log)
+        except Exception as exc:
+            _log(log, f"[PERFIL] No se pudo exportar el perfil: {exc}")
+        with _lock:
+            _sesiones -= 1
+            if _sesiones == 0:
+                _eventos.clear()
@@ -0,0 +1,223 @@
+"""
+Registro de etapas del pipeline de un proyecto, sin dependencias de la UI.
+
+Cada etapa envuelve la función pura que hoy usa su Worker (detección,
+ANTGEN, EXEVA, anexos, descompresión, indexación, búsqueda, foliado, tomos,
+índice)
+y devuelve True/False con el mismo criterio de éxito que el Worker. La etapa
+"exeva_flujo" encadena por documento las cinco etapas EXEVA (ver
+flujo_exeva.py). Lo usan la CLI (cli.py) y el planificador de trabajos
+(scheduler.py).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List
+
+from . import perfilado
+from .progreso import ProgressEvent
+from .utils import CancelToken, log as _log
+
+Log = Callable[[str], None] | None
+Cancel = CancelToken | None
+Progress = Callable[[ProgressEvent], None] | None
+
+
+def _detectar(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .fetch_exp import detect_expedientes
+
+    success, found_count = detect_expedientes(idp, log=log)
+    return success and found_count > 0
+
+
+def _antgen(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .fetch_antgen import _extract_antgen, _save_antgen_data
+
+    emit = log or (lambda _msg: None)
+    antgen_data = _extract_antgen(idp, log=emit)
+    if antgen_data.get("nombre_proyecto"):
+        _save_antgen_data(idp, antgen_data, "edicion", log=emit)
+        return True
+    _save_antgen_data(idp, {}, "error", log=emit)
+    return False
+
+
+def _exeva(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .fetch_exeva import _download_documents, _extract_exeva, _reanudar_descargas, _save_exeva_data
+    from .utils import marcar_interrupcion
+
+    emit = log or (lambda _msg: None)
+    exeva_data = _extract_exeva(idp, log=log)
+    if exeva_data.get("EXEVA", {}).get("documentos"):
+        _reanudar_descargas(idp, exeva_data)
+        _download_documents(idp, exeva_data, log=log, cancel=cancel, progress=progress)
+        detenido = marcar_interrupcion(exeva_data["EXEVA"], "exeva", cancel)
+        _save_exeva_data(idp, exeva_data, "edicion", log=emit)
+        return not detenido
+    _save_exeva_data(idp, exeva_data, "error", log=emit)
+    return False
+
+
+def _anexos(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .fetch_anexos import detect_attachments
+
+    return bool(detect_attachments(idp, log=log, cancel=cancel, progress=progress))
+
+
+def _descargar_anexos(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .down_anexos import download_attachments_files
+
+    return bool(download_attachments_files(idp, log=log, cancel=cancel, progress=progress))
+
+
+def _descomprimir(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .unpack import unpack_exeva_archives
+
+    return bool(unpack_exeva_archives(idp, log=log, cancel=cancel, progress=progress))
+
+
+def _indexar(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .indexar import indexar_exeva
+
+    return bool(indexar_exeva(idp, log=log, cancel=cancel, progress=progress))
+
+
+def _exeva_flujo(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .flujo_exeva import procesar_expediente
+
+    return bool(procesar_expediente(idp, log=log, progress=progress, cancel=cancel))
+
+
+def _busqueda(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .busqueda import indexar_textos
+
+    return bool(indexar_textos(idp, log=log, cancel=cancel, progress=progress))
+
+
+def _foliar(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .foliar import foliar_expediente
+
+    return bool(foliar_expediente(idp, log=log).get("mapa"))
+
+
+def _compilar(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .compilar import compilar_tomos
+
+    return bool(compilar_tomos(idp, log=log).get("tomos"))
+
+
+def _indice(idp: str, log: Log, cancel: Cancel = None, progress: Progress = None) -> bool:
+    from .indice import generar_indice
+
+    return bool(generar_indice(idp, log=log))
+
+
+# nombre -> (función, expediente requerido en <id>_fetch.json o None)
+ETAPAS: Dict[str, tuple[Callable[[str, Log, Cancel, Progress], bool], str | None]] = {
+    "detectar": (_detectar, None),
+    "antgen": (_antgen, "ANTGEN"),
+    "exeva": (_exeva, "EXEVA"),
+    "anexos": (_anexos, "EXEVA"),
+    "descargar_anexos": (_descargar_anexos, "EXEVA"),
+    "descomprimir": (_descomprimir, "EXEVA"),
+    "indexar": (_indexar, "EXEVA"),
+    # exeva + anexos + descargar_anexos + descomprimir + indexar, por documento
+    "exeva_flujo": (_exeva_flujo, "EXEVA"),
+    "busqueda": (_busqueda, "EXEVA"),
+    "foliar": (_foliar, "EXEVA"),
+    "compilar": (_compilar, "EXEVA"),
+    "indice": (_indice, "EXEVA"),
+}
+
+ETAPAS_POR_DEFECTO = ["detectar", "antgen", "exeva_flujo"]
+
+
+def _expedientes_detectados(idp: str) -> Dict[str, Any]:
+    path = os.path.join(os.getcwd(), "Ebook", idp, f"{idp}_fetch.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("expedientes", {})
+    except Exception:
+        return {}
+
+
+def run_stage(idp: str, etapa: str, log: Log = None, cancel: Cancel = None, progress: Progress = None) -> str:
+    """
+    Ejecuta una etapa para un proyecto. Retorna "ok", "error", "omitida"
+    (expediente requerido no detectado) o "detenida" (cancelada con 'cancel';
+    el avance queda guardado). Propaga las excepciones.
+    """
+    funcion, requiere = ETAPAS[etapa]
+    if requiere and requiere not in _expedientes_detectados(idp):
+        return "omitida"
+    with perfilado.sesion(idp, etapa, log):
+        ok = funcion(idp, log, cancel, progress)
+    if cancel is not None and cancel.cancelled:
+        return "detenida"
+    return "ok" if ok else "error"
+
+
+def run_pipeline(
+    idp: str,
+    etapas: List[str] | None = None,
+    log: Log = None,
+    on_event: Callable[[Dict[str, Any]], None] | None = None,
+    cancel: Cancel = None,
+) -> Dict[str, Any]:
+    """
+    Ejecuta las etapas en orden para un proyecto. Se detiene en la primera
+    etapa fallida o detenida; las etapas cuyo expediente no fue detectado se
+    omiten. El avance de cada etapa se emite como evento "progreso".
+    """
+    etapas = etapas or ETAPAS_POR_DEFECTO
+    desconocidas = [e for e in etapas if e not in ETAPAS]
+    if desconocidas:
+        raise ValueError(f"Etapas desconocidas: {', '.join(desconocidas)}")
+
+    def emitir(evento: str, **datos) -> None:
+        if on_event:
+            on_event({"evento": evento, "id": idp, "ts": time.strftime("%Y-%m-%d %H:%M:%S"), **datos})
+
+    def progreso_de(etapa: str) -> Progress:
+        if not on_event:
+            return None
+
+        def progreso(evento: ProgressEvent) -> None:
+            # "etapa" es la del pipeline; "fase" la del tracker (p. ej. "Anexos" dentro de exeva_flujo).
+            emitir("progreso", **{**evento.to_dict(), "etapa": etapa, "fase": evento.etapa, "texto": evento.texto()})
+        return progreso
+
+    resultado: Dict[str, Any] = {"id": idp, "ok": True, "etapas": {}}
+    emitir("proyecto_inicio", etapas=etapas)
+    for nombre in etapas:
+        if cancel is not None and not cancel.check():
+            resultado["ok"] = False
+            break
+        requiere = ETAPAS[nombre][1]
+        if requiere and requiere not in _expedientes_detectados(idp):
+            resultado["etapas"][nombre] = "omitida"
+            emitir("etapa_omitida", etapa=nombre, motivo=f"{requiere} no detectado")
+            continue
+
+        emitir("etapa_inicio", etapa=nombre)
+        inicio = time.monotonic()
+        try:
+            estado = run_stage(idp, nombre, log, cancel, progreso_de(nombre))
+            error = None
+        except Exception as exc:
+            estado, error = "error", str(exc)
+            _log(log, f"❌ [{nombre}] Error inesperado en {idp}: {exc}")
+        ok = estado not in ("error", "detenida")
+        segundos = round(time.monotonic() - inicio, 2)
+
+        resultado["etapas"][nombre] = estado
+        emitir("etapa_fin", etapa=nombre, ok=ok, estado=estado, segundos=segundos, error=error)
+        if not ok:
+            resultado["ok"] = False
+            break
+
+    emitir("proyecto_fin", ok=resultado["ok"], etapas=resultado["etapas"])
+    return resultado
@@ -0,0 +1,150 @@
+"""
+Eventos de progreso estructurados (ítems, bytes, tasa y ETA) por etapa.
+
+Cada etapa larga crea un ProgressTracker y le informa los ítems y bytes
+procesados desde cualquier hilo; el tracker agrega los avances y entrega
+ProgressEvent al callback como máximo cada 'intervalo' segundos (más uno
+final al terminar). La tasa es la de los últimos segundos (ventana móvil),
+así se distingue una etapa detenida de una lenta.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+VENTANA_TASA = 10.0  # segundos considerados para la tasa actual
+
+
+def _formato_bytes(valor: float) -> str:
+    for unidad in ("B", "KB", "MB", "GB"):
+        if valor < 1024 or unidad == "GB":
+            return f"{valor:.0f} {unidad}" if unidad == "B" else f"{valor:.1f} {unidad}"
+        valor /= 1024
+    return f"{valor:.1f} GB"
+
+
+def _formato_tiempo(segundos: float) -> str:
+    segundos = int(segundos)
+    horas, resto = divmod(segundos, 3600)
+    minutos, seg = divmod(resto, 60)
+    return f"{horas}:{minutos:02d}:{seg:02d}" if horas else f"{minutos:02d}:{seg:02d}"
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    etapa: str
+    hechos: int
+    total: int
+    bytes_hechos: int = 0
+    bytes_total: int = 0  # 0 si no se conoce
+    tasa: float = 0.0  # ítems por segundo (ventana reciente)
+    tasa_bytes: float = 0.0  # bytes por segundo (ventana reciente)
+    eta: float | None = None  # segundos restantes, None si no se puede estimar
+    terminado: bool = False
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def texto(self) -> str:
+        """Resumen corto para barras de progreso y consola."""
+        partes = [f"{self.etapa} {self.hechos}/{self.total}"]
+        if self.tasa_bytes > 0:
+            partes.append(f"{_formato_bytes(self.tasa_bytes)}/s")
+        elif self.tasa > 0:
+            partes.append(f"{self.tasa:.1f}/s")
+        if self.terminado:
+            partes.append("listo")
+        elif self.eta is not None:
+            partes.append(f"ETA {_formato_tiempo(self.eta)}")
+        elif self.hechos < self.total:
+            partes.append("sin avance")
+        return " · ".join(partes)
+
+
+class ProgressTracker:
+    """Acumulador de progreso seguro entre hilos para una etapa."""
+
+    def __init__(
+        self,
+        etapa: str,
+        total: int,
+        callback: Callable[[ProgressEvent], None] | None,
+        intervalo: float = 0.5,
+    ):
+        self.etapa = etapa
+        self.callback = callback
+        self.intervalo = intervalo
+        self._total = total
+        self._hechos = 0
+        self._bytes = 0
+        self._bytes_total = 0
+        self._lock = threading.Lock()
+        self._muestras: deque[tuple[float, int, int]] = deque()
+        self._ultimo_envio = 0.0
+        self._muestras.append((time.monotonic(), 0, 0))
+
+    # --- Avances (desde cualquier hilo) ---
+
+    def avanzar(self, n: int = 1) -> None:
+        with self._lock:
+            self._hechos += n
+        self._emitir()
+
+    def agregar_total(self, n: int = 1) -> None:
+        with self._lock:
+            self._total += n
+        self._emitir()
+
+    def agregar_bytes(self, n: int) -> None:
+        with self._lock:
+            self._bytes += n
+        self._emitir()
+
+    def agregar_bytes_total(self, n: int) -> None:
+        with self._lock:
+            self._bytes_total += n
+
+    def terminar(self) -> None:
+        self._emitir(final=True)
+
+    # --- Emisión ---
+
+    def snapshot(self, final: bool = False) -> ProgressEvent:
+        ahora = time.monotonic()
+        with self._lock:
+            hechos, total, bytes_hechos, bytes_total = self._hechos, self._total, self._bytes, self._bytes_total
+            self._muestras.append((ahora, hechos, bytes_hechos))
+            while len(self._muestras) > 2 and ahora - self._muestras[0][0] > VENTANA_TASA:
+                self._muestras.popleft()
+            t0, h0, b0 = self._muestras[0]
+
+        lapso = ahora - t0
+        tasa = (hechos - h0) / lapso if lapso > 0 else 0.0
+        tasa_bytes = (bytes_hechos - b0) / lapso if lapso > 0 else 0.0
+        restantes = max(total - hechos, 0)
+        eta = restantes / tasa if tasa > 0 else (0.0 if restantes == 0 else None)
+        return ProgressEvent(
+            etapa=self.etapa,
+            hechos=hechos,
+            total=total,
+            bytes_hechos=bytes_hechos,
+            bytes_total=bytes_total,
+            tasa=round(tasa, 3),
+            tasa_bytes=round(tasa_bytes, 1),
+            eta=None if eta is None else round(eta, 1),
+            terminado=final,
+        )
+
+    def _emitir(self, final: bool = False) -> None:
+        if self.callback is None:
+            return
+        ahora = time.monotonic()
+        with self._lock:
+            if not final and ahora - self._ultimo_envio < self.intervalo:
+                return
+            self._ultimo_envio = ahora
+        self.callback(self.snapshot(final))
@@ -0,0 +1,140 @@
+"""
+Recorrido ordenado del expediente EXEVA.
+
+Aplana la jerarquía documentos → anexos/vinculados → descomprimidos en una
+secuencia de entradas (en orden de expediente) que comparten el compilador de
+tomos, el foliador y el generador de índice.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from ..models.expediente import compactar
+
+
+def get_project_root(idp: str) -> Path:
+    return Path(os.getcwd()) / "Ebook" / idp
+
+
+def get_exeva_json_path(idp: str) -> Path:
+    return get_project_root(idp) / "EXEVA" / f"{idp}_EXEVA.json"
+
+
+def load_exeva_payload(idp: str) -> dict:
+    path = get_exeva_json_path(idp)
+    if not path.exists():
+        return {}
+    try:
+        return compactar(json.loads(path.read_text(encoding="utf-8")))
+    except Exception:
+        return {}
+
+
+def resolve_ruta(project_root: Path, ruta: str | None) -> Path | None:
+    """Resuelve una 'ruta' del JSON (relativa al proyecto o a EXEVA/)."""
+    if not ruta:
+        return None
+    path = Path(str(ruta).replace("\\", "/"))
+    if path.is_absolute():
+        return path if path.exists() else None
+
+    for base in (project_root, project_root / "EXEVA"):
+        candidate = base / path
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def _join_n(prefix: str, n: Any, idx: int) -> str:
+    n_txt = str(n or "").strip() or f"{idx:04d}"
+    return f"{prefix}.{n_txt}" if prefix else n_txt
+
+
+def _entry(n: str, nivel: int, tipo: str, node: Mapping, project_root: Path) -> Dict[str, Any]:
+    ruta = node.get("ruta") or ""
+    titulo = node.get("titulo") or node.get("nombre") or Path(str(ruta)).name or "Sin título"
+    formato = str(node.get("formato") or "").lower()
+    path = None
+    if tipo != "carpeta":
+        path = resolve_ruta(project_root, ruta)
+        if path is not None and not path.is_file():
+            path = None
+    return {
+        "clave": str(ruta).replace("\\", "/") or n,
+        "n": n,
+        "titulo": str(titulo),
+        "nivel": nivel,
+        "tipo": tipo,
+        "formato": formato,
+        "ruta": str(ruta).replace("\\", "/"),
+        "path": path,
+    }
+
+
+def _iter_tree(root: Mapping, prefix: str, nivel: int, project_root: Path) -> Iterator[Dict[str, Any]]:
+    """Recorre 'descomprimidos' con pila explícita (omite la carpeta raíz)."""
+    contenido = root.get("contenido") if isinstance(root, Mapping) else None
+    if not isinstance(contenido, list):
+        return
+
+    stack: List[tuple[list, int, str, int]] = [(contenido, 0, prefix, nivel)]
+    while stack:
+        items, pos, pfx, lvl = stack.pop()
+        if pos >= len(items):
+            continue
+        stack.append((items, pos + 1, pfx, lvl))
+
+        node = items[pos]
+        if not isinstance(node, Mapping):
+            continue
+        n = _join_n(pfx, node.get("n"), pos + 1)
+        es_carpeta = node.get("formato") == "carpeta" or isinstance(node.get("contenido"), list)
+        yield _entry(n, lvl, "carpeta" if es_carpeta else "archivo", node, project_root)
+
+        hijos = node.get("contenido")
+        if isinstance(hijos, list) and hijos:
+            stack.append((hijos, 0, n, lvl + 1))
+
+
+def iter_entradas(exeva: dict, project_root: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Genera las entradas del expediente en orden de lectura.
+
+    Cada entrada es un dict con: clave, n (jerárquico, p.ej. '0004.0001.0002'),
+    titulo, nivel, tipo, formato, ruta y path (Path del archivo local o None).
+    """
+    documentos = exeva.get("documentos") if isinstance(exeva, dict) else None
+    if not isinstance(documentos, list):
+        return
+
+    for d_idx, doc in enumerate(documentos, 1):
+        if not isinstance(doc, Mapping):
+            continue
+        doc_n = _join_n("", doc.get("n"), d_idx)
+        yield _entry(doc_n, 0, "documento", doc, project_root)
+
+        if isinstance(doc.get("descomprimidos"), Mapping):
+            yield from _iter_tree(doc["descomprimidos"], doc_n, 1, project_root)
+
+        links = []
+        for key, tipo in (("anexos_detectados", "anexo"), ("vinculados_detectados", "vinculado")):
+            for link in doc.get(key) or []:
+                if isinstance(link, Mapping):
+                    links.append((link, tipo))
+
+        for l_idx, (link, tipo) in enumerate(links, 1):
+            # Anexos y vinculados se numeran en una sola serie por documento.
+            link_n = _join_n(doc_n, None, l_idx)
+            yield _entry(link_n, 1, tipo, link, project_root)
+            if isinstance(link.get("descomprimidos"), Mapping):
+                yield from _iter_tree(link["descomprimidos"], link_n, 2, project_root)
+
+
+def is_pdf_entry(entry: Dict[str, Any]) -> bool:
+    path = entry.get("path")
+    return path is not None and path.suffix.lower() == ".pdf"
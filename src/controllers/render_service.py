@@ -0,0 +1,256 @@
+"""
+Servicio de renderizado de reportes (BaseReport) en un pool de procesos.
+
+Cada trabajo indica la clase del reporte ("modulo:Clase"), el PDF de salida y
+los datos. Las secciones independientes de cada reporte (get_sections) se
+generan en paralelo como PDF parciales y luego se concatenan, re-aplicando la
+numeración "- n -" del pie. Varios reportes comparten el mismo pool, así que
+una compilación múltiple usa todos los núcleos sin bloquear la interfaz.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import importlib
+import os
+import threading
+from typing import Any, Callable, Dict, List
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from .foliar import FONT_NAME, pdf_escape
+from .utils import log as _log
+
+REPORTES = {
+    "antgen": "src.templates.antgen_report:AntGenReport",
+    "indice": "src.templates.indice_report:IndiceReport",
+}
+
+
+def _report_class(nombre: str):
+    modulo, _, clase = REPORTES.get(nombre, nombre).partition(":")
+    return getattr(importlib.import_module(modulo), clase)
+
+
+def _contar_secciones(job: Dict[str, Any]) -> int:
+    report = _report_class(job["reporte"])(job["salida"])
+    return len(report.get_sections(job["data"]))
+
+
+def _render_seccion(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Genera una sección del reporte. Se ejecuta en un proceso del pool."""
+    try:
+        report = _report_class(task["reporte"])(task["parcial"])
+        report.build_section(task["data"], task["seccion"], footer=task["footer"])
+        return {"job": task["job"], "seccion": task["seccion"], "ok": True}
+    except Exception as exc:
+        return {"job": task["job"], "seccion": task["seccion"], "ok": False, "error": str(exc)}
+
+
+def _numerar_paginas(writer) -> None:
+    """Re-aplica el pie '- n -' de BaseReport sobre el PDF concatenado."""
+    from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    font_ref = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+        NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+    }))
+    push = DecodedStreamObject()
+    push.set_data(b"q\n")
+    push_ref = writer._add_object(push)
+
+    for num, page in enumerate(writer.pages, 1):
+        texto = f"- {num} -"
+        x = float(page.mediabox.width) / 2 - stringWidth(texto, "Helvetica", 9) / 2
+        if "/Resources" not in page:
+            page[NameObject("/Resources")] = DictionaryObject()
+        resources = page["/Resources"].get_object()
+        if "/Font" not in resources:
+            resources[NameObject("/Font")] = DictionaryObject()
+        resources["/Font"].get_object()[NameObject(FONT_NAME)] = font_ref
+
+        pie = DecodedStreamObject()
+        pie.set_data(
+            b"Q\nq 0.082 0.376 0.51 rg BT %s 9 Tf %.2f 30 Td (%s) Tj ET Q\n"
+            % (FONT_NAME.encode(), x, pdf_escape(texto))
+        )
+        contents = page.get("/Contents")
+        originales: List[Any] = []
+        if contents is not None:
+            contents = contents.get_object()
+            originales = list(contents) if isinstance(contents, ArrayObject) else [page.raw_get("/Contents")]
+        page[NameObject("/Contents")] = ArrayObject([push_ref, *originales, writer._add_object(pie)])
+
+
+def _concatenar(parciales: List[str], salida: str) -> None:
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for parcial in parciales:
+        writer.append(parcial)
+    _numerar_paginas(writer)
+    tmp = salida + ".tmp"
+    with open(tmp, "wb") as f:
+        writer.write(f)
+    os.replace(tmp, salida)
+
+
+def _limpiar(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def render_reports(
+    jobs: List[Dict[str, Any]],
+    workers: int | None = None,
+    log: Callable[[str], None] | None = None,
+    progress: Callable[[int, int], None] | None = None,
+    cancel_event: threading.Event | None = None,
+) -> dict:
+    """
+    Renderiza los reportes de 'jobs' ({reporte, salida, data}) en paralelo.
+    Devuelve {"generados": [...], "errores": [...], "cancelado": bool}.
+    """
+    tasks: List[Dict[str, Any]] = []
+    parciales: Dict[int, List[str]] = {}
+    for j_idx, job in enumerate(jobs):
+        os.makedirs(os.path.dirname(os.path.abspath(job["salida"])), exist_ok=True)
+        total = _contar_secciones(job)
+        if total == 1:
+            # Una sola sección: se genera directo con su pie, sin concatenar.
+            parciales[j_idx] = [job["salida"] + ".part.pdf"]
+        else:
+            parciales[j_idx] = [f"{job['salida']}.part{i:02d}.pdf" for i in range(total)]
+        for s_idx, parcial in enumerate(parciales[j_idx]):
+            tasks.append({
+                "job": j_idx,
+                "seccion": s_idx,
+                "reporte": job["reporte"],
+                "parcial": parcial,
+                "data": job["data"],
+                "footer": total == 1,
+            })
+
+    max_workers = workers or min(len(tasks), os.cpu_count() or 2) or 1
+    _log(log, f"[RENDER] {len(jobs)} reportes, {len(tasks)} secciones ({max_workers} procesos)...")
+
+    pendientes = {j_idx: len(p) for j_idx, p in parciales.items()}
+    fallidos: Dict[int, str] = {}
+    generados: List[str] = []
+    cancelado = False
+    hechos = 0
+
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [executor.submit(_render_seccion, t) for t in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            if cancel_event is not None and cancel_event.is_set():
+                cancelado = True
+                break
+            res = future.result()
+            hechos += 1
+            j_idx = res["job"]
+            if not res.get("ok"):
+                fallidos.setdefault(j_idx, res.get("error", ""))
+            pendientes[j_idx] -= 1
+            if pendientes[j_idx] == 0 and j_idx not in fallidos:
+                salida = jobs[j_idx]["salida"]
+                try:
+                    if len(parciales[j_idx]) == 1:
+                        os.replace(parciales[j_idx][0], salida)
+                    else:
+                        _concatenar(parciales[j_idx], salida)
+                    generados.append(salida)
+                except Exception as exc:
+                    fallidos[j_idx] = str(exc)
+            if progress:
+                progress(hechos, len(tasks))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        _limpiar([p for paths in parciales.values() for p in paths])
+
+    errores = [{"salida": jobs[j]["salida"], "error": err} for j, err in fallidos.items()]
+    for err in errores:
+        _log(log, f"[RENDER] Error en {err['salida']}: {err['error']}")
+    if cancelado:
+        _log(log, "[RENDER] Renderizado cancelado.")
+    return {"generados": generados, "errores": errores, "cancelado": cancelado}
+
+
+class RenderWorker(QObject):
+    finished_signal = pyqtSignal(bool, dict)
+    progress_signal = pyqtSignal(int, int)
+    log_signal = pyqtSignal(str)
+
+    def __init__(self, jobs: List[Dict[str, Any]]):
+        super().__init__()
+        self.jobs = jobs
+        self.cancel_event = threading.Event()
+
+    @pyqtSlot()
+    def run(self) -> None:
+        success = False
+        result_data: dict = {}
+        try:
+            result_data = render_reports(
+                self.jobs,
+                log=self.log_signal.emit,
+                progress=self.progress_signal.emit,
+                cancel_event=self.cancel_event,
+            )
+            success = not result_data["cancelado"] and not result_data["errores"]
+        except Exception as exc:
+            self.log_signal.emit(f"❌ Error inesperado al generar reportes: {exc}")
+        self.finished_signal.emit(success, result_data)
+
+
+class RenderController(QObject):
+    render_started = pyqtSignal()
+    render_progress = pyqtSignal(int, int)
+    render_finished = pyqtSignal(bool, dict)
+    log_requested = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker: RenderWorker | None = None
+        self.thread: QThread | None = None
+
+    def is_running(self) -> bool:
+        return bool(self.thread and self.thread.isRunning())
+
+    def start_render(self, jobs: List[Dict[str, Any]]) -> None:
+        if self.is_running():
+            self.log_requested.emit("⚠️ Ya hay reportes generándose.")
+            return
+
+        self.render_started.emit()
+        self.thread = QThread()
+        self.worker = RenderWorker(jobs)
+
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+
+        self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.progress_signal.connect(self.render_progress.emit)
+        self.worker.finished_signal.connect(self.render_finished.emit)
+        self.worker.finished_signal.connect(self.thread.quit)
+        self.worker.finished_signal.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self._cleanup_thread)
+
+        self.thread.start()
+
+    def cancel(self) -> None:
+        if self.worker:
+            self.worker.cancel_event.set()
+
+    def _cleanup_thread(self) -> None:
+        if self.thread:
+            self.thread.deleteLater()
+        self.thread = None
+        self.worker = None
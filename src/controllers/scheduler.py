@@ -0,0 +1,328 @@
+"""
+Planificador de trabajos multi-proyecto.
+
+Mantiene una cola persistente (Ebook/_cola_trabajos.json) de trabajos
+(proyecto, etapa, prioridad) y los ejecuta con un límite de trabajos
+simultáneos por etapa, sin correr nunca dos etapas del mismo proyecto a la
+vez (escriben los mismos JSON). Los trabajos que estaban en curso al cerrar
+la aplicación se reanudan al iniciar: las etapas del pipeline son
+re-ejecutables (las descargas omiten lo ya descargado). La interfaz observa
+la cola mediante señales.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from PyQt6.QtCore import QObject, Qt, QThread, pyqtSignal, pyqtSlot
+
+from .pipeline import ETAPAS, run_stage
+from .utils import CancelToken
+
+# Trabajos simultáneos por etapa (las no listadas: 1).
+LIMITES_ETAPA = {
+    "detectar": 4,
+    "antgen": 4,
+    "exeva": 2,
+    "anexos": 2,
+    "descargar_anexos": 2,
+    "descomprimir": 1,
+    "indexar": 2,
+    "exeva_flujo": 2,
+    "foliar": 1,
+    "compilar": 1,
+    "indice": 1,
+}
+MAX_SIMULTANEOS = 4
+ESPERA_CIERRE_MS = 15000  # por trabajo en curso al cerrar la aplicación
+
+ETAPAS_DESCARGA = ["exeva_flujo"]
+
+ESTADOS_FINALES = ("ok", "error", "cancelado")
+
+
+def get_queue_path() -> Path:
+    return Path(os.getcwd()) / "Ebook" / "_cola_trabajos.json"
+
+
+class JobWorker(QObject):
+    finished_signal = pyqtSignal(str, bool, str)
+    log_signal = pyqtSignal(str)
+
+    def __init__(self, job: Dict[str, Any]):
+        super().__init__()
+        self.job_id = job["id"]
+        self.project_id = job["proyecto"]
+        self.etapa = job["etapa"]
+        self.cancel_token = CancelToken()
+
+    @pyqtSlot()
+    def run(self) -> None:
+        ok, error = False, ""
+        try:
+            estado = run_stage(
+                self.project_id, self.etapa, lambda msg: self.log_signal.emit(f"[{self.project_id}] {msg}"),
+                self.cancel_token,
+            )
+            ok = estado not in ("error", "detenida")
+            if estado == "detenida":
+                error = "Detenido por el usuario; el avance quedó guardado."
+            elif not ok:
+                error = "La etapa no produjo resultados."
+        except Exception as exc:
+            error = str(exc)
+        self.finished_signal.emit(self.job_id, ok, error)
+
+
+class JobScheduler(QObject):
+    job_added = pyqtSignal(dict)
+    job_started = pyqtSignal(dict)
+    job_finished = pyqtSignal(dict)
+    queue_changed = pyqtSignal(dict)  # resumen: {pendiente, en_curso, ok, error, cancelado}
+    log_requested = pyqtSignal(str)
+
+    def __init__(self, parent=None, queue_path: Path | None = None, max_simultaneos: int = MAX_SIMULTANEOS):
+        super().__init__(parent)
+        self.queue_path = queue_path or get_queue_path()
+        self.max_simultaneos = max_simultaneos
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._running: Dict[str, tuple[QThread, JobWorker]] = {}
+        self._threads: set[QThread] = set()  # vivos hasta que emiten finished
+        self._paused = False
+        self._detenidos: set[str] = set()  # trabajos en curso detenidos con cancel()
+        self._seq = itertools.count(1)
+        self._reanudados = 0
+        self._load()
+
+    # --- Persistencia ---
+
+    def _load(self) -> None:
+        if not self.queue_path.exists():
+            return
+        try:
+            data = json.loads(self.queue_path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        for job in data.get("trabajos", []):
+            if job.get("estado") == "en_curso":
+                job["estado"] = "pendiente"
+                self._reanudados += 1
+            self.jobs[job["id"]] = job
+        self._seq = itertools.count(max((j.get("seq", 0) for j in self.jobs.values()), default=0) + 1)
+
+    def _save(self) -> None:
+        self.queue_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.queue_path.with_suffix(".json.tmp")
+        payload = {
+            "actualizado": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "trabajos": sorted(self.jobs.values(), key=lambda j: j["seq"]),
+        }
+        tmp.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.queue_path)
+
+    def _changed(self) -> None:
+        self._save()
+        self.queue_changed.emit(self.summary())
+
+    # --- API ---
+
+    def summary(self) -> Dict[str, int]:
+        resumen = {"pendiente": 0, "en_curso": 0, "ok": 0, "error": 0, "cancelado": 0}
+        for job in self.jobs.values():
+            resumen[job["estado"]] = resumen.get(job["estado"], 0) + 1
+        return resumen
+
+    def enqueue(self, project_id: str, etapa: str, prioridad: int = 0, depende_de: str | None = None) -> str:
+        """Agrega un trabajo. Si ya hay uno igual pendiente, sólo sube su prioridad."""
+        if etapa not in ETAPAS:
+            raise ValueError(f"Etapa desconocida: {etapa}")
+        for job in self.jobs.values():
+            if job["proyecto"] == project_id and job["etapa"] == etapa and job["estado"] == "pendiente":
+                job["prioridad"] = max(job["prioridad"], prioridad)
+                self._changed()
+                self._dispatch()
+                return job["id"]
+
+        seq = next(self._seq)
+        job = {
+            "id": f"{project_id}-{etapa}-{seq}",
+            "seq": seq,
+            "proyecto": project_id,
+            "etapa": etapa,
+            "prioridad": prioridad,
+            "depende_de": depende_de,
+            "estado": "pendiente",
+            "creado": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "intentos": 0,
+        }
+        self.jobs[job["id"]] = job
+        self.job_added.emit(dict(job))
+        self._changed()
+        self._dispatch()
+        return job["id"]
+
+    def enqueue_pipeline(self, project_id: str, etapas: List[str] | None = None, prioridad: int = 0) -> List[str]:
+        """Encola varias etapas de un proyecto; cada una espera a la anterior."""
+        ids: List[str] = []
+        previo = None
+        for etapa in etapas or ETAPAS_DESCARGA:
+            previo = self.enqueue(project_id, etapa, prioridad, depende_de=previo)
+            ids.append(previo)
+        return ids
+
+    def cancel(self, job_id: str) -> None:
+        """Cancela un trabajo pendiente, o detiene uno en curso guardando su avance."""
+        job = self.jobs.get(job_id)
+        if job_id in self._running:
+            self._detenidos.add(job_id)
+            self._running[job_id][1].cancel_token.cancel()
+            return
+        if job and job["estado"] == "pendiente":
+            job["estado"] = "cancelado"
+            job["terminado"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self.job_finished.emit(dict(job))
+            self._changed()
+
+    def retry(self, job_id: str) -> None:
+        job = self.jobs.get(job_id)
+        if job and job["estado"] in ("error", "cancelado"):
+            job["estado"] = "pendiente"
+            job.pop("error", None)
+            self._changed()
+            self._dispatch()
+
+    def clear_finished(self) -> None:
+        self.jobs = {k: j for k, j in self.jobs.items() if j["estado"] not in ESTADOS_FINALES}
+        self._changed()
+
+    def pause(self) -> None:
+        """No despacha trabajos nuevos y pausa los que están en curso."""
+        self._paused = True
+        for _thread, worker in self._running.values():
+            worker.cancel_token.pause()
+
+    def resume(self) -> None:
+        self._paused = False
+        for _thread, worker in self._running.values():
+            worker.cancel_token.resume()
+        self._dispatch()
+
+    def start(self) -> None:
+        """Arranca la ejecución (p. ej. de los trabajos reanudados al iniciar)."""
+        if self._reanudados:
+            self.log_requested.emit(f"⏳ Reanudando {self._reanudados} trabajos interrumpidos.")
+            self._reanudados = 0
+        self.queue_changed.emit(self.summary())
+        self._dispatch()
+
+    # --- Ejecución ---
+
+    def _blocked(self, job: Dict[str, Any]) -> bool:
+        dep = self.jobs.get(job.get("depende_de") or "")
+        if dep is None:
+            return False
+        if dep["estado"] in ("error", "cancelado"):
+            job["estado"] = "cancelado"
+            job["error"] = f"Dependencia {dep['id']} no completada."
+            job["terminado"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self.job_finished.emit(dict(job))
+            return True
+        return dep["estado"] != "ok"
+
+    def _dispatch(self) -> None:
+        if self._paused:
+            return
+        changed = False
+        running = [self.jobs[j] for j in self._running]
+        por_etapa: Dict[str, int] = {}
+        proyectos = set()
+        for job in running:
+            por_etapa[job["etapa"]] = por_etapa.get(job["etapa"], 0) + 1
+            proyectos.add(job["proyecto"])
+
+        pendientes = sorted(
+            (j for j in self.jobs.values() if j["estado"] == "pendiente"),
+            key=lambda j: (-j["prioridad"], j["seq"]),
+        )
+        for job in pendientes:
+            if len(self._running) >= self.max_simultaneos:
+                break
+            if job["proyecto"] in proyectos:
+                continue
+            if por_etapa.get(job["etapa"], 0) >= LIMITES_ETAPA.get(job["etapa"], 1):
+                continue
+            if self._blocked(job):
+                changed = changed or job["estado"] == "cancelado"
+                continue
+            self._launch(job)
+            por_etapa[job["etapa"]] = por_etapa.get(job["etapa"], 0) + 1
+            proyectos.add(job["proyecto"])
+            changed = True
+
+        if changed:
+            self._changed()
+
+    def _launch(self, job: Dict[str, Any]) -> None:
+        job["estado"] = "en_curso"
+        job["intentos"] = job.get("intentos", 0) + 1
+        job["iniciado"] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+        thread = QThread()
+        worker = JobWorker(job)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.log_signal.connect(self.log_requested.emit)
+        worker.finished_signal.connect(self._on_job_finished)
+        # Directa: shutdown() espera el hilo sin devolver el control al bucle de eventos.
+        worker.finished_signal.connect(thread.quit, Qt.ConnectionType.DirectConnection)
+        worker.finished_signal.connect(worker.deleteLater)
+        thread.finished.connect(lambda t=thread: self._threads.discard(t))
+        thread.finished.connect(thread.deleteLater)
+        self._running[job["id"]] = (thread, worker)
+        self._threads.add(thread)
+
+        self.log_requested.emit(f"⏳ [{job['proyecto']}] Iniciando etapa '{job['etapa']}'...")
+        self.job_started.emit(dict(job))
+        thread.start()
+
+    def _on_job_finished(self, job_id: str, ok: bool, error: str) -> None:
+        if self._running.pop(job_id, None) is None:
+            return  # ya lo cerró shutdown()
+        job = self.jobs.get(job_id)
+        detenido = job_id in self._detenidos
+        self._detenidos.discard(job_id)
+        if job is not None:
+            job["estado"] = "ok" if ok else ("cancelado" if detenido else "error")
+            job["terminado"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            if error:
+                job["error"] = error
+            icono = "✅" if ok else ("⏹️" if detenido else "❌")
+            self.log_requested.emit(f"{icono} [{job['proyecto']}] Etapa '{job['etapa']}' {job['estado']}.")
+            self.job_finished.emit(dict(job))
+        self._changed()
+        self._dispatch()
+
+    def shutdown(self, espera_ms: int = ESPERA_CIERRE_MS) -> None:
+        """
+        Detiene el despacho al cerrar la aplicación. Los trabajos en curso se
+        detienen en su próximo punto de control (guardando su avance) y se
+        esperan; quedan 'pendiente' para reanudarse en el próximo inicio. Si
+        alguno no termina a tiempo queda 'en_curso' y también se reanuda.
+        """
+        self._paused = True
+        for _thread, worker in self._running.values():
+            worker.cancel_token.cancel()
+        for job_id, (thread, _worker) in list(self._running.items()):
+            job = self.jobs.get(job_id)
+            if not thread.wait(espera_ms):
+                self.log_requested.emit(f"⚠️ [{job['proyecto']}] La etapa '{job['etapa']}' no se detuvo a tiempo.")
+                continue
+            self._running.pop(job_id, None)
+            if job is not None and job["estado"] == "en_curso":
+                job["estado"] = "pendiente"
+        self._save()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import concurrent.futures
 import json
 import os
 import shutil
@@ -8,14 +9,16 @@ import zipfile
 from pathlib import Path
 from typing import Callable
 
-import py7zr
-import rarfile
 from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
 
-from .utils import log as _log
+from . import perfilado
+from .enlaces import enlazar_documentos
+from .progreso import ProgressEvent, ProgressTracker
+from .utils import CancelToken, log as _log, marcar_interrupcion
 
 EXT_COMP = {".zip", ".rar", ".7z"}
 MAX_RECURSION = 8
+HILOS_ESCANEO = 8  # carpetas de primer nivel leídas en paralelo (latencia de volúmenes de red)
 
 
 def _get_exeva_json_path(idp: str) -> Path:
@@ -32,6 +35,7 @@ def _load_payload(idp: str) -> dict:
         return {}
 
 
+@perfilado.medir("json.guardar")
 def _save_payload(idp: str, payload: dict) -> Path:
     path = _get_exeva_json_path(idp)
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -42,11 +46,15 @@ def _save_payload(idp: str, payload: dict) -> Path:
 def _set_unrar_tool(log: Callable[[str], None] | None) -> None:
     unrar_path = Path(__file__).resolve().parent / "UnRAR.exe"
     if unrar_path.exists():
+        import rarfile
+
         rarfile.UNRAR_TOOL = str(unrar_path)
         _log(log, f"[UNPACK] Usando UNRAR local: {unrar_path}")
 
 
 def _extract_with_unrar(archive_path: Path, out_dir: Path) -> None:
+    import rarfile
+
     command = [
         str(rarfile.UNRAR_TOOL),
         "x",
@@ -59,12 +67,16 @@ def _extract_with_unrar(archive_path: Path, out_dir: Path) -> None:
         raise RuntimeError(result.stderr.strip() or "UNRAR falló")
 
 
+@perfilado.medir("unpack.extraer")
 def _extract_archive(archive_path: Path, out_dir: Path, log: Callable[[str], None] | None) -> None:
     ext = archive_path.suffix.lower()
     if ext == ".zip":
         with zipfile.ZipFile(archive_path, "r") as zip_ref:
             zip_ref.extractall(out_dir)
     elif ext == ".rar":
+        # py7zr y rarfile se importan recién al extraer (arranque de la app más liviano)
+        import rarfile
+
         try:
             with rarfile.RarFile(str(archive_path), "r") as rar_ref:
                 rar_ref.extractall(out_dir)
@@ -72,54 +84,38 @@ def _extract_archive(archive_path: Path, out_dir: Path, log: Callable[[str], Non
             _log(log, f"[UNPACK] rarfile falló con {archive_path.name}. Probando UNRAR...")
             _extract_with_unrar(archive_path, out_dir)
     elif ext == ".7z":
+        import py7zr
+
         with py7zr.SevenZipFile(archive_path, mode="r") as seven_zip:
             seven_zip.extractall(path=out_dir)
     else:
         raise ValueError(f"Formato no soportado: {ext}")
 
 
-def _walk_compressed_files(folder: Path):
-    for root, _, files in os.walk(folder):
-        for file in files:
-            path = Path(root) / file
-            if path.suffix.lower() in EXT_COMP:
-                yield path
-
-
-def _extract_recursive(archive_path: Path, log: Callable[[str], None] | None) -> list[dict]:
-    failures: list[dict] = []
-    queue = [(archive_path, 0)]
-
-    while queue:
-        current, depth = queue.pop(0)
-        if depth > MAX_RECURSION:
-            failures.append({
-                "archivo": current.name,
-                "ruta": str(current),
-                "error": f"Límite de niveles alcanzado ({MAX_RECURSION})",
-            })
-            continue
-
-        out_dir = current.with_suffix("")
-        if not out_dir.exists() or not any(out_dir.iterdir()):
-            out_dir.mkdir(parents=True, exist_ok=True)
-            try:
-                _log(log, f"[UNPACK] Descomprimiendo: {current.name} → {out_dir}")
-                _extract_archive(current, out_dir, log)
-            except Exception as exc:
-                failures.append({
-                    "archivo": current.name,
-                    "ruta": str(current),
-                    "error": str(exc),
-                })
-                continue
+def _tamano(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
 
-        for nested in _walk_compressed_files(out_dir):
-            nested_out = nested.with_suffix("")
-            if not nested_out.exists() or not any(nested_out.iterdir()):
-                queue.append((nested, depth + 1))
 
-    return failures
+def _extraer_en(archive_path: Path, out_dir: Path, log: Callable[[str], None] | None,
+                failures: list[dict], progreso: ProgressTracker | None = None) -> None:
+    """Extrae si la carpeta de salida no existe o está vacía (lo ya extraído se conserva)."""
+    if out_dir.exists() and any(out_dir.iterdir()):
+        return
+    out_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        _log(log, f"[UNPACK] Descomprimiendo: {archive_path.name} → {out_dir}")
+        _extract_archive(archive_path, out_dir, log)
+        if progreso is not None:
+            progreso.agregar_bytes(_tamano(archive_path))
+    except Exception as exc:
+        failures.append({
+            "archivo": archive_path.name,
+            "ruta": str(archive_path),
+            "error": str(exc),
+        })
 
 
 def _resolve_file_path(project_root: Path, exeva_root: Path, ruta: str | None) -> Path | None:
@@ -148,16 +144,122 @@ def _normalize_route(path: Path, base_dir: Path) -> str:
         return path.as_posix()
 
 
-def _index_tree(path: Path, base_dir: Path) -> dict:
-    info = {
-        "nombre": path.name,
-        "formato": "carpeta" if path.is_dir() else (path.suffix.lower().lstrip(".") or "desconocido"),
-        "ruta": _normalize_route(path, base_dir),
-    }
-    if path.is_dir():
-        children = sorted(path.iterdir(), key=lambda p: (p.is_file(), p.name.lower()))
-        info["contenido"] = [_index_tree(child, base_dir) for child in children]
-    return info
+def _listar(carpeta: str, ruta: str, contenido: list, candidatos: list) -> list[tuple]:
+    """
+    Lee una carpeta con os.scandir (tipo de cada entrada sin stat extra),
+    agrega sus nodos a 'contenido' y anota los comprimidos en 'candidatos'.
+    Devuelve las subcarpetas que faltan por recorrer.
+    """
+    try:
+        with os.scandir(carpeta) as it:
+            entradas = sorted(it, key=lambda e: (e.is_file(), e.name.lower()))
+    except OSError:
+        return []
+
+    subcarpetas = []
+    for entrada in entradas:
+        ruta_nodo = f"{ruta}/{entrada.name}" if ruta else entrada.name
+        if entrada.is_dir():
+            nodo = {"nombre": entrada.name, "formato": "carpeta", "ruta": ruta_nodo, "contenido": []}
+            subcarpetas.append((entrada.path, ruta_nodo, nodo["contenido"]))
+        else:
+            ext = os.path.splitext(entrada.name)[1].lower()
+            nodo = {"nombre": entrada.name, "formato": ext.lstrip(".") or "desconocido", "ruta": ruta_nodo}
+            if ext in EXT_COMP:
+                candidatos.append((Path(entrada.path), contenido, ruta))
+        contenido.append(nodo)
+    return subcarpetas
+
+
+def _recorrer(pendientes: list[tuple]) -> list[tuple]:
+    candidatos: list[tuple] = []
+    stack = list(pendientes)
+    while stack:
+        stack.extend(_listar(*stack.pop(), candidatos))
+    return candidatos
+
+
+@perfilado.medir("unpack.escanear")
+def _escanear(raiz: Path, ruta_raiz: str) -> tuple[dict, list[tuple]]:
+    """
+    Construye el árbol 'descomprimidos' de 'raiz' en una sola pasada y
+    devuelve además los comprimidos anidados que aún no tienen su carpeta
+    extraída: (archivo, contenido de su carpeta, ruta de su carpeta).
+    Las carpetas de primer nivel se recorren en paralelo.
+    """
+    arbol = {"nombre": raiz.name, "formato": "carpeta", "ruta": ruta_raiz, "contenido": []}
+    candidatos: list[tuple] = []
+    primer_nivel = _listar(str(raiz), ruta_raiz, arbol["contenido"], candidatos)
+    if len(primer_nivel) > 1 and HILOS_ESCANEO > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(HILOS_ESCANEO, len(primer_nivel))) as ex:
+            for propios in ex.map(lambda sub: _recorrer([sub]), primer_nivel):
+                candidatos.extend(propios)
+    else:
+        candidatos.extend(_recorrer(primer_nivel))
+    return arbol, _sin_extraer(candidatos)
+
+
+def _sin_extraer(candidatos: list[tuple]) -> list[tuple]:
+    pendientes = []
+    carpetas: dict[int, dict] = {}
+    for archivo, contenido, ruta in candidatos:
+        nombres = carpetas.get(id(contenido))
+        if nombres is None:
+            nombres = carpetas[id(contenido)] = {n["nombre"]: n for n in contenido if "contenido" in n}
+        extraido = nombres.get(archivo.with_suffix("").name)
+        if extraido is None or not extraido["contenido"]:
+            pendientes.append((archivo, contenido, ruta))
+    return pendientes
+
+
+def _orden_nodo(nodo: dict) -> tuple:
+    return "contenido" not in nodo, str(nodo.get("nombre") or "").lower()
+
+
+def _descomprimir_e_indexar(archive_path: Path, base_dir: Path, log: Callable[[str], None] | None,
+                            progreso: ProgressTracker | None = None) -> tuple[dict | None, list[dict]]:
+    """
+    Extrae el comprimido y los anidados (hasta MAX_RECURSION niveles) y
+    devuelve su árbol. Cada carpeta se lee una vez: el árbol de un anidado
+    recién extraído se injerta en el de su carpeta contenedora.
+    """
+    failures: list[dict] = []
+    out_dir = archive_path.with_suffix("")
+    if progreso is not None:
+        progreso.agregar_bytes_total(_tamano(archive_path))
+    _extraer_en(archive_path, out_dir, log, failures, progreso)
+    if not out_dir.is_dir():
+        return None, failures
+
+    arbol, pendientes = _escanear(out_dir, _normalize_route(out_dir, base_dir))
+    cola = [(archivo, contenido, ruta, 1) for archivo, contenido, ruta in pendientes]
+    if progreso is not None:
+        for archivo, *_ in cola:
+            progreso.agregar_bytes_total(_tamano(archivo))
+
+    while cola:
+        archivo, contenido, ruta, depth = cola.pop(0)
+        if depth > MAX_RECURSION:
+            failures.append({
+                "archivo": archivo.name,
+                "ruta": str(archivo),
+                "error": f"Límite de niveles alcanzado ({MAX_RECURSION})",
+            })
+            continue
+
+        nested_out = archivo.with_suffix("")
+        _extraer_en(archivo, nested_out, log, failures, progreso)
+        if not nested_out.is_dir():
+            continue
+        sub, nuevos = _escanear(nested_out, f"{ruta}/{nested_out.name}" if ruta else nested_out.name)
+        contenido[:] = [n for n in contenido if n.get("nombre") != sub["nombre"]] + [sub]
+        contenido.sort(key=_orden_nodo)
+        for nuevo, cont, ruta_nuevo in nuevos:
+            cola.append((nuevo, cont, ruta_nuevo, depth + 1))
+            if progreso is not None:
+                progreso.agregar_bytes_total(_tamano(nuevo))
+
+    return arbol, failures
 
 
 def _base_for_item(project_root: Path, exeva_root: Path, ruta: str | None) -> Path:
@@ -179,7 +281,7 @@ def _clear_unpack_error(item: dict) -> None:
 
 def _process_item(item: dict, project_root: Path, exeva_root: Path,
                   log: Callable[[str], None] | None, failures: list[dict],
-                  force_extract: bool = False) -> bool:
+                  force_extract: bool = False, progreso: ProgressTracker | None = None) -> bool:
     ruta = item.get("ruta")
     archive_path = _resolve_file_path(project_root, exeva_root, ruta)
     if not archive_path:
@@ -195,19 +297,21 @@ def _process_item(item: dict, project_root: Path, exeva_root: Path,
     if archive_path.suffix.lower() not in EXT_COMP:
         return False
 
-    current_failures = _extract_recursive(archive_path, log)
-    failures.extend(current_failures)
-
     out_dir = archive_path.with_suffix("")
+    # La limpieza va antes de extraer: después borraría lo recién extraído.
     if force_extract and out_dir.exists():
         try:
             shutil.rmtree(out_dir)
         except Exception as exc:
             _mark_unpack_error(item, f"No se pudo limpiar carpeta: {exc}")
             return False
-    if out_dir.exists() and out_dir.is_dir():
-        base_dir = _base_for_item(project_root, exeva_root, ruta)
-        item["descomprimidos"] = _index_tree(out_dir, base_dir)
+
+    base_dir = _base_for_item(project_root, exeva_root, ruta)
+    arbol, current_failures = _descomprimir_e_indexar(archive_path, base_dir, log, progreso)
+    failures.extend(current_failures)
+
+    if arbol is not None:
+        item["descomprimidos"] = arbol
         if current_failures:
             for failure in current_failures:
                 archivo = failure.get("archivo") or Path(str(ruta)).name
@@ -220,7 +324,9 @@ def _process_item(item: dict, project_root: Path, exeva_root: Path,
     return False
 
 
-def unpack_exeva_archives(idp: str, log: Callable[[str], None] | None = None) -> dict:
+def unpack_exeva_archives(idp: str, log: Callable[[str], None] | None = None,
+                          cancel: CancelToken | None = None,
+                          progress: Callable[[ProgressEvent], None] | None = None) -> dict:
     _set_unrar_tool(log)
     payload = _load_payload(idp) or {}
     exeva = payload.get("EXEVA")
@@ -240,29 +346,49 @@ def unpack_exeva_archives(idp: str, log: Callable[[str], None] | None = None) ->
     indexed_items = 0
     failures: list[dict] = []
 
+    items: list[dict] = []
     for doc in documentos:
         if not isinstance(doc, dict):
             continue
-
-        if "descomprimidos" in doc:
-            doc.pop("descomprimidos", None)
-
-        if _process_item(doc, project_root, exeva_root, log, failures):
-            indexed_items += 1
-        total_items += 1
-
+        items.append(doc)
         for key in ("anexos_detectados", "vinculados_detectados"):
             links = doc.get(key) or []
             if not isinstance(links, list):
                 continue
-            for link in links:
-                if not isinstance(link, dict):
-                    continue
-                total_items += 1
-                link.pop("descomprimidos", None)
-                if _process_item(link, project_root, exeva_root, log, failures):
-                    indexed_items += 1
-
+            items.extend(link for link in links if isinstance(link, dict))
+
+    # Tras una detención, lo ya descomprimido se conserva y no se vuelve a extraer.
+    reanudar = exeva.get("interrumpido") == "descomprimir"
+    if reanudar:
+        _log(log, "[UNPACK] Reanudando descompresión interrumpida.")
+
+    extraidos: set[str] = set()
+    progreso = ProgressTracker("Descompresión", len(items), progress)
+    for item in items:
+        if cancel is not None and not cancel.check():
+            break
+        total_items += 1
+        if reanudar and "descomprimidos" in item:
+            indexed_items += 1
+            progreso.avanzar()
+            continue
+        # Los ítems que comparten nodo en el grafo de enlaces (mismo archivo)
+        # se extraen una sola vez; enlazar_documentos copia el resultado.
+        enlace = item.get("enlace")
+        if enlace and enlace in extraidos:
+            progreso.avanzar()
+            continue
+        item.pop("descomprimidos", None)
+        if _process_item(item, project_root, exeva_root, log, failures, progreso=progreso):
+            indexed_items += 1
+            if enlace:
+                extraidos.add(enlace)
+        progreso.avanzar()
+    progreso.terminar()
+    enlazar_documentos(exeva)
+
+    if marcar_interrupcion(exeva, "descomprimir", cancel):
+        _log(log, f"[UNPACK] Descompresión detenida ({total_items}/{len(items)} ítems). Progreso guardado.")
     _save_payload(idp, payload)
     _log(log, f"[UNPACK] Ítems indexados: {indexed_items}/{total_items}.")
 
@@ -324,12 +450,14 @@ def unpack_exeva_item(idp: str, ruta: str, log: Callable[[str], None] | None = N
 
 class UnpackWorker(QObject):
     finished_signal = pyqtSignal(bool, dict)
+    progress_signal = pyqtSignal(object)  # ProgressEvent
     log_signal = pyqtSignal(str)
 
     def __init__(self, project_id: str, ruta: str | None = None):
         super().__init__()
         self.project_id = project_id
         self.ruta = ruta
+        self.cancel_token = CancelToken()
 
     @pyqtSlot()
     def run(self) -> None:
@@ -341,10 +469,16 @@ class UnpackWorker(QObject):
                 if success:
                     result_data = _load_payload(self.project_id).get("EXEVA", {})
             else:
-                result_data = unpack_exeva_archives(self.project_id, log=self.log_signal.emit)
-                success = bool(result_data)
-
-            if success:
+                with perfilado.sesion(self.project_id, "descomprimir", self.log_signal.emit):
+                    result_data = unpack_exeva_archives(
+                        self.project_id, log=self.log_signal.emit, cancel=self.cancel_token,
+                        progress=self.progress_signal.emit,
+                    )
+                success = bool(result_data) and not self.cancel_token.cancelled
+
+            if self.cancel_token.cancelled:
+                self.log_signal.emit("⏹️ Descompresión detenida. Progreso guardado.")
+            elif success:
                 self.log_signal.emit("✅ Descompresión e indexación completadas.")
             else:
                 if self.ruta:
@@ -359,6 +493,7 @@ class UnpackWorker(QObject):
 class UnpackController(QObject):
     unpack_started = pyqtSignal()
     unpack_finished = pyqtSignal(bool, dict)
+    unpack_progress = pyqtSignal(object)  # ProgressEvent
     log_requested = pyqtSignal(str)
 
     def __init__(self, parent=None):
@@ -385,9 +520,25 @@ class UnpackController(QObject):
         self.thread.started.connect(self.worker.run)
 
         self.worker.log_signal.connect(self.log_requested.emit)
+        self.worker.progress_signal.connect(self.unpack_progress.emit)
         self.worker.finished_signal.connect(self.unpack_finished.emit)
         self.worker.finished_signal.connect(self.thread.quit)
         self.worker.finished_signal.connect(self.worker.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
 
         self.thread.start()
+
+    def pause(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.pause()
+            self.log_requested.emit("⏸️ Descompresión en pausa.")
+
+    def resume(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.resume()
+            self.log_requested.emit("▶️ Descompresión reanudada.")
+
+    def cancel(self) -> None:
+        if self.worker:
+            self.worker.cancel_token.cancel()
+            self.log_requested.emit("⏹️ Deteniendo descompresión (se guarda el progreso)...")
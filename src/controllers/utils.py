@@ -1,18 +1,118 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
 from urllib.parse import urlparse
 import os
+import re
+import tempfile
+import threading
+import time
 
 import requests
 
+from . import integridad, perfilado
+
+if TYPE_CHECKING:
+    from .progreso import ProgressTracker
+
 
 def log(cb: Callable[[str], None] | None, message: str) -> None:
     if cb:
         cb(message)
 
 
+class CancelToken:
+    """
+    Señal cooperativa de cancelación y pausa compartida entre un Worker y sus
+    hilos. Los bucles llaman a check() entre ítems: bloquea mientras el token
+    está en pausa y retorna False si se pidió detener.
+    """
+
+    def __init__(self) -> None:
+        self._cancelado = threading.Event()
+        self._activo = threading.Event()
+        self._activo.set()
+
+    def cancel(self) -> None:
+        self._cancelado.set()
+        self._activo.set()  # despierta a los hilos en pausa para que terminen
+
+    def pause(self) -> None:
+        if not self._cancelado.is_set():
+            self._activo.clear()
+
+    def resume(self) -> None:
+        self._activo.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelado.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._activo.is_set()
+
+    def check(self) -> bool:
+        self._activo.wait()
+        return not self._cancelado.is_set()
+
+
+# Páginas HTML pedidas por adelantado (p. ej. al detectar un ID nuevo) que la
+# etapa siguiente toma en lugar de repetir la consulta. Se consumen una vez.
+PREFETCH_TTL = 300.0  # segundos
+_prefetch: dict[str, tuple[float, str]] = {}
+_prefetch_lock = threading.Lock()
+
+
+def guardar_prefetch(url: str, html: str) -> None:
+    with _prefetch_lock:
+        _prefetch[url] = (time.monotonic(), html)
+
+
+def tomar_prefetch(url: str) -> str | None:
+    """HTML pre-cargado de 'url' si existe y no expiró (lo quita de la caché)."""
+    with _prefetch_lock:
+        entrada = _prefetch.pop(url, None)
+    if entrada and time.monotonic() - entrada[0] <= PREFETCH_TTL:
+        return entrada[1]
+    return None
+
+
+def marcar_interrupcion(exeva: dict, etapa: str, cancel: CancelToken | None) -> bool:
+    """
+    Registra en el bloque EXEVA que 'etapa' quedó detenida a medias (para
+    reanudarla sin repetir lo ya hecho) o limpia la marca si terminó.
+    Retorna True si la etapa fue detenida.
+    """
+    if cancel is not None and cancel.cancelled:
+        exeva["interrumpido"] = etapa
+        return True
+    if exeva.get("interrumpido") == etapa:
+        exeva.pop("interrumpido")
+    return False
+
+
+def escribir_atomico(path: Path, texto: str) -> None:
+    """
+    Reemplaza 'path' con 'texto' de forma atómica. El temporal es propio de
+    cada escritor (mkstemp en la misma carpeta), así dos hilos o procesos que
+    guardan el mismo archivo no se pisan el .tmp.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(texto)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
 def sanitize_filename(name: str) -> str:
     invalid = '<>:"/\\|?*'
     cleaned = "".join("_" if ch in invalid else ch for ch in name)
@@ -30,45 +130,157 @@ def url_filename(url: str) -> str:
     return Path(path).name
 
 
-def _next_available_path(base_path: Path) -> Path:
-    if not base_path.exists():
-        return base_path
+_SUFIJO_RE = re.compile(r"^(?P<stem>.+)_(?P<idx>\d+)(?P<ext>\.[^.]*)?$")
+
+
+class PathAllocator:
+    """
+    Asigna rutas de destino sin colisiones entre los hilos de descarga.
+
+    reservar() anota el nombre en memoria y crea el archivo con O_EXCL (el
+    sistema de archivos decide si otro proceso lo tomó). Si el nombre está
+    ocupado usa nombre_1, nombre_2... continuando desde el mayor sufijo ya
+    visto en esa carpeta (se lee una sola vez), así no sondea miles de nombres
+    en carpetas con muchos "Anexo.pdf".
+
+    La reserva dura mientras se escribe: al terminar se llama liberar() (el
+    archivo queda) o descartar() (se borra el archivo vacío que creó la
+    reserva; uno que ya existía, reservado con reemplazar=True, no se toca).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reservadas: set[str] = set()
+        self._creadas: set[str] = set()
+        self._sufijos: dict[str, dict[tuple[str, str], int]] = {}
+
+    @staticmethod
+    def _clave(path: Path) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    @staticmethod
+    def _crear(path: Path) -> bool:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0))
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+    def _sufijos_de(self, carpeta: Path) -> dict[tuple[str, str], int]:
+        clave = self._clave(carpeta)
+        sufijos = self._sufijos.get(clave)
+        if sufijos is None:
+            sufijos = self._sufijos[clave] = {}
+            try:
+                with os.scandir(carpeta) as it:
+                    for entrada in it:
+                        m = _SUFIJO_RE.match(os.path.normcase(entrada.name))
+                        if m:
+                            k = (m["stem"], m["ext"] or "")
+                            sufijos[k] = max(sufijos.get(k, 0), int(m["idx"]))
+            except OSError:
+                pass
+        return sufijos
 
-    stem = base_path.stem
-    suffix = base_path.suffix
-    parent = base_path.parent
-    for idx in range(1, 1000):
-        candidate = parent / f"{stem}_{idx}{suffix}"
-        if not candidate.exists():
-            return candidate
-    return parent / f"{stem}_extra{suffix}"
+    def reservar(self, path: Path, reemplazar: bool = False) -> Path:
+        """
+        Devuelve la ruta reservada para escribir. Con reemplazar=True se
+        acepta 'path' aunque exista en disco (re-descarga), salvo que otro
+        hilo lo esté escribiendo.
+        """
+        with self._lock:
+            clave = self._clave(path)
+            if clave not in self._reservadas:
+                if reemplazar and path.exists():
+                    self._reservadas.add(clave)
+                    return path
+                if self._crear(path):
+                    self._reservadas.add(clave)
+                    self._creadas.add(clave)
+                    return path
 
+            stem, suffix = path.stem, path.suffix
+            sufijos = self._sufijos_de(path.parent)
+            k = (os.path.normcase(stem), os.path.normcase(suffix))
+            idx = sufijos.get(k, 0)
+            while True:
+                idx += 1
+                candidato = path.parent / f"{stem}_{idx}{suffix}"
+                clave = self._clave(candidato)
+                if clave not in self._reservadas and self._crear(candidato):
+                    sufijos[k] = idx
+                    self._reservadas.add(clave)
+                    self._creadas.add(clave)
+                    return candidato
 
+    def liberar(self, path: Path) -> None:
+        with self._lock:
+            clave = self._clave(path)
+            self._reservadas.discard(clave)
+            self._creadas.discard(clave)
+
+    def descartar(self, path: Path) -> None:
+        """Libera el nombre y borra el archivo sólo si lo creó esta reserva."""
+        with self._lock:
+            creada = self._clave(path) in self._creadas
+        if creada:
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+        self.liberar(path)
+
+
+# Compartido por todas las descargas del proceso (documentos y anexos).
+rutas_descarga = PathAllocator()
+
+
+@perfilado.medir("http.descarga")
 def download_binary(
     url: str,
     out_path: Path,
     timeout: int = 30,
     *,
     overwrite: bool = False,
+    cancel: CancelToken | None = None,
+    progreso: ProgressTracker | None = None,
+    cuarentena: Path | None = None,
+    verificacion: dict | None = None,
 ) -> tuple[bool, Path]:
+    """
+    Descarga 'url' en 'out_path' (o nombre_N si ya existe) verificando el
+    contenido mientras se escribe (ver integridad.py). Si no pasa la
+    verificación va a 'cuarentena', un 'out_path' previo queda intacto y se
+    retorna False; en 'verificacion' quedan "sha256" (válido) o "motivo"
+    (rechazado).
+    """
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    if overwrite:
-        if out_path.exists():
-            try:
-                out_path.unlink()
-            except Exception:
-                pass
-        target_path = out_path
-    else:
-        target_path = _next_available_path(out_path)
-
+    target_path = out_path
+    reservada = False
     try:
+        target_path = rutas_descarga.reservar(out_path, reemplazar=overwrite)
+        reservada = True
         with requests.get(url, stream=True, timeout=timeout, verify=False) as response:
             response.raise_for_status()
-            with open(target_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            verificador = integridad.escribir_verificando(response, target_path, cancel, progreso, cuarentena)
+        if verificador is None:
+            # Nada parcial queda en disco: el ítem se descarga completo al reanudar.
+            rutas_descarga.descartar(target_path)
+            return False, target_path
+        motivo = verificador.motivo()
+        if motivo:
+            rutas_descarga.descartar(target_path)
+            if verificacion is not None:
+                verificacion["motivo"] = motivo
+            return False, target_path
+        rutas_descarga.liberar(target_path)
+        if verificacion is not None:
+            verificacion["sha256"] = verificador.sha256
+        if perfilado.activo():
+            perfilado.contar("bytes.descargados", verificador.bytes)
         return True, target_path
     except Exception:
+        if reservada:
+            rutas_descarga.descartar(target_path)
         return False, target_path
@@ -0,0 +1,270 @@
+"""
+Modelo compacto en memoria del expediente EXEVA.
+
+<id>_EXEVA.json cargado con json.load deja un dict por documento, anexo,
+vinculado y nodo de 'descomprimidos', cada uno con su tabla hash y sus
+valores repetidos ("pdf", "html", "carpeta", "0001"...). En proyectos grandes
+eso son cientos de MB por proyecto abierto.
+
+Aquí cada nodo es un registro con __slots__:
+
+- Documento, Enlace y NodoArchivo guardan los campos conocidos en slots; las
+  claves desconocidas van a un dict aparte que sólo existe si hace falta.
+- El orden de las claves se guarda como una tupla compartida entre todos los
+  registros con la misma forma, así volcar() reproduce el JSON original byte
+  a byte.
+- Los valores repetitivos entre proyectos (formato, origen, n, nombres de
+  archivo...) se internan con sys.intern; el resto de los textos repetidos
+  dentro del mismo expediente (url, ruta, clave de enlace) se comparten.
+  Los árboles 'descomprimidos' no se comparten: cada ítem conserva el suyo,
+  así modificar uno no altera los de otros documentos.
+
+Los registros se comportan como un dict (get, [], in, setdefault, pop,
+dict(registro)), de modo que la interfaz los lee y modifica sin copiarlos;
+sólo se convierten a dict al volcarlos, nodo a nodo (json default=a_json).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from collections.abc import Mapping, MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+_FORMAS: Dict[tuple, tuple] = {}
+
+
+class _Carga:
+    """Estado de una conversión: textos ya vistos en el expediente."""
+
+    __slots__ = ("textos",)
+
+    def __init__(self):
+        self.textos: Dict[str, str] = {}
+
+    def texto(self, valor: str) -> str:
+        return self.textos.setdefault(valor, valor)
+
+
+def _forma(claves: tuple) -> tuple:
+    """Tupla de claves canónica: los registros con la misma forma la comparten."""
+    forma = _FORMAS.get(claves)
+    if forma is None:
+        forma = tuple(sys.intern(k) for k in claves)
+        forma = _FORMAS.setdefault(forma, forma)
+    return forma
+
+
+class _Registro(MutableMapping):
+    __slots__ = ("_claves", "_extra")
+
+    CAMPOS: frozenset = frozenset()
+    INTERNADOS: frozenset = frozenset()
+
+    def __init__(self, datos: Mapping | None = None):
+        self._claves: tuple = ()
+        self._extra: Dict[str, Any] | None = None
+        if datos:
+            for clave, valor in datos.items():
+                self[clave] = valor
+
+    @classmethod
+    def desde_dict(cls, datos: Mapping, carga: _Carga | None = None) -> "_Registro":
+        """Convierte un dict del JSON (y sus hijos) en registros."""
+        reg = cls.__new__(cls)
+        reg._extra = None
+        campos, internados = cls.CAMPOS, cls.INTERNADOS
+        for clave, valor in datos.items():
+            if isinstance(valor, str):
+                if clave in internados:
+                    valor = sys.intern(valor)
+                elif carga is not None:
+                    valor = carga.texto(valor)
+            else:
+                valor = cls._hijo(clave, valor, carga)
+            if clave in campos:
+                object.__setattr__(reg, clave, valor)
+            else:
+                if reg._extra is None:
+                    reg._extra = {}
+                reg._extra[sys.intern(clave)] = valor
+        reg._claves = _forma(tuple(datos))
+        return reg
+
+    @classmethod
+    def _hijo(cls, clave: str, valor: Any, carga: _Carga | None) -> Any:
+        return valor
+
+    # --- Interfaz de dict ---
+
+    def __getitem__(self, clave: str) -> Any:
+        if clave in self.CAMPOS:
+            try:
+                return object.__getattribute__(self, clave)
+            except AttributeError:
+                raise KeyError(clave) from None
+        if self._extra is None:
+            raise KeyError(clave)
+        return self._extra[clave]
+
+    def get(self, clave: str, default: Any = None) -> Any:
+        if clave in self.CAMPOS:
+            return getattr(self, clave, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(clave, default)
+
+    def __setitem__(self, clave: str, valor: Any) -> None:
+        if isinstance(valor, str) and clave in self.INTERNADOS:
+            valor = sys.intern(valor)
+        if clave in self.CAMPOS:
+            nueva = not hasattr(self, clave)
+            object.__setattr__(self, clave, valor)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            nueva = clave not in self._extra
+            self._extra[clave] = valor
+        if nueva:
+            self._claves = _forma(self._claves + (clave,))
+
+    def __delitem__(self, clave: str) -> None:
+        if clave in self.CAMPOS:
+            try:
+                object.__delattr__(self, clave)
+            except AttributeError:
+                raise KeyError(clave) from None
+        else:
+            if self._extra is None:
+                raise KeyError(clave)
+            del self._extra[clave]
+            if not self._extra:
+                self._extra = None
+        self._claves = _forma(tuple(k for k in self._claves if k != clave))
+
+    def __contains__(self, clave: object) -> bool:
+        return clave in self._claves
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._claves)
+
+    def __len__(self) -> int:
+        return len(self._claves)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.a_dict()!r})"
+
+    def __getstate__(self) -> dict:
+        return self.a_dict()
+
+    def __setstate__(self, estado: dict) -> None:
+        self.__init__(estado)
+
+    def a_dict(self) -> dict:
+        """Dict de un nivel (los hijos siguen siendo registros)."""
+        return {clave: self[clave] for clave in self._claves}
+
+
+def _arbol(valor: Any, carga: _Carga | None = None) -> Any:
+    return NodoArchivo.desde_dict(valor, carga) if isinstance(valor, dict) else valor
+
+
+def _enlaces(valor: Any, carga: _Carga | None) -> Any:
+    if not isinstance(valor, list):
+        return valor
+    return [Enlace.desde_dict(v, carga) if isinstance(v, dict) else v for v in valor]
+
+
+class NodoArchivo(_Registro):
+    """Nodo del árbol 'descomprimidos' (carpeta o archivo extraído)."""
+
+    __slots__ = ("nombre", "formato", "ruta", "n", "contenido", "error")
+
+    CAMPOS = frozenset(__slots__)
+    INTERNADOS = frozenset(("nombre", "formato", "n"))
+
+    @classmethod
+    def _hijo(cls, clave, valor, carga):
+        if clave == "contenido" and isinstance(valor, list):
+            return [NodoArchivo.desde_dict(v, carga) if isinstance(v, dict) else v for v in valor]
+        return valor
+
+
+class Enlace(_Registro):
+    """Anexo o vinculado de un documento, o nodo del grafo EXEVA.enlaces."""
+
+    __slots__ = (
+        "titulo", "url", "origen", "tipo", "info_extra", "docId", "enlace", "ruta", "n", "error",
+        "sha256", "error_verificacion", "descomprimidos", "error_descompresion", "errores_descompresion", "estado_descompresion",
+        "documentos",  # sólo en los nodos de EXEVA.enlaces
+    )
+
+    CAMPOS = frozenset(__slots__)
+    INTERNADOS = frozenset(("titulo", "origen", "tipo", "n", "estado_descompresion"))
+
+    @classmethod
+    def _hijo(cls, clave, valor, carga):
+        if clave == "descomprimidos":
+            return _arbol(valor, carga)
+        return valor
+
+
+class Documento(_Registro):
+    """Documento del expediente con sus anexos, vinculados y descomprimidos."""
+
+    __slots__ = (
+        "n", "num_doc", "folio", "titulo", "remitido_por", "destinado_a", "fecha", "hora",
+        "anexos_expediente", "URL_documento", "formato", "ruta", "anexos_detectados",
+        "vinculados_detectados", "descomprimidos", "estado_validacion", "error_descarga",
+        "sha256", "error_verificacion",
+    )
+
+    CAMPOS = frozenset(__slots__)
+    INTERNADOS = frozenset(("remitido_por", "destinado_a", "fecha", "hora", "formato", "estado_validacion"))
+
+    @classmethod
+    def _hijo(cls, clave, valor, carga):
+        if clave in ("anexos_detectados", "vinculados_detectados"):
+            return _enlaces(valor, carga)
+        if clave == "descomprimidos":
+            return _arbol(valor, carga)
+        return valor
+
+
+def compactar(payload: dict) -> dict:
+    """Reemplaza (en el mismo payload) EXEVA.documentos y EXEVA.enlaces por registros."""
+    exeva = payload.get("EXEVA") if isinstance(payload, dict) else None
+    if not isinstance(exeva, dict) or not isinstance(exeva.get("documentos"), list):
+        return payload
+    carga = _Carga()
+    if isinstance(exeva.get("enlaces"), dict):
+        exeva["enlaces"] = {
+            carga.texto(clave): Enlace.desde_dict(nodo, carga) if isinstance(nodo, dict) else nodo
+            for clave, nodo in exeva["enlaces"].items()
+        }
+    exeva["documentos"] = [
+        Documento.desde_dict(doc, carga) if isinstance(doc, dict) else doc
+        for doc in exeva["documentos"]
+    ]
+    return payload
+
+
+def a_json(obj: Any) -> dict:
+    """Para json.dump(..., default=a_json)."""
+    if isinstance(obj, _Registro):
+        return obj.a_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def cargar(path: str | os.PathLike) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return compactar(json.load(f))
+
+
+def volcar(payload: dict, path: str | os.PathLike) -> None:
+    """Escribe el payload con el mismo formato que el resto del pipeline."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=4, ensure_ascii=False, default=a_json)
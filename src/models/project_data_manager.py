@@ -2,6 +2,9 @@ import os
 import json
 from PyQt6.QtCore import QObject, pyqtSignal
 
+from src.controllers import catalogo
+from src.models import expediente
+
 
 class ProjectDataManager(QObject):
     """
@@ -34,15 +37,14 @@ class ProjectDataManager(QObject):
             return {}
 
     def load_exeva_data(self, project_id: str) -> dict:
-        """Carga el JSON específico de EXEVA si existe."""
+        """Carga el JSON específico de EXEVA si existe (documentos como registros compactos)."""
         path = self._get_exeva_json_path(project_id)
         if not os.path.exists(path):
             self.log_requested.emit(f"⚠️ Archivo EXEVA no encontrado: {path}")
             return {}
 
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return expediente.cargar(path)
         except Exception as e:
             self.log_requested.emit(f"❌ Error leyendo JSON de EXEVA: {e}")
             return {}
@@ -53,7 +55,7 @@ class ProjectDataManager(QObject):
         try:
             os.makedirs(os.path.dirname(path), exist_ok=True)
             with open(path, "w", encoding="utf-8") as f:
-                json.dump(payload, f, indent=4, ensure_ascii=False)
+                json.dump(payload, f, indent=4, ensure_ascii=False, default=expediente.a_json)
         except Exception as e:
             self.log_requested.emit(f"❌ Error guardando JSON de EXEVA: {e}")
 
@@ -117,3 +119,4 @@ class ProjectDataManager(QObject):
         path = self._get_json_path(project_id)
         with open(path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=4, ensure_ascii=False)
+        catalogo.registrar(project_id, data)
@@ -12,22 +12,31 @@ class AntGenReport(BaseReport):
         Implementación específica para ANTGEN.
         Define qué secciones van y en qué orden.
         """
-        # 1. Usamos la portada genérica de la base
-        self._create_cover_base(data, "ANTECEDENTES GENERALES")
-
-        # 2. Secciones específicas
-        self._create_status_registry(data.get("registro_estados", []))
-        self._create_general_data(data)
-        self._create_contacts(data)
-        self._create_pas(data.get("permisos_ambientales", []))
-        self._create_description(data)
+        for seccion in self.get_sections(data):
+            seccion()
+
+    def get_sections(self, data: dict):
+        """Cada sección termina en PageBreak, así que pueden generarse por separado."""
+        def datos_y_contactos():
+            self._create_general_data(data)
+            self._create_contacts(data)
+
+        return [
+            # 1. Usamos la portada genérica de la base
+            lambda: self._create_cover_base(data, "ANTECEDENTES GENERALES"),
+            # 2. Secciones específicas
+            lambda: self._create_status_registry(data.get("registro_estados", [])),
+            datos_y_contactos,
+            lambda: self._create_pas(data.get("permisos_ambientales", [])),
+            lambda: self._create_description(data),
+        ]
 
     def _create_status_registry(self, estados_list):
-        self.story.append(Paragraph("REGISTRO DE ESTADOS DEL PROYECTO", self.styles['EDJ_Titulo2']))
+        self.story.append(self._label("REGISTRO DE ESTADOS DEL PROYECTO", 'EDJ_Titulo2'))
         self.story.append(Spacer(1, 20))
 
         if not estados_list:
-            self.story.append(Paragraph("No hay registros de estado.", self.styles['EDJ_Cuerpo']))
+            self.story.append(self._label("No hay registros de estado.", 'EDJ_Cuerpo'))
         else:
             table_data = [["Fecha", "Estado", "Documento", "Autor"]]
             for est in estados_list:
@@ -53,7 +62,7 @@ class AntGenReport(BaseReport):
         self.story.append(PageBreak())
 
     def _create_general_data(self, data):
-        self.story.append(Paragraph("ANTECEDENTES GENERALES", self.styles['EDJ_Titulo2']))
+        self.story.append(self._label("ANTECEDENTES GENERALES", 'EDJ_Titulo2'))
         self.story.append(Spacer(1, 20))
 
         campos = [
@@ -77,7 +86,7 @@ class AntGenReport(BaseReport):
         ]
         for titulo, info_data in bloques:
             if not info_data: continue
-            self.story.append(Paragraph(titulo, self.styles['EDJ_Subtitulo']))
+            self.story.append(self._label(titulo, 'EDJ_Subtitulo'))
 
             if isinstance(info_data, dict):
                 detalles = []
@@ -92,7 +101,7 @@ class AntGenReport(BaseReport):
         self.story.append(PageBreak())
 
     def _create_pas(self, permisos):
-        self.story.append(Paragraph("PERMISOS AMBIENTALES SECTORIALES (PAS)", self.styles['EDJ_Titulo2']))
+        self.story.append(self._label("PERMISOS AMBIENTALES SECTORIALES (PAS)", 'EDJ_Titulo2'))
         self.story.append(Spacer(1, 20))
 
         if not permisos:
@@ -122,7 +131,7 @@ class AntGenReport(BaseReport):
         self.story.append(PageBreak())
 
     def _create_description(self, data):
-        self.story.append(Paragraph("DESCRIPCIÓN DEL PROYECTO", self.styles['EDJ_Titulo2']))
+        self.story.append(self._label("DESCRIPCIÓN DEL PROYECTO", 'EDJ_Titulo2'))
         self.story.append(Spacer(1, 20))
 
         desc = data.get("descripcion_proyecto", "")
@@ -134,4 +143,4 @@ class AntGenReport(BaseReport):
                     self.story.append(Paragraph(parrafo, self.styles['EDJ_Cuerpo']))
                     self.story.append(Spacer(1, 6))
         else:
-            self.story.append(Paragraph("Sin descripción disponible.", self.styles['EDJ_Cuerpo']))
\ No newline at end of file
+            self.story.append(self._label("Sin descripción disponible.", 'EDJ_Cuerpo'))
\ No newline at end of file
@@ -1,5 +1,9 @@
+import copy
 import os
-from html import escape
+import re
+from functools import lru_cache
+from html import escape, unescape
+from html.entities import html5
 from bs4 import BeautifulSoup
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image
 from reportlab.lib.units import inch  # <--- Necesario para definir el tamaño personalizado
@@ -9,6 +13,66 @@ from src.templates.pdf_styles import get_edj_stylesheet, COLOR_PRIMARIO
 # Definimos el tamaño Oficio / Legal Chileno (8.5 x 13 pulgadas)
 LEGAL_CHILE = (8.5 * inch, 13 * inch)
 
+# HTML "simple": sólo etiquetas de formato conocidas (sin '<'/'>' en atributos,
+# sin comentarios). Para esos textos basta una regex (mismo resultado que
+# BeautifulSoup.get_text(separator="\n")); cualquier otra etiqueta (script,
+# style, pre, template...) pasa por BeautifulSoup.
+# br/hr sólo de apertura: BeautifulSoup trata "</br>" de otra forma.
+_ETIQUETAS_SIMPLES = (
+    "a|abbr|b|big|blockquote|caption|center|cite|code|dd|div|dl|dt|em|font|"
+    "h[1-6]|i|label|li|ol|p|s|small|span|strong|sub|sup|table|tbody|td|tfoot|"
+    "th|thead|tr|u|ul"
+)
+_HTML_SIMPLE = re.compile(
+    r"(?:[^<>]|</?(?:" + _ETIQUETAS_SIMPLES + r")(?=[\s/>])[^<>]*>"
+    r"|<(?:br|hr)(?=[\s/>])[^<>]*>)*",
+    re.IGNORECASE,
+)
+_TAGS = re.compile(r"(?:<[^<>]*>)+")
+# Entidades: sólo las completas ("&amp;", "&#65;", "&#x41;") se decodifican
+# igual que en BeautifulSoup; "&amp" sin ';' o "&foo;" van por BeautifulSoup.
+_ENTIDAD = re.compile(r"&(?:([A-Za-z][A-Za-z0-9]*)|#[0-9]+|#[xX][0-9A-Fa-f]+);|&")
+_ASCII_SPACES = str.maketrans("", "", " \n\t\f\r")
+
+
+def _entidades_completas(txt_str: str) -> bool:
+    for m in _ENTIDAD.finditer(txt_str):
+        if m.group(0) == "&" or (m.group(1) and m.group(1) + ";" not in html5):
+            return False
+    return True
+
+
+def _texto_simple(txt_str: str) -> str:
+    # Igual que BeautifulSoup: los textos sólo de espacios se reducen a "\n" o " ".
+    partes = []
+    for parte in _TAGS.split(txt_str):
+        parte = unescape(parte)
+        if parte and not parte.translate(_ASCII_SPACES):
+            parte = "\n" if "\n" in parte else " "
+        partes.append(parte)
+    return "\n".join(partes)
+
+# Prototipos de Paragraph para rótulos fijos; se entregan copias.
+_PARRAFOS = {}
+
+
+@lru_cache(maxsize=8192)
+def sanitize_text(txt_str: str) -> str:
+    """Limpia HTML y escapa caracteres (memoizado por texto de entrada)."""
+    clean_text = txt_str
+
+    if '<' in txt_str and '>' in txt_str:
+        if (_HTML_SIMPLE.fullmatch(txt_str)
+                and ("&" not in txt_str or _entidades_completas(txt_str))):
+            clean_text = _texto_simple(txt_str)
+        else:
+            try:
+                soup = BeautifulSoup(txt_str, "html.parser")
+                clean_text = soup.get_text(separator="\n")
+            except Exception:
+                pass
+    return escape(clean_text.strip())
+
 
 class BaseReport:
     """
@@ -36,28 +100,51 @@ class BaseReport:
         """
         raise NotImplementedError("Cada reporte debe implementar su propio get_story()")
 
+    def get_sections(self, data: dict):
+        """
+        Secciones independientes del reporte, como lista de funciones que agregan
+        su contenido a self.story. Cada una debe empezar en página nueva para
+        poder renderizarse por separado (en paralelo) y luego concatenarse.
+        Por defecto todo el reporte es una sola sección.
+        """
+        return [lambda: self.get_story(data)]
+
     def build(self, data: dict):
         """Método maestro que genera el PDF."""
         # 1. Construir la historia usando la lógica del hijo
         self.get_story(data)
 
         # 2. Generar el archivo físico
+        self._write_story(self._footer_handler)
+
+    def build_section(self, data: dict, index: int, footer: bool = False):
+        """
+        Genera sólo la sección 'index'. Sin pie por defecto: la numeración
+        de páginas se re-aplica al concatenar las secciones.
+        """
+        self.story = []
+        self.get_sections(data)[index]()
+        self._write_story(self._footer_handler if footer else self._no_footer)
+
+    def _write_story(self, on_page):
         doc = SimpleDocTemplate(self.filename, pagesize=self.page_size, **self.margins)
-        doc.build(self.story, onFirstPage=self._footer_handler, onLaterPages=self._footer_handler)
+        doc.build(self.story, onFirstPage=on_page, onLaterPages=on_page)
 
     def _sanitize_text(self, text):
         """Limpia HTML y escapa caracteres. Disponible para todos los hijos."""
         if not text: return ""
-        txt_str = str(text)
-        clean_text = txt_str
+        return sanitize_text(str(text))
 
-        if '<' in txt_str and '>' in txt_str:
-            try:
-                soup = BeautifulSoup(txt_str, "html.parser")
-                clean_text = soup.get_text(separator="\n")
-            except Exception:
-                pass
-        return escape(clean_text.strip())
+    def _label(self, text, style_name):
+        """
+        Paragraph para textos fijos que se repiten entre reportes (títulos,
+        rótulos). Se parsea una vez y se entrega una copia nueva cada vez.
+        """
+        key = (text, style_name)
+        proto = _PARRAFOS.get(key)
+        if proto is None:
+            proto = _PARRAFOS[key] = Paragraph(text, self.styles[style_name])
+        return copy.copy(proto)
 
     def _create_cover_base(self, data, titulo_reporte):
         """
@@ -71,7 +158,7 @@ class BaseReport:
             self.story.append(img)
 
         self.story.append(Spacer(1, 80))
-        self.story.append(Paragraph(titulo_reporte, self.styles['EDJ_Titulo1']))
+        self.story.append(self._label(titulo_reporte, 'EDJ_Titulo1'))
         self.story.append(Spacer(1, 20))
 
         nombre = self._sanitize_text(data.get('nombre_proyecto', 'Sin Nombre'))
@@ -79,7 +166,7 @@ class BaseReport:
 
         self.story.append(Spacer(1, 80))
 
-        self.story.append(Paragraph("INGRESADO COMO:", self.styles['EDJ_Portada_Label']))
+        self.story.append(self._label("INGRESADO COMO:", 'EDJ_Portada_Label'))
         presentacion = self._sanitize_text(data.get('forma_presentacion', 'No indicada'))
         self.story.append(Paragraph(presentacion, self.styles['EDJ_Portada_Valor']))
 
@@ -95,11 +182,14 @@ class BaseReport:
             if "Nombre:" in titular_txt:
                 titular_txt = titular_txt.split('\n')[0].replace("Nombre:", "").strip()
 
-        self.story.append(Paragraph("TITULAR:", self.styles['EDJ_Portada_Label']))
+        self.story.append(self._label("TITULAR:", 'EDJ_Portada_Label'))
         self.story.append(Paragraph(self._sanitize_text(titular_txt), self.styles['EDJ_Portada_Valor']))
 
         self.story.append(PageBreak())
 
+    def _no_footer(self, canvas, doc):
+        pass
+
     def _footer_handler(self, canvas, doc):
         """Pie de página común."""
         canvas.saveState()
@@ -0,0 +1,77 @@
+# src/templates/indice_report.py
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+from reportlab.lib import colors
+from src.templates.pdf_styles import COLOR_PRIMARIO, COLOR_SECUNDARIO
+from src.templates.base_report import BaseReport
+
+# Filas por bloque de tabla. Una sola tabla gigante obliga a reportlab a
+# re-partirla en cada página (costo cuadrático); bloques chicos lo mantienen lineal.
+FILAS_POR_BLOQUE = 40
+
+
+class IndiceReport(BaseReport):
+
+    def get_story(self, data: dict):
+        """
+        Índice del expediente: una fila por documento, anexo o archivo,
+        con folios y un enlace al tomo/página donde fue compilado.
+        """
+        for seccion in self.get_sections(data):
+            seccion()
+
+    def get_sections(self, data: dict):
+        return [
+            lambda: self._create_cover_base(data, "ÍNDICE DEL EXPEDIENTE"),
+            lambda: self._create_indice(data),
+        ]
+
+    def _create_indice(self, data: dict):
+        self.story.append(self._label("ÍNDICE", 'EDJ_Titulo2'))
+        self.story.append(Spacer(1, 12))
+
+        filas = data.get("filas") or []
+        if not filas:
+            self.story.append(Paragraph("No hay documentos indexados.", self.styles['EDJ_Cuerpo']))
+            return
+
+        encabezado = ["N°", "Documento", "Folios", "Tomo / Pág."]
+        self.story.append(self._tabla([encabezado], header=True))
+        for inicio in range(0, len(filas), FILAS_POR_BLOQUE):
+            bloque = filas[inicio:inicio + FILAS_POR_BLOQUE]
+            self.story.append(self._tabla([self._fila(f) for f in bloque]))
+
+    def _fila(self, fila: dict):
+        nivel = int(fila.get("nivel") or 0)
+        titulo = self._sanitize_text(fila.get("titulo"))
+        href = fila.get("href")
+        if href:
+            titulo = f'<a href="{self._sanitize_text(href)}" color="#156082">{titulo}</a>'
+        if nivel == 0:
+            titulo = f"<b>{titulo}</b>"
+        celda = Paragraph(f"{'&nbsp;' * 4 * nivel}{titulo}", self.styles['EDJ_Tabla_Celda'])
+
+        folios = ""
+        if fila.get("folio_desde"):
+            folios = f"{fila['folio_desde']}–{fila['folio_hasta']}"
+        ubicacion = ""
+        if fila.get("tomo"):
+            ubicacion = f"T{fila['tomo']} / {fila['pagina']}"
+        return [fila.get("n", ""), celda, folios, ubicacion]
+
+    def _tabla(self, rows, header=False):
+        t = Table(rows, colWidths=[95, 297, 70, 50])
+        estilo = [
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]
+        if header:
+            estilo += [
+                ('BACKGROUND', (0, 0), (-1, 0), COLOR_SECUNDARIO),
+                ('TEXTCOLOR', (0, 0), (-1, 0), COLOR_PRIMARIO),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ]
+        t.setStyle(TableStyle(estilo))
+        return t
@@ -1,6 +1,7 @@
 # src/templates/pdf_styles.py
+from functools import lru_cache
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY, TA_RIGHT
 
 # Colores Corporativos (Basados en tu x_genestilo)
@@ -9,8 +10,19 @@ COLOR_SECUNDARIO = colors.HexColor("#d3d3d3")  # Gris claro para tablas
 COLOR_TEXTO = colors.black
 
 
+class _FrozenStyleSheet(StyleSheet1):
+    """Hoja de estilos compartida entre reportes: no admite estilos nuevos."""
+
+    def add(self, style, alias=None):
+        raise TypeError("La hoja de estilos EDJ es compartida y de solo lectura.")
+
+
+@lru_cache(maxsize=1)
 def get_edj_stylesheet():
-    """Retorna la hoja de estilos personalizada para el proyecto."""
+    """
+    Retorna la hoja de estilos personalizada para el proyecto.
+    Se construye una sola vez por proceso y se comparte entre reportes.
+    """
     styles = getSampleStyleSheet()
 
     # Eliminamos estilos por defecto que no queramos o los sobreescribimos
@@ -95,4 +107,6 @@ def get_edj_stylesheet():
         alignment=TA_LEFT
     ))
 
-    return styles
\ No newline at end of file
+    frozen = _FrozenStyleSheet()
+    frozen.byName, frozen.byAlias = styles.byName, styles.byAlias
+    return frozen
\ No newline at end of file
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import time
+
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QApplication,
+    QCheckBox,
+    QComboBox,
+    QDialog,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QProgressBar,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QTreeWidget,
+    QTreeWidgetItem,
+    QVBoxLayout,
+)
+
+from src.controllers import busqueda, catalogo
+from src.controllers.busqueda import BusquedaController
+from src.controllers.catalogo import CatalogoController
+from src.controllers.recorrido import get_project_root, resolve_ruta
+
+COLUMNAS = ["N°", "Documento", "Pág.", "Fragmento"]
+CAMPOS_GLOBALES = [
+    ("Todo (antecedentes y documentos)", "todo"),
+    ("Nombre del proyecto", "nombre"),
+    ("Titular", "titular"),
+    ("Tipo de proyecto", "tipo_proyecto"),
+    ("PAS (artículo o nombre)", "pas"),
+    ("Documentos EXEVA", "documentos"),
+    ("Texto de los PDF", "texto"),
+]
+
+
+class BusquedaDialog(QDialog):
+    """
+    Panel de búsqueda de texto en los PDF del proyecto. Al abrirse actualiza
+    el índice en segundo plano (sólo procesa archivos nuevos o modificados);
+    doble clic en un resultado abre el PDF en esa página.
+    """
+
+    def __init__(self, project_id: str, parent=None):
+        super().__init__(parent)
+        self.project_id = project_id
+        self.resultados: list[dict] = []
+
+        self.setWindowTitle(f"Buscar en documentos - ID {project_id}")
+        self.setMinimumSize(900, 560)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(10)
+
+        barra = QHBoxLayout()
+        self.txt_query = QLineEdit()
+        self.txt_query.setPlaceholderText('🔍 Término, "frase exacta" o prefijo* (p. ej. huemul, "artículo 140", comun*)')
+        self.txt_query.setClearButtonEnabled(True)
+        self.btn_reindex = QPushButton("Actualizar índice")
+        self.btn_reindex.setObjectName("BtnActionSecondary")
+        barra.addWidget(self.txt_query, 1)
+        barra.addWidget(self.btn_reindex)
+        layout.addLayout(barra)
+
+        self.pbar = QProgressBar()
+        self.pbar.setVisible(False)
+        layout.addWidget(self.pbar)
+
+        self.table = QTableWidget(0, len(COLUMNAS))
+        self.table.setHorizontalHeaderLabels(COLUMNAS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setWordWrap(True)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Interactive)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.table.setColumnWidth(1, 260)
+        layout.addWidget(self.table, 1)
+
+        self.lbl_status = QLabel("")
+        self.lbl_status.setStyleSheet("color:#555;")
+        layout.addWidget(self.lbl_status)
+
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(250)
+        self._search_timer.timeout.connect(self._ejecutar_busqueda)
+        self.txt_query.textChanged.connect(self._search_timer.start)
+        self.txt_query.returnPressed.connect(self._ejecutar_busqueda)
+        self.table.cellDoubleClicked.connect(self._abrir_resultado)
+
+        self.controller = BusquedaController(self)
+        self.controller.index_started.connect(self._on_index_started)
+        self.controller.index_progress.connect(self._on_index_progress)
+        self.controller.index_finished.connect(self._on_index_finished)
+        self.btn_reindex.clicked.connect(lambda: self.controller.start_index(self.project_id))
+
+        self._mostrar_estado_indice()
+        self.controller.start_index(self.project_id)
+
+    # --- Índice ---
+
+    def _mostrar_estado_indice(self) -> None:
+        estado = busqueda.estado_indice(self.project_id)
+        self.lbl_status.setText(f"{estado['archivos']} PDF indexados · {estado['paginas']} páginas con texto")
+
+    def _on_index_started(self) -> None:
+        self.btn_reindex.setEnabled(False)
+        self.pbar.setRange(0, 0)
+        self.pbar.setVisible(True)
+
+    def _on_index_progress(self, evento) -> None:
+        if evento.total:
+            self.pbar.setRange(0, evento.total)
+            self.pbar.setValue(evento.hechos)
+        self.pbar.setFormat(evento.texto())
+
+    def _on_index_finished(self, _success: bool, _resumen: dict) -> None:
+        self.btn_reindex.setEnabled(True)
+        self.pbar.setVisible(False)
+        self._mostrar_estado_indice()
+        if self.txt_query.text().strip():
+            self._ejecutar_busqueda()
+
+    # --- Búsqueda ---
+
+    def _ejecutar_busqueda(self) -> None:
+        texto = self.txt_query.text().strip()
+        inicio = time.perf_counter()
+        try:
+            self.resultados = busqueda.buscar(self.project_id, texto)
+        except Exception as exc:
+            self.resultados = []
+            self.lbl_status.setText(f"⚠️ No se pudo buscar: {exc}")
+            self._llenar_tabla()
+            return
+        self._llenar_tabla()
+        if texto:
+            ms = (time.perf_counter() - inicio) * 1000
+            tope = " (se muestran los más relevantes)" if len(self.resultados) >= busqueda.LIMITE_RESULTADOS else ""
+            self.lbl_status.setText(f"{len(self.resultados)} coincidencias en {ms:.0f} ms{tope}")
+        else:
+            self._mostrar_estado_indice()
+
+    def _llenar_tabla(self) -> None:
+        self.table.setRowCount(0)
+        self.table.setRowCount(len(self.resultados))
+        for row, res in enumerate(self.resultados):
+            valores = [res["n"] or "", res["titulo"] or res["ruta"], str(res["pagina"]), res["fragmento"]]
+            for col, valor in enumerate(valores):
+                item = QTableWidgetItem(valor)
+                if col == 1:
+                    item.setToolTip(res["ruta"])
+                self.table.setItem(row, col, item)
+        self.table.resizeRowsToContents()
+
+    def _abrir_resultado(self, row: int, _col: int) -> None:
+        if not 0 <= row < len(self.resultados):
+            return
+        res = self.resultados[row]
+        path = resolve_ruta(get_project_root(self.project_id), res["ruta"])
+        if path is None:
+            self.lbl_status.setText(f"⚠️ Archivo no encontrado: {res['ruta']}")
+            return
+        try:
+            from src.views.components.pdf_viewer import PdfViewer  # QtWebEngine: import diferido
+            viewer = PdfViewer({"ruta": str(path), "titulo": res["titulo"]}, self, self.project_id,
+                               page=res["pagina"])
+            viewer.exec()
+        except Exception as exc:
+            QMessageBox.warning(self, "Error", f"Error abriendo PDF: {exc}")
+
+
+class BusquedaGlobalDialog(QDialog):
+    """
+    Búsqueda entre todos los proyectos de Ebook/ (catálogo global). Antes de
+    la primera consulta resincroniza el catálogo en segundo plano; doble clic
+    en un proyecto lo abre.
+    """
+
+    project_selected = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Búsqueda entre proyectos")
+        self.setMinimumSize(900, 560)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(10)
+
+        barra = QHBoxLayout()
+        self.txt_query = QLineEdit()
+        self.txt_query.setPlaceholderText('🔍 Titular, tipo de proyecto, artículo PAS, "frase exacta"...')
+        self.txt_query.setClearButtonEnabled(True)
+        self.cmb_campo = QComboBox()
+        for label, value in CAMPOS_GLOBALES:
+            self.cmb_campo.addItem(label, value)
+        self.chk_textos = QCheckBox("Incluir texto de los PDF")
+        self.chk_textos.setToolTip("Consulta el índice de texto de cada proyecto que lo tenga (más lento).")
+        barra.addWidget(self.txt_query, 1)
+        barra.addWidget(self.cmb_campo)
+        barra.addWidget(self.chk_textos)
+        layout.addLayout(barra)
+
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(3)
+        self.tree.setHeaderLabels(["Proyecto / fuente", "N°", "Coincidencia"])
+        self.tree.setColumnWidth(0, 320)
+        self.tree.setColumnWidth(1, 90)
+        self.tree.setWordWrap(True)
+        layout.addWidget(self.tree, 1)
+
+        self.lbl_status = QLabel("Actualizando catálogo...")
+        self.lbl_status.setStyleSheet("color:#555;")
+        layout.addWidget(self.lbl_status)
+
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(300)
+        self._search_timer.timeout.connect(self._ejecutar_busqueda)
+        self.txt_query.textChanged.connect(self._search_timer.start)
+        self.txt_query.returnPressed.connect(self._ejecutar_busqueda)
+        self.cmb_campo.currentIndexChanged.connect(self._ejecutar_busqueda)
+        self.chk_textos.toggled.connect(self._ejecutar_busqueda)
+        self.tree.itemDoubleClicked.connect(self._abrir_proyecto)
+
+        self.catalog = CatalogoController(self)
+        self.catalog.rescan_finished.connect(self._on_rescan_finished)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.catalog.start_rescan()  # incorpora lo que cambió desde la última apertura
+
+    def _on_rescan_finished(self, _resumen: dict) -> None:
+        self.lbl_status.setText("Catálogo al día.")
+        if self.txt_query.text().strip():
+            self._ejecutar_busqueda()
+
+    def _ejecutar_busqueda(self) -> None:
+        texto = self.txt_query.text().strip()
+        self.tree.clear()
+        if not texto:
+            return
+        campo = self.cmb_campo.currentData()
+        lento = self.chk_textos.isChecked() or campo == "texto"
+        if lento:
+            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        inicio = time.perf_counter()
+        try:
+            resultados = catalogo.buscar_global(texto, campo, incluir_textos=self.chk_textos.isChecked())
+        except Exception as exc:
+            self.lbl_status.setText(f"⚠️ No se pudo buscar: {exc}")
+            return
+        finally:
+            if lento:
+                QApplication.restoreOverrideCursor()
+        ms = (time.perf_counter() - inicio) * 1000
+
+        for proyecto in resultados:
+            titulo = f"📁 {proyecto['id']}" + (f" — {proyecto['nombre']}" if proyecto["nombre"] else "")
+            item = QTreeWidgetItem([titulo, "", proyecto["timestamp"] or ""])
+            item.setData(0, Qt.ItemDataRole.UserRole, proyecto["id"])
+            for hit in proyecto["coincidencias"]:
+                fuente = hit["fuente"] + (f" · pág. {hit['pagina']}" if hit.get("pagina") else "")
+                hijo = QTreeWidgetItem([fuente, hit.get("n") or "", hit["fragmento"]])
+                hijo.setData(0, Qt.ItemDataRole.UserRole, proyecto["id"])
+                if hit.get("ruta"):
+                    hijo.setToolTip(0, hit["ruta"])
+                item.addChild(hijo)
+            self.tree.addTopLevelItem(item)
+            item.setExpanded(True)
+        self.lbl_status.setText(f"{len(resultados)} proyectos en {ms:.0f} ms")
+
+    def _abrir_proyecto(self, item: QTreeWidgetItem, _col: int) -> None:
+        project_id = item.data(0, Qt.ItemDataRole.UserRole)
+        if project_id:
+            self.project_selected.emit(project_id)
+            self.close()
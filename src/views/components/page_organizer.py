@@ -33,6 +33,8 @@ from PyQt6.QtWidgets import (
     QMessageBox,
 )
 
+from src.controllers import perfilado
+
 # QtPdf
 try:
     from PyQt6.QtPdf import QPdfDocument
@@ -317,6 +319,7 @@ class PageOrganizer(QDialog):
         self._render_i = i + 1
         QTimer.singleShot(0, self._render_step)
 
+    @perfilado.medir("gui.miniatura")
     def _render_thumb(self, page_idx: int, rot: int, target_w: int) -> QPixmap:
         # 1. Configurar caja final y área de contenido
         icon_size = self.list.iconSize()
@@ -12,6 +12,7 @@
 # Integración esperada:
 #   viewer = PdfViewer(doc_data, parent=self, project_id=...)
 #   viewer.exec()  # OK: no bloquea, pero no crashea
+#   PdfViewer(doc_data, project_id=..., page=12)  # abre en la página 12 (resultados de búsqueda)
 
 from __future__ import annotations
 
@@ -38,11 +39,13 @@ from src.views.components.page_organizer import PageOrganizer  # componente apar
 
 
 class PdfViewer(QDialog):
-    def __init__(self, doc_data: dict | None = None, parent: Optional[QWidget] = None, project_id: str | None = None):
+    def __init__(self, doc_data: dict | None = None, parent: Optional[QWidget] = None, project_id: str | None = None,
+                 page: int | None = None):
         super().__init__(parent)
 
         self._doc_data = doc_data or {}
         self._project_id = project_id
+        self._page = page
 
         self._pdf_path = self._resolve_doc_path(self._doc_data.get("ruta"), project_id)
         title = self._doc_data.get("titulo") or "Documento"
@@ -81,7 +84,7 @@ class PdfViewer(QDialog):
 
         # Carga inicial
         if self._pdf_path and os.path.exists(self._pdf_path) and self._pdf_path.lower().endswith(".pdf"):
-            self._load_pdf(self._pdf_path)
+            self._load_pdf(self._pdf_path, self._page)
         else:
             self.web.setHtml("<h3 style='font-family:sans-serif'>Documento no encontrado o inválido.</h3>")
             self.btn_organize.setEnabled(False)
@@ -106,7 +109,7 @@ class PdfViewer(QDialog):
             self._set_status("URL no local")
 
     # ---------- Internals ----------
-    def _load_pdf(self, path: str) -> None:
+    def _load_pdf(self, path: str, page: int | None = None) -> None:
         p = str(Path(path).resolve())
         self._pdf_path = p
 
@@ -117,8 +120,11 @@ class PdfViewer(QDialog):
             return
 
         self.btn_organize.setEnabled(True)
-        self.web.load(QUrl.fromLocalFile(p))
-        self._set_status(os.path.basename(p))
+        url = QUrl.fromLocalFile(p)
+        if page:
+            url.setFragment(f"page={page}")  # lo interpreta el visor PDF de Chromium
+        self.web.load(url)
+        self._set_status(f"{os.path.basename(p)} · página {page}" if page else os.path.basename(p))
 
     def _open_organizer(self) -> None:
         if not self._pdf_path or not os.path.exists(self._pdf_path):
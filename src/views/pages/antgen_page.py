@@ -50,6 +50,7 @@ class AntGenPage(QWidget):
         self.compiler = AntgenCompiler(self)
         self.compiler.log_requested.connect(self.log_requested.emit)
         self.compiler.compilation_started.connect(self._on_compilation_started)
+        self.compiler.compilation_progress.connect(self._on_compilation_progress)
         self.compiler.compilation_finished.connect(self._on_compilation_finished)
 
     def _setup_ui(self):
@@ -256,6 +257,10 @@ class AntGenPage(QWidget):
         self.btn_compile.setEnabled(False)
         self.btn_compile.setText("Compilando...")
 
+    @pyqtSlot(int, int)
+    def _on_compilation_progress(self, done, total):
+        self.btn_compile.setText(f"Compilando ({done}/{total})...")
+
     @pyqtSlot(bool, str)
     def _on_compilation_finished(self, success, path):
         self.btn_compile.setEnabled(True)
@@ -1,15 +1,19 @@
-import os
-import json
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QScrollArea, QLabel, QHBoxLayout, QFrame
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QPushButton, QScrollArea, QLabel, QHBoxLayout, QFrame, QLineEdit, QComboBox,
+)
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from src.controllers import catalogo
+from src.controllers.catalogo import CatalogoController
 from src.views.components.chapter import Chapter
 
+PROYECTOS_POR_PAGINA = 50
+
 
 class ProjectItem(QFrame):
     """Tarjeta simple para mostrar un proyecto en la lista de 'Continuar'"""
     clicked = pyqtSignal(str)  # Emite el ID del proyecto
 
-    def __init__(self, project_id, date, count):
+    def __init__(self, project_id, date, count, nombre=""):
         super().__init__()
         self.setFrameShape(QFrame.Shape.StyledPanel)
         self.setStyleSheet("""
@@ -39,6 +43,10 @@ class ProjectItem(QFrame):
         lbl_detail.setStyleSheet("color: #7f8c8d; font-size: 12px; border: none; background: transparent;")
 
         info_layout.addWidget(lbl_id)
+        if nombre:
+            lbl_nombre = QLabel(nombre)
+            lbl_nombre.setStyleSheet("color: #2c3e50; font-size: 12px; border: none; background: transparent;")
+            info_layout.addWidget(lbl_nombre)
         info_layout.addWidget(lbl_detail)
         layout.addLayout(info_layout)
 
@@ -55,6 +63,7 @@ class ProjectItem(QFrame):
 
 class ContEbook(QWidget):
     project_selected = pyqtSignal(str)  # Señal para avisar al Main Window
+    batch_download_requested = pyqtSignal(list)  # IDs a encolar en el planificador
 
     def __init__(self):
         super().__init__()
@@ -69,6 +78,33 @@ class ContEbook(QWidget):
         self.header = Chapter("Continuar Proyecto Existente")
         layout.addWidget(self.header)
 
+        # Búsqueda y filtro por estado (consultan el catálogo, no los JSON)
+        filtros = QHBoxLayout()
+        self.txt_search = QLineEdit()
+        self.txt_search.setPlaceholderText("🔍 Buscar por ID o nombre del proyecto...")
+        self.txt_search.setClearButtonEnabled(True)
+        self.cmb_status = QComboBox()
+        self.cmb_status.addItem("Todos los estados", "")
+        for label, value in (("Detectado", "detectado"), ("Edición", "edicion"),
+                             ("Verificado", "verificado"), ("Error", "error")):
+            self.cmb_status.addItem(label, value)
+        self.btn_global_search = QPushButton("🔎 Búsqueda avanzada")
+        self.btn_global_search.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_global_search.setToolTip("Buscar por titular, tipo, PAS, documentos o texto en todos los proyectos")
+        self.btn_global_search.clicked.connect(self._on_global_search_clicked)
+        filtros.addWidget(self.txt_search, 1)
+        filtros.addWidget(self.cmb_status)
+        filtros.addWidget(self.btn_global_search)
+        layout.addLayout(filtros)
+        self.global_search = None
+
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(250)
+        self._search_timer.timeout.connect(self._on_filter_changed)
+        self.txt_search.textChanged.connect(self._search_timer.start)
+        self.cmb_status.currentIndexChanged.connect(self._on_filter_changed)
+
         # Área de Scroll para la lista
         scroll = QScrollArea()
         scroll.setWidgetResizable(True)
@@ -83,19 +119,59 @@ class ContEbook(QWidget):
         scroll.setWidget(self.container)
         layout.addWidget(scroll)
 
+        # Paginación
+        paginacion = QHBoxLayout()
+        self.btn_prev = QPushButton("◀ Anterior")
+        self.btn_next = QPushButton("Siguiente ▶")
+        self.lbl_page = QLabel("")
+        self.lbl_page.setStyleSheet("color: #7f8c8d; font-size: 12px;")
+        self.btn_prev.clicked.connect(lambda: self._go_to_page(self.page - 1))
+        self.btn_next.clicked.connect(lambda: self._go_to_page(self.page + 1))
+        paginacion.addWidget(self.btn_prev)
+        paginacion.addStretch()
+        paginacion.addWidget(self.lbl_page)
+        paginacion.addStretch()
+        paginacion.addWidget(self.btn_next)
+        layout.addLayout(paginacion)
+
         # Botón de refrescar
         btn_refresh = QPushButton("🔄 Actualizar Lista")
         btn_refresh.setCursor(Qt.CursorShape.PointingHandCursor)
         btn_refresh.setStyleSheet(
             "background-color: #95a5a6; color: white; padding: 8px; border-radius: 4px; border: none;")
         btn_refresh.clicked.connect(self.load_projects)
-        layout.addWidget(btn_refresh)
+
+        # Cola de trabajos: encolar descargas de todos los proyectos listados
+        self.btn_enqueue = QPushButton("⏬ Encolar descargas de los listados")
+        self.btn_enqueue.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_enqueue.setStyleSheet(
+            "background-color: #156082; color: white; padding: 8px; border-radius: 4px; border: none;")
+        self.btn_enqueue.clicked.connect(self._on_enqueue_clicked)
+
+        self.lbl_queue = QLabel("")
+        self.lbl_queue.setStyleSheet("color: #7f8c8d; font-size: 12px;")
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(btn_refresh)
+        buttons.addWidget(self.btn_enqueue)
+        layout.addLayout(buttons)
+        layout.addWidget(self.lbl_queue)
+        self.page = 0
+        self.total = 0
+
+        # El catálogo se muestra al instante; el reescaneo (sólo mtimes) corre de fondo
+        self.catalog = CatalogoController(self)
+        self.catalog.rescan_finished.connect(self._on_rescan_finished)
 
         # Cargar lista inicial
         self.load_projects()
 
     def load_projects(self):
-        """Escanea la carpeta Ebook/ y lista los JSON encontrados."""
+        """Muestra la página actual del catálogo y lo resincroniza en segundo plano."""
+        self._show_page()
+        self.catalog.start_rescan()
+
+    def _show_page(self):
         # Limpiar lista anterior
         while self.container_layout.count():
             item = self.container_layout.takeAt(0)
@@ -103,34 +179,69 @@ class ContEbook(QWidget):
             if widget:
                 widget.deleteLater()
 
-        base_dir = os.path.join(os.getcwd(), "Ebook")
-        if not os.path.exists(base_dir):
-            self.container_layout.addWidget(QLabel("No se encontró la carpeta 'Ebook'."))
+        try:
+            proyectos, self.total = catalogo.listar(
+                self.txt_search.text(), self.cmb_status.currentData() or "",
+                limite=PROYECTOS_POR_PAGINA, desplazamiento=self.page * PROYECTOS_POR_PAGINA,
+            )
+        except Exception as e:
+            proyectos, self.total = [], 0
+            self.container_layout.addWidget(QLabel(f"No se pudo leer el catálogo de proyectos: {e}"))
+
+        if not proyectos and self.page > 0 and self.total:
+            # La página quedó fuera de rango (se eliminaron proyectos): ir a la última
+            self.page = (self.total - 1) // PROYECTOS_POR_PAGINA
+            self._show_page()
             return
 
-        found = False
-        # Listar carpetas
-        for name in os.listdir(base_dir):
-            folder_path = os.path.join(base_dir, name)
-            json_path = os.path.join(folder_path, f"{name}_fetch.json")
-
-            if os.path.isdir(folder_path) and os.path.exists(json_path):
-                found = True
-                try:
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        timestamp = data.get("timestamp", "Sin fecha")
-                        summary = data.get("summary", {})
-                        count = summary.get("found", 0)
-
-                        item = ProjectItem(name, timestamp, count)
-                        item.clicked.connect(self._on_project_clicked)
-                        self.container_layout.addWidget(item)
-                except Exception:
-                    continue
-
-        if not found:
-            self.container_layout.addWidget(QLabel("No hay proyectos guardados aún."))
+        for p in proyectos:
+            item = ProjectItem(p["id"], p["timestamp"], p["encontrados"], p["nombre"])
+            item.clicked.connect(self._on_project_clicked)
+            self.container_layout.addWidget(item)
+
+        if not proyectos and not self.total:
+            filtrando = self.txt_search.text().strip() or self.cmb_status.currentData()
+            self.container_layout.addWidget(
+                QLabel("Ningún proyecto coincide con la búsqueda." if filtrando else "No hay proyectos guardados aún.")
+            )
+
+        paginas = max(1, -(-self.total // PROYECTOS_POR_PAGINA))
+        self.lbl_page.setText(f"Página {self.page + 1} de {paginas} · {self.total} proyectos")
+        self.btn_prev.setEnabled(self.page > 0)
+        self.btn_next.setEnabled(self.page + 1 < paginas)
+
+    def _go_to_page(self, page):
+        self.page = max(0, page)
+        self._show_page()
+
+    def _on_filter_changed(self):
+        self._go_to_page(0)
+
+    def _on_rescan_finished(self, resumen: dict):
+        if any(resumen.values()):
+            self._show_page()
 
     def _on_project_clicked(self, project_id):
-        self.project_selected.emit(project_id)
\ No newline at end of file
+        self.project_selected.emit(project_id)
+
+    def _on_global_search_clicked(self):
+        if self.global_search is None:
+            from src.views.components.busqueda_panel import BusquedaGlobalDialog
+
+            self.global_search = BusquedaGlobalDialog(self)
+            self.global_search.project_selected.connect(self._on_project_clicked)
+        self.global_search.show()
+        self.global_search.raise_()
+        self.global_search.activateWindow()
+
+    def _on_enqueue_clicked(self):
+        project_ids = catalogo.listar_ids(self.txt_search.text(), self.cmb_status.currentData() or "")
+        if project_ids:
+            self.batch_download_requested.emit(project_ids)
+
+    def set_queue_summary(self, resumen: dict):
+        """Muestra el estado de la cola del planificador."""
+        self.lbl_queue.setText(
+            f"Cola: {resumen.get('pendiente', 0)} pendientes · {resumen.get('en_curso', 0)} en curso · "
+            f"{resumen.get('ok', 0)} listos · {resumen.get('error', 0)} con error"
+        )
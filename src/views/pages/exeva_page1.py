@@ -20,6 +20,7 @@ from src.views.components.mini_status import MiniStatusBar
 from src.controllers.fetch_exeva import FetchExevaController
 from src.controllers.fetch_anexos import FetchAnexosController
 from src.controllers.down_anexos import DownAnexosController
+from src.models import expediente
 from src.models.project_data_manager import ProjectDataManager
 
 
@@ -51,16 +52,19 @@ class Exeva1Page(QWidget):
         self.fetch_controller.log_requested.connect(self.log_requested.emit)
         self.fetch_controller.extraction_started.connect(self._on_extraction_started)
         self.fetch_controller.extraction_finished.connect(self._on_extraction_finished)
+        self.fetch_controller.extraction_progress.connect(self._on_progress)
         self.fetch_controller.retry_started.connect(self._on_retry_started)
         self.fetch_controller.retry_finished.connect(self._on_retry_finished)
         self.fetch_anexos_controller = FetchAnexosController(self)
         self.fetch_anexos_controller.log_requested.connect(self.log_requested.emit)
         self.fetch_anexos_controller.detection_started.connect(self._on_anexos_detection_started)
         self.fetch_anexos_controller.detection_finished.connect(self._on_anexos_detection_finished)
+        self.fetch_anexos_controller.detection_progress.connect(self._on_progress)
         self.down_anexos_controller = DownAnexosController(self)
         self.down_anexos_controller.log_requested.connect(self.log_requested.emit)
         self.down_anexos_controller.download_started.connect(self._on_anexos_download_started)
         self.down_anexos_controller.download_finished.connect(self._on_anexos_download_finished)
+        self.down_anexos_controller.download_progress.connect(self._on_progress)
 
     def _setup_ui(self):
         """Construye la interfaz gráfica siguiendo el patrón de AntGen."""
@@ -125,9 +129,16 @@ class Exeva1Page(QWidget):
 
         self.pbar = QProgressBar(self.command_bar)
         self.pbar.setVisible(False)
-        self.pbar.setFixedWidth(200)
+        self.pbar.setFixedWidth(320)
         self.command_bar.button_layout.addWidget(self.pbar)
 
+        # Pausa / detención del proceso en curso (visibles sólo mientras corre)
+        self.btn_pause = self.command_bar.add_button("⏸ Pausar")
+        self.btn_stop = self.command_bar.add_button("⏹ Detener")
+        self.btn_pause.clicked.connect(self._on_pause_clicked)
+        self.btn_stop.clicked.connect(self._on_stop_clicked)
+        self._set_active_controller(None)
+
         self.btn_continue_step2 = self.command_bar.add_right_button(
             "Continuar al Paso 2", object_name="BtnActionPrimary"
         )
@@ -273,21 +284,65 @@ class Exeva1Page(QWidget):
             if hasattr(main_window, "show_exeva_page2"):
                 main_window.show_exeva_page2(self.current_project_id)
 
+    def _set_active_controller(self, controller) -> None:
+        self._active_controller = controller
+        self._stop_requested = False
+        self.btn_pause.setText("⏸ Pausar")
+        self.btn_pause.setEnabled(True)
+        self.btn_stop.setEnabled(True)
+        self.btn_pause.setVisible(controller is not None)
+        self.btn_stop.setVisible(controller is not None)
+
+    def _on_pause_clicked(self) -> None:
+        if not self._active_controller:
+            return
+        if self.btn_pause.text() == "⏸ Pausar":
+            self._active_controller.pause()
+            self.btn_pause.setText("▶ Reanudar")
+        else:
+            self._active_controller.resume()
+            self.btn_pause.setText("⏸ Pausar")
+
+    def _on_stop_clicked(self) -> None:
+        if not self._active_controller:
+            return
+        self._stop_requested = True
+        self._active_controller.cancel()
+        self.btn_pause.setEnabled(False)
+        self.btn_stop.setEnabled(False)
+
     # --- SLOTS ASYNC ---
 
+    def _on_progress(self, evento) -> None:
+        """Actualiza la barra con un ProgressEvent (ítems, tasa y ETA)."""
+        total = max(evento.total, 1)
+        self.pbar.setRange(0, total)
+        self.pbar.setValue(min(evento.hechos, total))
+        self.pbar.setFormat(evento.texto())
+
     def _on_extraction_started(self):
+        self._set_active_controller(self.fetch_controller)
         self.btn_fetchexeva.setEnabled(False)
         self.pbar.setVisible(True)
         self.pbar.setRange(0, 0)
         self.lbl_placeholder.setVisible(False)
 
     def _on_extraction_finished(self, success: bool, data: dict):
+        stopped = self._stop_requested
+        self._set_active_controller(None)
         self.pbar.setVisible(False)
         self.btn_fetchexeva.setEnabled(True)
         self.pbar.setRange(0, 100)
 
-        if success:
-            self.exeva_payload = data or {}
+        if stopped and data:
+            self.exeva_payload = expediente.compactar(data)
+            self.documentos = data.get("EXEVA", {}).get("documentos", [])
+            self.lbl_placeholder.setText("Descarga detenida. Pulse 'Volver a Descargar' para continuar.")
+            self.lbl_placeholder.setVisible(True)
+            self._set_results_table(self.documentos)
+            self.btn_fetchexeva.setText("Volver a Descargar")
+        elif success:
+            self.exeva_payload = expediente.compactar(data or {})
             documentos = data.get("EXEVA", {}).get("documentos", [])
             self.documentos = documentos
             total = len(documentos)
@@ -309,42 +364,54 @@ class Exeva1Page(QWidget):
             QMessageBox.critical(self, "Error", "Fallo en la extracción de EXEVA.")
 
     def _on_anexos_detection_started(self):
+        self._set_active_controller(self.fetch_anexos_controller)
         self.btn_fetchanexos.setEnabled(False)
         self.pbar.setVisible(True)
         self.pbar.setRange(0, 0)
 
     def _on_anexos_detection_finished(self, success: bool, _data: dict):
+        stopped = self._stop_requested
+        self._set_active_controller(None)
         self.pbar.setVisible(False)
         self.btn_fetchanexos.setEnabled(True)
         self.pbar.setRange(0, 100)
 
-        if success:
+        if success or stopped:
             exeva_payload = self.data_manager.load_exeva_data(self.current_project_id)
             self.exeva_payload = exeva_payload or {}
             documentos = exeva_payload.get("EXEVA", {}).get("documentos", [])
             self.documentos = documentos
             self._set_results_table(documentos)
-            self.log_requested.emit("✅ Anexos detectados y tabla actualizada.")
+            if stopped:
+                self.log_requested.emit("⏹️ Detección detenida; tabla actualizada con lo avanzado.")
+            else:
+                self.log_requested.emit("✅ Anexos detectados y tabla actualizada.")
         else:
             self.log_requested.emit("⚠️ No se pudieron detectar anexos.")
 
     def _on_anexos_download_started(self):
+        self._set_active_controller(self.down_anexos_controller)
         self.btn_downanexos.setEnabled(False)
         self.pbar.setVisible(True)
         self.pbar.setRange(0, 0)
 
     def _on_anexos_download_finished(self, success: bool, _data: dict):
+        stopped = self._stop_requested
+        self._set_active_controller(None)
         self.pbar.setVisible(False)
         self.btn_downanexos.setEnabled(True)
         self.pbar.setRange(0, 100)
 
-        if success:
+        if success or stopped:
             exeva_payload = self.data_manager.load_exeva_data(self.current_project_id)
             self.exeva_payload = exeva_payload or {}
             documentos = exeva_payload.get("EXEVA", {}).get("documentos", [])
             self.documentos = documentos
             self._set_results_table(documentos)
-            self.log_requested.emit("✅ Descarga de anexos finalizada y tabla actualizada.")
+            if stopped:
+                self.log_requested.emit("⏹️ Descarga de anexos detenida; tabla actualizada con lo avanzado.")
+            else:
+                self.log_requested.emit("✅ Descarga de anexos finalizada y tabla actualizada.")
         else:
             self.log_requested.emit("⚠️ No se pudieron descargar anexos.")
 
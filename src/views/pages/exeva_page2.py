@@ -1,4 +1,5 @@
 from PyQt6.QtCore import Qt, pyqtSignal
+from collections.abc import Mapping
 from urllib.parse import urlparse
 
 from PyQt6.QtWidgets import (
@@ -11,6 +12,7 @@ from PyQt6.QtWidgets import (
     QPushButton,
     QAbstractItemView,
     QHeaderView,
+    QProgressBar,
 )
 
 from src.views.components.chapter import Chapter
@@ -20,9 +22,13 @@ from src.views.components.timeline import Timeline
 from src.views.components.results_table import EditableTableCard
 from src.views.components.mini_status import MiniStatusBar
 from src.views.components.directorio import DirectorioDialog
+from src.views.components.busqueda_panel import BusquedaDialog
 from src.models.project_data_manager import ProjectDataManager
 from src.controllers.unpack import UnpackController
 from src.controllers.indexar import IndexarController
+from src.controllers.compilar import CompilarController
+from src.controllers.foliar import FoliarController
+from src.controllers.indice import IndiceController
 
 
 class Exeva2Page(QWidget):
@@ -37,6 +43,7 @@ class Exeva2Page(QWidget):
         self.is_loading = False
         self.result_cards = []
         self.exeva_payload = {}
+        self.search_dialog: BusquedaDialog | None = None
 
         self._init_controllers()
         self._setup_ui()
@@ -48,10 +55,24 @@ class Exeva2Page(QWidget):
         self.unpack_controller.log_requested.connect(self.log_requested.emit)
         self.unpack_controller.unpack_started.connect(self._on_unpack_started)
         self.unpack_controller.unpack_finished.connect(self._on_unpack_finished)
+        self.unpack_controller.unpack_progress.connect(self._on_progress)
         self.index_controller = IndexarController(self)
         self.index_controller.log_requested.connect(self.log_requested.emit)
         self.index_controller.index_started.connect(self._on_index_started)
         self.index_controller.index_finished.connect(self._on_index_finished)
+        self.index_controller.index_progress.connect(self._on_progress)
+        self.foliar_controller = FoliarController(self)
+        self.foliar_controller.log_requested.connect(self.log_requested.emit)
+        self.foliar_controller.foliar_started.connect(self._on_foliar_started)
+        self.foliar_controller.foliar_finished.connect(self._on_foliar_finished)
+        self.compile_controller = CompilarController(self)
+        self.compile_controller.log_requested.connect(self.log_requested.emit)
+        self.compile_controller.compile_started.connect(self._on_compile_started)
+        self.compile_controller.compile_finished.connect(self._on_compile_finished)
+        self.indice_controller = IndiceController(self)
+        self.indice_controller.log_requested.connect(self.log_requested.emit)
+        self.indice_controller.indice_started.connect(self._on_indice_started)
+        self.indice_controller.indice_finished.connect(self._on_indice_finished)
 
     def _setup_ui(self):
         layout = QVBoxLayout(self)
@@ -102,19 +123,47 @@ class Exeva2Page(QWidget):
         self.btn_back_step1 = self.command_bar.add_left_button(
             "Volver a Paso 1", object_name="BtnActionFolder"
         )
+        self.btn_search = self.command_bar.add_left_button(
+            "🔍 Buscar en documentos", object_name="BtnActionFolder"
+        )
         self.btn_download = self.command_bar.add_button(
             "1. Descomprimir", object_name="BtnActionPrimary"
         )
         self.btn_index = self.command_bar.add_button(
             "2. Indexar", object_name="BtnActionPrimary"
         )
+        self.btn_foliar = self.command_bar.add_button(
+            "3. Foliar", object_name="BtnActionPrimary"
+        )
+        self.btn_compile = self.command_bar.add_button(
+            "4. Compilar Tomos", object_name="BtnActionPrimary"
+        )
+        self.btn_indice = self.command_bar.add_button(
+            "5. Generar Índice", object_name="BtnActionPrimary"
+        )
         self.btn_continue_step3 = self.command_bar.add_right_button(
             "Continuar a paso 3", object_name="BtnActionPrimary"
         )
 
+        self.pbar = QProgressBar(self.command_bar)
+        self.pbar.setVisible(False)
+        self.pbar.setFixedWidth(320)
+        self.command_bar.button_layout.addWidget(self.pbar)
+
+        # Pausa / detención de descompresión e indexación (visibles sólo mientras corren)
+        self.btn_pause = self.command_bar.add_button("⏸ Pausar")
+        self.btn_stop = self.command_bar.add_button("⏹ Detener")
+        self.btn_pause.clicked.connect(self._on_pause_clicked)
+        self.btn_stop.clicked.connect(self._on_stop_clicked)
+        self._set_active_controller(None)
+
         self.btn_back_step1.clicked.connect(self._on_back_clicked)
+        self.btn_search.clicked.connect(self._on_search_clicked)
         self.btn_download.clicked.connect(self._on_unzip_index_clicked)
         self.btn_index.clicked.connect(self._on_index_clicked)
+        self.btn_foliar.clicked.connect(self._on_foliar_clicked)
+        self.btn_compile.clicked.connect(self._on_compile_clicked)
+        self.btn_indice.clicked.connect(self._on_indice_clicked)
         self.btn_continue_step3.clicked.connect(self._on_continue_clicked)
 
         layout.addWidget(self.command_bar)
@@ -178,6 +227,16 @@ class Exeva2Page(QWidget):
             return
         self.back_requested.emit(self.current_project_id)
 
+    def _on_search_clicked(self):
+        if not self.current_project_id:
+            return
+        # Un panel por proyecto: se reutiliza para no cortar una indexación en curso.
+        if self.search_dialog is None or self.search_dialog.project_id != self.current_project_id:
+            self.search_dialog = BusquedaDialog(self.current_project_id, self)
+        self.search_dialog.show()
+        self.search_dialog.raise_()
+        self.search_dialog.activateWindow()
+
     def _on_continue_clicked(self):
         if not self.current_project_id:
             return
@@ -193,30 +252,131 @@ class Exeva2Page(QWidget):
             return
         self.index_controller.start_index(self.current_project_id)
 
+    def _on_foliar_clicked(self):
+        if not self.current_project_id:
+            return
+        self.foliar_controller.start_foliar(self.current_project_id)
+
+    def _on_compile_clicked(self):
+        if not self.current_project_id:
+            return
+        self.compile_controller.start_compile(self.current_project_id)
+
+    def _on_indice_clicked(self):
+        if not self.current_project_id:
+            return
+        self.indice_controller.start_indice(self.current_project_id)
+
+    def _set_active_controller(self, controller) -> None:
+        self._active_controller = controller
+        self._stop_requested = False
+        self.btn_pause.setText("⏸ Pausar")
+        self.btn_pause.setEnabled(True)
+        self.btn_stop.setEnabled(True)
+        self.btn_pause.setVisible(controller is not None)
+        self.btn_stop.setVisible(controller is not None)
+        self.pbar.setVisible(controller is not None)
+        self.pbar.setRange(0, 0)
+
+    def _on_progress(self, evento) -> None:
+        """Actualiza la barra con un ProgressEvent (ítems, tasa y ETA)."""
+        total = max(evento.total, 1)
+        self.pbar.setRange(0, total)
+        self.pbar.setValue(min(evento.hechos, total))
+        self.pbar.setFormat(evento.texto())
+
+    def _on_pause_clicked(self) -> None:
+        if not self._active_controller:
+            return
+        if self.btn_pause.text() == "⏸ Pausar":
+            self._active_controller.pause()
+            self.btn_pause.setText("▶ Reanudar")
+        else:
+            self._active_controller.resume()
+            self.btn_pause.setText("⏸ Pausar")
+
+    def _on_stop_clicked(self) -> None:
+        if not self._active_controller:
+            return
+        self._stop_requested = True
+        self._active_controller.cancel()
+        self.btn_pause.setEnabled(False)
+        self.btn_stop.setEnabled(False)
+
     def _on_unpack_started(self) -> None:
+        self._set_active_controller(self.unpack_controller)
         self.btn_download.setEnabled(False)
         self.log_requested.emit("⏳ Descargando y descomprimiendo archivos comprimidos...")
 
     def _on_unpack_finished(self, success: bool, _data: dict) -> None:
+        stopped = self._stop_requested
+        self._set_active_controller(None)
         self.btn_download.setEnabled(True)
-        if success:
+        if stopped:
+            self._apply_unpack_results()
+            self.log_requested.emit("⏹️ Descompresión detenida; se retoma al volver a ejecutarla.")
+        elif success:
             self._apply_unpack_results()
             self.log_requested.emit("✅ Descompresión e indexación finalizadas.")
         else:
             self.log_requested.emit("⚠️ No se pudieron descomprimir archivos.")
 
     def _on_index_started(self) -> None:
+        self._set_active_controller(self.index_controller)
         self.btn_index.setEnabled(False)
         self.log_requested.emit("⏳ Indexando estructura de descomprimidos...")
 
     def _on_index_finished(self, success: bool, _data: dict) -> None:
+        stopped = self._stop_requested
+        self._set_active_controller(None)
         self.btn_index.setEnabled(True)
-        if success:
+        if stopped:
+            self.log_requested.emit("⏹️ Indexación detenida.")
+        elif success:
             self._apply_index_results()
             self.log_requested.emit("✅ Indexación completada.")
         else:
             self.log_requested.emit("⚠️ No se pudo indexar la información.")
 
+    def _on_foliar_started(self) -> None:
+        self.btn_foliar.setEnabled(False)
+        self.log_requested.emit("⏳ Foliando documentos del expediente...")
+
+    def _on_foliar_finished(self, success: bool, data: dict) -> None:
+        self.btn_foliar.setEnabled(True)
+        if success:
+            self.log_requested.emit(
+                f"✅ Folios {data.get('folio_inicial')}–{data.get('folio_final')} estampados en EXEVA/Foliado."
+            )
+        else:
+            self.log_requested.emit("⚠️ No se pudo foliar el expediente.")
+
+    def _on_compile_started(self) -> None:
+        self.btn_compile.setEnabled(False)
+        self.log_requested.emit("⏳ Compilando tomos del expediente...")
+
+    def _on_compile_finished(self, success: bool, data: dict) -> None:
+        self.btn_compile.setEnabled(True)
+        if success:
+            total = len(data.get("tomos") or [])
+            self.timeline.set_current_step(5, "edicion")
+            self.log_requested.emit(f"✅ {total} tomos generados en EXEVA/Tomos.")
+        else:
+            self.log_requested.emit("⚠️ No se pudieron compilar los tomos.")
+
+    def _on_indice_started(self) -> None:
+        self.btn_indice.setEnabled(False)
+        self.log_requested.emit("⏳ Generando índice del expediente...")
+
+    def _on_indice_finished(self, success: bool, data: dict) -> None:
+        self.btn_indice.setEnabled(True)
+        if success:
+            self.log_requested.emit(
+                f"✅ Índice generado: {data.get('total', 0)} entradas ({data.get('pdf')})."
+            )
+        else:
+            self.log_requested.emit("⚠️ No se pudo generar el índice.")
+
     def _load_results_tables(self) -> None:
         exeva_payload = self.data_manager.load_exeva_data(self.current_project_id)
         self.exeva_payload = exeva_payload or {}
@@ -243,7 +403,7 @@ class Exeva2Page(QWidget):
         links = self._collect_compressed_links(documentos)
         for link in links:
             descomprimidos = link.get("descomprimidos")
-            if not isinstance(descomprimidos, dict):
+            if not isinstance(descomprimidos, Mapping):
                 link["error_indexacion"] = True
                 link.setdefault("errores_indexacion", ["Faltan descomprimidos para indexar."])
                 link["estado_descompresion"] = "error"
@@ -437,12 +597,12 @@ class Exeva2Page(QWidget):
     def _collect_compressed_links(self, documentos: list[dict]) -> list[dict]:
         links = []
         for doc in documentos:
-            if not isinstance(doc, dict):
+            if not isinstance(doc, Mapping):
                 continue
             anexos = doc.get("anexos_detectados") or []
             vinculados = doc.get("vinculados_detectados") or []
             for link in anexos + vinculados:
-                if not isinstance(link, dict):
+                if not isinstance(link, Mapping):
                     continue
                 if self._detect_compressed_format(link):
                     links.append(link)
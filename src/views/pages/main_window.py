@@ -1,19 +1,25 @@
+import importlib
+
 from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QSplitter, QStackedWidget
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from src.views.components.header import Header
 from src.views.components.menu import Menu
 from src.views.components.log_screen import LogScreen
 from src.views.components.sidebar import Sidebar
-from src.views.pages.new_ebook import NewEbook
-from src.views.pages.cont_ebook import ContEbook
-from src.views.pages.project_view import ProjectView
-from src.views.pages.antgen_page import AntGenPage
-from src.views.pages.exeva_page1 import Exeva1Page
-from src.views.pages.exeva_page2 import Exeva2Page
-# Asegúrate de que el nombre del archivo coincida (fetch_exp o fetch_exp_controller)
-from src.controllers.fetch_exp import FetchExp
 from src.controllers.step_controller import StepController
 
+# Páginas del stack: atributo -> (módulo, clase). Se importan y construyen en
+# la primera navegación (exeva_page1 arrastra QtWebEngine, pypdf, bs4, etc.),
+# así la ventana aparece sin esperar a módulos que quizá no se usen.
+PAGINAS = {
+    "page_new_ebook": ("src.views.pages.new_ebook", "NewEbook"),
+    "page_project_view": ("src.views.pages.project_view", "ProjectView"),
+    "page_cont_ebook": ("src.views.pages.cont_ebook", "ContEbook"),
+    "antgen_page": ("src.views.pages.antgen_page", "AntGenPage"),
+    "exeva_page": ("src.views.pages.exeva_page1", "Exeva1Page"),
+    "exeva_page2": ("src.views.pages.exeva_page2", "Exeva2Page"),
+}
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -60,53 +66,28 @@ class MainWindow(QMainWindow):
         self.page_empty.setObjectName("PageEmpty")
         self.workspace_stack.addWidget(self.page_empty)
 
-        # Index 1: Nuevo Expediente
-        self.page_new_ebook = NewEbook()
-        self.workspace_stack.addWidget(self.page_new_ebook)
-
-        # IVista de Proyecto
-        self.page_project_view = ProjectView()
-        self.workspace_stack.addWidget(self.page_project_view)
-
-        # Continuar proyecto
-        self.page_cont_ebook = ContEbook()
-        self.workspace_stack.addWidget(self.page_cont_ebook)
-
-        # ANTGEN
-        self.antgen_page = AntGenPage()
-        self.workspace_stack.addWidget(self.antgen_page)
-
-        # Inicializar Exeva Page
-        self.exeva_page = Exeva1Page()
-        self.workspace_stack.addWidget(self.exeva_page)
-
-        self.exeva_page2 = Exeva2Page()
-        self.workspace_stack.addWidget(self.exeva_page2)
+        # El resto de las páginas se crea bajo demanda (ver page())
+        self._pages: dict[str, QWidget] = {}
 
         # --- 2. LOG SCREEN ---
         self.log_screen = LogScreen()
         self.v_splitter.addWidget(self.log_screen)
         self.h_splitter.addWidget(self.content_area)
 
-        # --- 3. CONTROLADORES (¡IMPORTANTE: INICIALIZAR AQUÍ!) ---
-        self.fetch_controller = FetchExp(self)
+        # --- 3. CONTROLADORES ---
+        # FetchExp se crea junto con la página "Nuevo"; el planificador, tras mostrar la ventana.
+        self.fetch_controller = None
         self.step_controller = StepController(self)
+        self.job_scheduler = None
 
         # --- 4. CONEXIONES ---
         self.menu.btn_new.clicked.connect(self.on_new_expediente)  # Usar función wrapper
         self.menu.btn_continue.clicked.connect(self.show_continue_page)
         self.log_screen.visibility_changed.connect(self.update_log_splitter)
 
-        # Conexiones entre páginas
-        self.page_cont_ebook.project_selected.connect(self.show_project_view)
-        self.page_project_view.action_requested.connect(self.step_controller.handle_activation)
-        self.page_project_view.log_requested.connect(self.log_screen.add_log)
-        self.antgen_page.log_requested.connect(self.log_screen.add_log)
-        self.exeva_page.log_requested.connect(self.log_screen.add_log)
-        self.exeva_page2.log_requested.connect(self.log_screen.add_log)
-        self.exeva_page.step2_requested.connect(self.show_exeva_page2)
-        self.exeva_page2.back_requested.connect(self.show_exeva_page)
-
+        # Planificador de trabajos (cola persistente): reanuda lo pendiente una
+        # vez que la ventana ya está en pantalla.
+        QTimer.singleShot(0, self.scheduler)
 
         # --- 5. TAMAÑOS INICIALES ---
         self.h_splitter.setCollapsible(0, False)
@@ -117,50 +98,116 @@ class MainWindow(QMainWindow):
         self.v_splitter.setSizes([550, 150])
         self.v_splitter.setStretchFactor(0, 1)
 
+    # --- PÁGINAS Y CONTROLADORES BAJO DEMANDA ---
+    def page(self, nombre):
+        """Devuelve la página 'nombre' de PAGINAS, creándola en el primer uso."""
+        page = self._pages.get(nombre)
+        if page is None:
+            modulo, clase = PAGINAS[nombre]
+            page = getattr(importlib.import_module(modulo), clase)()
+            self._pages[nombre] = page
+            setattr(self, nombre, page)
+            self.workspace_stack.addWidget(page)
+            self._connect_page(nombre, page)
+        return page
+
+    def _connect_page(self, nombre, page):
+        """Conexiones de cada página, hechas al crearla."""
+        if nombre == "page_new_ebook":
+            from src.controllers.fetch_exp import FetchExp
+
+            self.fetch_controller = FetchExp(self)
+        elif nombre == "page_project_view":
+            page.action_requested.connect(self.step_controller.handle_activation)
+            page.log_requested.connect(self.log_screen.add_log)
+        elif nombre == "page_cont_ebook":
+            page.project_selected.connect(self.show_project_view)
+            page.batch_download_requested.connect(self.enqueue_downloads)
+            scheduler = self.scheduler()
+            scheduler.queue_changed.connect(page.set_queue_summary)
+            page.set_queue_summary(scheduler.summary())
+        elif nombre == "antgen_page":
+            page.log_requested.connect(self.log_screen.add_log)
+        elif nombre == "exeva_page":
+            page.log_requested.connect(self.log_screen.add_log)
+            page.step2_requested.connect(self.show_exeva_page2)
+        elif nombre == "exeva_page2":
+            page.log_requested.connect(self.log_screen.add_log)
+            page.back_requested.connect(self.show_exeva_page)
+
+    def scheduler(self):
+        """Planificador de trabajos; se crea (y reanuda la cola) en el primer uso."""
+        if self.job_scheduler is None:
+            from src.controllers.scheduler import JobScheduler
+
+            self.job_scheduler = JobScheduler(self)
+            self.job_scheduler.log_requested.connect(self.log_screen.add_log)
+            self.job_scheduler.start()
+        return self.job_scheduler
+
     # --- FUNCIONES ---
     def show_new_ebook_page(self):
         self.log_screen.add_log("Navegando a: Nuevo Expediente")
-        self.workspace_stack.setCurrentWidget(self.page_new_ebook)
+        self.workspace_stack.setCurrentWidget(self.page("page_new_ebook"))
         self.sidebar.clear()
 
     def show_project_view(self, project_id):
         """Cambia a la pantalla de vista de proyecto y carga datos."""
         self.log_screen.add_log(f"📂 Abriendo proyecto existente: {project_id}")
-        self.page_project_view.load_project(project_id)
-        self.workspace_stack.setCurrentWidget(self.page_project_view)
+        page = self.page("page_project_view")
+        page.load_project(project_id)
+        self.workspace_stack.setCurrentWidget(page)
 
         self.sidebar.clear()
         self.sidebar.add_option(f"Proyecto Activo\nID {project_id}")
 
     def show_continue_page(self):
         self.log_screen.add_log("Consultando proyectos guardados...")
-        self.page_cont_ebook.load_projects()
-        self.workspace_stack.setCurrentWidget(self.page_cont_ebook)
+        page = self._pages.get("page_cont_ebook")
+        if page is None:
+            page = self.page("page_cont_ebook")  # recién creada: ya cargó la lista
+        else:
+            page.load_projects()
+        self.workspace_stack.setCurrentWidget(page)
 
         self.sidebar.clear()
         self.sidebar.add_option("Seleccione un proyecto\nde la lista.")
 
     def show_antgen_page(self, project_id):
         self.log_screen.add_log(f"Entrando a Antecedentes Generales: {project_id}")
-        self.antgen_page.load_project(project_id)
-        self.workspace_stack.setCurrentWidget(self.antgen_page)
+        page = self.page("antgen_page")
+        page.load_project(project_id)
+        self.workspace_stack.setCurrentWidget(page)
 
     def show_exeva_page(self, project_id):
         self.log_screen.add_log(f"Entrando a EXEVA: {project_id}")
-        self.exeva_page.load_project(project_id)
-        self.workspace_stack.setCurrentWidget(self.exeva_page)
+        page = self.page("exeva_page")
+        page.load_project(project_id)
+        self.workspace_stack.setCurrentWidget(page)
 
     def show_exeva_page2(self, project_id):
         self.log_screen.add_log(f"Entrando a EXEVA Paso 2: {project_id}")
-        self.exeva_page2.load_project(project_id)
-        self.workspace_stack.setCurrentWidget(self.exeva_page2)
+        page = self.page("exeva_page2")
+        page.load_project(project_id)
+        self.workspace_stack.setCurrentWidget(page)
+
+    def enqueue_downloads(self, project_ids):
+        scheduler = self.scheduler()
+        for project_id in project_ids:
+            scheduler.enqueue_pipeline(project_id)
+        self.log_screen.add_log(f"📥 {len(project_ids)} proyectos encolados para descarga.")
+
+    def closeEvent(self, event):
+        if self.job_scheduler is not None:
+            self.job_scheduler.shutdown()
+        super().closeEvent(event)
 
     def on_continue_expediente(self):
         self.log_screen.add_log("Retomando expediente existente...")
 
     def on_new_expediente(self):
         self.log_screen.add_log("Navegando a: Nuevo Expediente")
-        self.workspace_stack.setCurrentWidget(self.page_new_ebook)
+        self.workspace_stack.setCurrentWidget(self.page("page_new_ebook"))
         self.sidebar.clear()
 
     def update_log_splitter(self, collapsed):
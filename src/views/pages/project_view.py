@@ -2,6 +2,7 @@ import os
 import json
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QScrollArea
 from PyQt6.QtCore import Qt, pyqtSignal
+from src.controllers import catalogo
 from src.views.components.chapter import Chapter
 from src.views.components.expediente_card import ExpedienteCard
 
@@ -121,6 +122,7 @@ class ProjectView(QWidget):
 
                 with open(json_path, 'w', encoding='utf-8') as f:
                     json.dump(data, f, indent=4, ensure_ascii=False)
+                catalogo.registrar(project_id, data)
 
                 # 2. Emitir mensaje de éxito al Log
                 self.log_requested.emit(f"🔄 [STATUS] {code} estado global guardado como: {new_status.upper()}")
@@ -145,6 +147,7 @@ class ProjectView(QWidget):
 
                 with open(json_path, 'w', encoding='utf-8') as f:
                     json.dump(data, f, indent=4, ensure_ascii=False)
+                catalogo.registrar(project_id, data)
 
                 for i in range(self.container_layout.count()):
                     widget = self.container_layout.itemAt(i).widget()